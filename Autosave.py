@@ -0,0 +1,162 @@
+import os
+import six
+import time
+import shutil
+import threading
+
+#------------------------------------------------------------------------------------------------
+# Background writer of the race file.
+#
+# The UI thread pickles a snapshot of the model (or a command) to bytes, a consistent copy at that
+# moment, and hands it to the Writer, so the UI never waits on the disk.
+#
+# A command is appended and fsynced as soon as it arrives, so a crash loses at most the action
+# being written.  A snapshot waits for a burst of changes to end, unless a command arrives after it -
+# the command needs the snapshot in the file first, so both are written then.
+#
+# A snapshot is written to a temporary file, fsynced, then replaces the race file, so a crash leaves
+# the old file or the new one, never half a pickle.  The commands after it are appended with one fsync.
+# A new snapshot drops the pending commands - it already has their changes.
+#
+# Before the race file is replaced, it is copied to the newest of BackupCount rotating backups
+# (race.smr.bak1 is the newest) if the newest backup is older than BackupSeconds.
+#
+
+DelaySeconds = 0.5			# Write a snapshot when there have been no new snapshots for this long...
+DelayMaxSeconds = 3.0		# ...or when the oldest pending snapshot is this old.
+BackupCount = 3
+BackupSeconds = 5*60
+
+def replaceFile( fileNameSrc, fileNameDest ):
+	try:
+		os.replace( fileNameSrc, fileNameDest )
+	except AttributeError:
+		# Python 2 - rename does not overwrite on Windows.
+		if os.path.exists( fileNameDest ):
+			os.remove( fileNameDest )
+		os.rename( fileNameSrc, fileNameDest )
+
+def getBackupFileName( fileName, i ):
+	return u'{}.bak{}'.format( fileName, i )
+
+def writeBackup( fileName ):
+	''' Rotate the backups and copy the file to the newest one. '''
+	try:
+		if os.path.getsize(fileName) == 0 or time.time() - os.path.getmtime(getBackupFileName(fileName, 1)) < BackupSeconds:
+			return
+	except OSError:
+		pass	# No file, or no backup yet.
+	
+	try:
+		for i in six.moves.range(BackupCount - 1, 0, -1):
+			if os.path.exists( getBackupFileName(fileName, i) ):
+				replaceFile( getBackupFileName(fileName, i), getBackupFileName(fileName, i+1) )
+		fileNameTmp = getBackupFileName(fileName, 1) + '.tmp'
+		shutil.copyfile( fileName, fileNameTmp )
+		replaceFile( fileNameTmp, getBackupFileName(fileName, 1) )
+	except (IOError, OSError):
+		pass	# A missing backup must not stop the save.
+
+class Writer( object ):
+	def __init__( self, fileName ):
+		self.fileName = fileName
+		self.condition = threading.Condition()
+		self.snapshot = None		# Pickled model to write, or None.
+		self.commands = []			# Pickled commands to append after the snapshot.
+		self.tFirst = self.tLast = None
+		self.writing = False
+		self.flushing = False
+		self.closing = False
+		self.failed = False			# A write failed.  Commands are dropped until a snapshot is written.
+		self.error = None			# The last error, for popError.
+		
+		self.thread = threading.Thread( target = self.run, name = 'Autosave' )
+		self.thread.daemon = True
+		self.thread.start()
+	
+	def putSnapshot( self, data ):
+		with self.condition:
+			self.snapshot = data
+			del self.commands[:]
+			self.tLast = time.time()
+			if self.tFirst is None:
+				self.tFirst = self.tLast
+			self.condition.notify_all()
+	
+	def putCommand( self, data ):
+		with self.condition:
+			self.commands.append( data )
+			self.condition.notify_all()
+	
+	def isPending( self ):
+		return self.snapshot is not None or bool(self.commands)
+	
+	def popError( self ):
+		with self.condition:
+			error, self.error = self.error, None
+			return error
+	
+	def flush( self ):
+		''' Wait until everything pending is on the disk. '''
+		with self.condition:
+			self.flushing = True
+			self.condition.notify_all()
+			while self.isPending() or self.writing:
+				self.condition.wait()
+			self.flushing = False
+	
+	def close( self ):
+		''' Write everything pending and stop the thread. '''
+		with self.condition:
+			self.closing = True
+			self.condition.notify_all()
+		self.thread.join()
+	
+	def run( self ):
+		while 1:
+			with self.condition:
+				while 1:
+					if self.isPending():
+						if self.commands or self.flushing or self.closing:
+							break		# Commands are written right away.  Only a snapshot waits.
+						wait = min(self.tLast + DelaySeconds, self.tFirst + DelayMaxSeconds) - time.time()
+						if wait <= 0.0:
+							break
+						self.condition.wait( wait )
+					elif self.closing:
+						return
+					else:
+						self.condition.wait()
+				
+				snapshot, commands = self.snapshot, self.commands
+				self.snapshot, self.commands = None, []
+				self.tFirst = self.tLast = None
+				self.writing = True
+			
+			try:
+				self.write( snapshot, commands )
+			except (IOError, OSError) as e:
+				with self.condition:
+					self.failed = True
+					self.error = e
+			
+			with self.condition:
+				self.writing = False
+				self.condition.notify_all()
+	
+	def write( self, snapshot, commands ):
+		if snapshot is not None:
+			fileNameTmp = self.fileName + '.tmp'
+			with open(fileNameTmp, 'wb') as fp:
+				fp.write( snapshot )
+				fp.write( b''.join(commands) )
+				fp.flush()
+				os.fsync( fp.fileno() )
+			writeBackup( self.fileName )
+			replaceFile( fileNameTmp, self.fileName )
+			self.failed = False
+		elif commands and not self.failed:
+			with open(self.fileName, 'ab') as fp:
+				fp.write( b''.join(commands) )
+				fp.flush()
+				os.fsync( fp.fileno() )
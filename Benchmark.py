@@ -0,0 +1,301 @@
+import gc
+import sys
+import json
+import time
+import random
+import platform
+from optparse import OptionParser
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None		# Python 2 - no peak memory.
+try:
+	import resource
+except ImportError:
+	resource = None			# Windows - no max rss.
+
+import Model
+import Version
+import GridData
+from TestData import getRandomTestData
+from Competitions import getCompetitionFormats, SetDefaultData, DoRandomSimulation
+
+#------------------------------------------------------------------------------------------------
+# Benchmark the competition engine for every competition format, without a display.
+#
+# For each format, each repeat:
+#	SetDefaultData				create a model with random riders
+#	DoRandomSimulation			run the whole competition
+#	getCanStart					each Competition.getCanStart to choose the next event
+#	propagate					each Competition.propagate after a start's places are set
+#	getResults					getResults after the cache is reset
+#	getResults cached			getResults again
+#	getRelegationsWarnings		one call, averaged over every rider and event
+#	chartData					the Full Table grid
+#	resultsData					each choice of the Results page
+#
+# Large Field formats have one mass-start heat of LargeFieldRiders, then a final of the first half
+# (the Endurance Eliminator and XCE at a larger size).  Each start of each repeat:
+#	getStart					a start, and a restart with riders to start inside
+#	setStartPositions			the start positions in a random order
+#	setPlaces					the places in a random order
+#	getHeatPlaces				the heat places shown on the grids
+#	multiLine					the multi_line_* texts of the Events page
+#	propagate					Event.propagate and Competition.propagate
+#
+# Peak memory is measured in a separate pass so tracemalloc does not slow the timings.
+# Write the results with -o and compare another version's results with -c.
+#
+
+timer = getattr( time, 'perf_counter', time.time )
+
+Percentiles = (50, 90, 99)
+
+LargeFieldRiders = (200,)
+
+def percentile( values, p ):
+	''' Nearest-rank percentile of sorted values. '''
+	if not values:
+		return 0.0
+	return values[min(len(values) - 1, max(0, int(len(values) * p / 100.0 + 0.5) - 1))]
+
+class Timings( object ):
+	def __init__( self ):
+		self.ops = {}		# ops[op] = [seconds, ...]
+	
+	def add( self, op, seconds ):
+		self.ops.setdefault( op, [] ).append( seconds )
+	
+	def time( self, op, f, *args ):
+		tStart = timer()
+		result = f( *args )
+		self.add( op, timer() - tStart )
+		return result
+	
+	def getSummary( self ):
+		summary = {}
+		for op, values in self.ops.items():
+			values = sorted( values )
+			s = {
+				'count': len(values),
+				'mean': sum(values) / len(values),
+				'max': values[-1],
+			}
+			for p in Percentiles:
+				s['p{}'.format(p)] = percentile( values, p )
+			summary[op] = s
+		return summary
+
+def simulatePropagate( model, timings ):
+	''' The same as DoRandomSimulation, but times each Competition.propagate. '''
+	competition = model.competition
+	state = competition.state
+	while 1:
+		tse = timings.time( 'getCanStart', competition.getCanStart )
+		if not tse:
+			break
+		e = tse[0][2]
+		start = e.getStart()
+		places = [c for c in e.composition if state.inContention(c)]
+		v = (sum(state.labels[p].qualifyingTime for p in places) / float(len(places))) / 20.0
+		places.sort( key = lambda p: random.gauss(state.labels[p].qualifyingTime, v) )
+		start.setPlaces( [(state.labels[p].bib, '', '0', '0') for p in places] )
+		e.propagate()
+		timings.time( 'propagate', competition.propagate )
+
+def runFormat( name, seed, timings ):
+	''' Run every operation once on a new model.  Returns the model. '''
+	random.seed( seed )
+	model = timings.time( 'SetDefaultData', SetDefaultData, name, True )
+	timings.time( 'DoRandomSimulation', DoRandomSimulation, model )
+	
+	random.seed( seed )
+	model = SetDefaultData( name, True )
+	simulatePropagate( model, timings )
+	competition = model.competition
+	
+	competition.resetResults()
+	timings.time( 'getResults', competition.getResults )
+	timings.time( 'getResults cached', competition.getResults )
+	
+	competition.resetRelegationsWarnings()
+	events = [e for t, s, e in competition.allEvents()]
+	bibs = [r.bib for r in model.riders]
+	tStart = timer()
+	for e in events:
+		for bib in bibs:
+			competition.getRelegationsWarnings( bib, e, True )
+	timings.add( 'getRelegationsWarnings', (timer() - tStart) / max(1, len(events) * len(bibs)) )
+	
+	timings.time( 'chartData', GridData.getChartData, model )
+	for choice in GridData.getResultChoices( competition ):
+		timings.time( 'resultsData', GridData.getResultsData, model, choice )
+	return model
+
+def getLargeFieldName( riders ):
+	return 'Large Field {}'.format( riders )
+
+def getLargeFieldModel( riders ):
+	def gen( suffix, iStart, iEnd ):
+		return ' '.join( '{}{}'.format(i, suffix) for i in range(iStart, iEnd+1) )
+	
+	half = riders // 2
+	model = Model.Model()
+	model.competition = Model.Competition( getLargeFieldName(riders), [
+		Model.Tournament( '', [
+			Model.System( 'Heat', [
+				Model.Event( ' '.join('N{}'.format(i) for i in range(1, riders+1)) + ' -> ' + gen('A', 1, half) + ' ' + gen('R', half+1, riders), 1 ),
+			]),
+			Model.System( 'Final', [
+				Model.Event( gen('A', 1, half) + ' -> ' + gen('R', 1, half), 1 ),
+			]),
+		])
+	])
+	for bib, first_name, last_name, team, qt in getRandomTestData( riders ):
+		model.riders.append( Model.Rider(bib, first_name, last_name, team, qualifyingTime = qt) )
+	model.setQualifyingTimes()
+	return model
+
+def runLargeField( riders, seed, timings ):
+	''' Run every start of a Large Field format, with a restart in each event.  Returns the model. '''
+	random.seed( seed )
+	model = timings.time( 'SetDefaultData', getLargeFieldModel, riders )
+	competition = model.competition
+	state = competition.state
+	
+	def getPlaces( e, status = '' ):
+		places = [c for c in e.composition if state.inContention(c)]
+		random.shuffle( places )
+		return [(state.labels[p].bib, status if i % 10 == 0 else '', '0', '0') for i, p in enumerate(places)]
+	
+	while 1:
+		tse = competition.getCanStart()
+		if not tse:
+			break
+		e = tse[0][2]
+		
+		start = timings.time( 'getStart', e.getStart )
+		timings.time( 'setPlaces', start.setPlaces, getPlaces(e, 'Inside') )
+		start.restartRequired = True
+		competition.setStartsChanged( e )
+		
+		start = timings.time( 'getStart', e.getStart )
+		startPositions = [(state.labels[c].bib, '') for c in start.startPositions]
+		random.shuffle( startPositions )
+		timings.time( 'setStartPositions', start.setStartPositions, startPositions )
+		timings.time( 'setPlaces', start.setPlaces, getPlaces(e) )
+		
+		timings.time( 'getHeatPlaces', e.getHeatPlaces, 1 )
+		timings.time( 'multiLine', lambda: (e.multi_line_bibs, e.multi_line_rider_names, e.multi_line_rider_teams, e.multi_line_inlabels, e.multi_line_outlabels) )
+		timings.time( 'propagate', lambda: (e.propagate(), competition.propagate()) )
+	
+	competition.resetResults()
+	timings.time( 'getResults', competition.getResults )
+	timings.time( 'chartData', GridData.getChartData, model )
+	return model
+
+def getPeakMemory( run, *args ):
+	if tracemalloc is None:
+		return None
+	gc.collect()
+	tracemalloc.start()
+	try:
+		run( *args + (Timings(),) )
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def getMaxRss():
+	if resource is None:
+		return None
+	maxRss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+	return maxRss if sys.platform == 'darwin' else maxRss * 1024		# Linux reports KB.
+
+def benchmark( names = None, repeats = 20, seed = 1, log = None ):
+	''' Returns the benchmark results as a dict. '''
+	formats = [(name, starters, runFormat, name) for name, starters in getCompetitionFormats()]
+	formats.extend( (getLargeFieldName(riders), riders, runLargeField, riders) for riders in LargeFieldRiders )
+	formats = [f for f in formats if not names or any(n in f[0] for n in names)]
+	results = {
+		'version': Version.AppVerName,
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'repeats': repeats,
+		'seed': seed,
+		'formats': {},
+	}
+	for name, starters, run, arg in formats:
+		if log:
+			log.write( u'{}...\n'.format(name) )
+			log.flush()
+		timings = Timings()
+		for i in range(repeats):
+			run( arg, seed + i, timings )
+		results['formats'][name] = {
+			'starters': starters,
+			'peakMemory': getPeakMemory( run, arg, seed ),
+			'ops': timings.getSummary(),
+		}
+	results['maxRss'] = getMaxRss()
+	return results
+
+#------------------------------------------------------------------------------------------------
+
+def formatSeconds( secs ):
+	if secs >= 1.0:
+		return u'{:.2f}s'.format( secs )
+	if secs >= 0.001:
+		return u'{:.2f}ms'.format( secs * 1000.0 )
+	return u'{:.1f}us'.format( secs * 1000000.0 )
+
+def writeSummary( results, f = None ):
+	f = f or sys.stdout
+	f.write( u'{}  Python {}  {}  repeats={}\n'.format(results['version'], results['python'], results['platform'], results['repeats']) )
+	for name, r in sorted( results['formats'].items() ):
+		peak = r['peakMemory']
+		f.write( u'\n{} ({} starters){}\n'.format(name, r['starters'], u'  peak memory {:.1f} KB'.format(peak / 1024.0) if peak is not None else u'') )
+		f.write( u'    {:<24} {:>6} {:>10} {:>10} {:>10} {:>10}\n'.format('Operation', 'Count', 'p50', 'p90', 'p99', 'Max') )
+		for op, s in sorted( r['ops'].items() ):
+			f.write( u'    {:<24} {:>6} {:>10} {:>10} {:>10} {:>10}\n'.format(
+				op, s['count'], formatSeconds(s['p50']), formatSeconds(s['p90']), formatSeconds(s['p99']), formatSeconds(s['max'])) )
+	if results.get('maxRss'):
+		f.write( u'\nmax rss {:.1f} MB\n'.format(results['maxRss'] / (1024.0*1024.0)) )
+
+def writeComparison( results, baseline, f = None ):
+	''' Write the p50 of each operation relative to a baseline (>1.0 is slower). '''
+	f = f or sys.stdout
+	f.write( u'\nCompared to: {}  Python {}\n'.format(baseline['version'], baseline['python']) )
+	for name, r in sorted( results['formats'].items() ):
+		b = baseline['formats'].get( name )
+		if not b:
+			continue
+		f.write( u'{}\n'.format(name) )
+		for op, s in sorted( r['ops'].items() ):
+			bs = b['ops'].get( op )
+			if bs and bs['p50']:
+				f.write( u'    {:<24} {:>10} -> {:>10}  {:.2f}x\n'.format(op, formatSeconds(bs['p50']), formatSeconds(s['p50']), s['p50'] / bs['p50']) )
+
+if __name__ == '__main__':
+	parser = OptionParser( usage = "usage: %prog [options]" )
+	parser.add_option("-f", "--format", action="append", dest="formats", default=[], help="competition format name or part of it (repeat for more, default: all)")
+	parser.add_option("-n", "--repeats", dest="repeats", type="int", default=20, help="repeats per format")
+	parser.add_option("-s", "--seed", dest="seed", type="int", default=1, help="random seed")
+	parser.add_option("-o", "--output", dest="output", default=None, help="write the results to this json file")
+	parser.add_option("-c", "--compare", dest="compare", default=None, help="compare to the results in this json file")
+	parser.add_option("-l", "--list", action="store_true", dest="list", default=False, help="list the competition formats")
+	(options, args) = parser.parse_args()
+	
+	if options.list:
+		for i, (name, starters) in enumerate(getCompetitionFormats()):
+			print ( '{}. {} ({} Starters)'.format(i+1, name, starters) )
+		sys.exit( 0 )
+	
+	results = benchmark( options.formats, options.repeats, options.seed, sys.stderr )
+	writeSummary( results )
+	if options.compare:
+		with open(options.compare, 'r') as fp:
+			writeComparison( results, json.load(fp) )
+	if options.output:
+		with open(options.output, 'w') as fp:
+			json.dump( results, fp, indent = 1, sort_keys = True )
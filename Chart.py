@@ -8,7 +8,8 @@ import Utils
 from ReorderableGrid import ReorderableGrid, GridCellMultiLineStringRenderer
 from Competitions import SetDefaultData
 import Model
-from Utils import WriteCell
+import GridData
+from GridDataTable import GridDataTable
 from Events import GetFont
 
 class Chart(wx.Panel):
@@ -36,8 +37,8 @@ class Chart(wx.Panel):
 		self.grid.DisableDragRowSize()
 		self.grid.SetRowLabelSize( 0 )
 		self.grid.EnableReorderRows( False )
-		self.grid.CreateGrid( 0, len(self.headerNames) )
-		self.setColNames()
+		self.table = GridDataTable()
+		self.grid.SetTable( self.table, True )
 		
 		# Set a larger font for the table.
 		# Set specialized editors for appropriate columns.
@@ -59,20 +60,6 @@ class Chart(wx.Panel):
 		model.chartShowTeams = self.showTeams.GetValue()
 		self.refresh()
 	
-	def getHideCols( self, headerNames ):
-		model = Model.model
-		toHide = set()
-		for col, h in enumerate(headerNames):
-			if h == 'Name' and not getattr(model, 'chartShowNames', True):
-				toHide.add( col )
-			elif h == 'Team' and not getattr(model, 'chartShowTeams', True):
-				toHide.add( col )
-		return toHide
-	
-	def setColNames( self ):
-		for col, headerName in enumerate(self.headerNames):
-			self.grid.SetColLabelValue( col, headerName )
-						
 	def getGrid( self ):
 		return self.grid
 		
@@ -86,14 +73,11 @@ class Chart(wx.Panel):
 		
 		font = GetFont()
 
-		self.headerNames = ['', 'System', 'Event', 'Heats', 'In', 'Bib', 'Name', 'Team', 'H1', 'H2', 'H3', 'Out', 'Bib', 'Name', 'Team']
-		hideCols = self.getHideCols( self.headerNames )
-		self.headerNames = [h for c, h in enumerate(self.headerNames) if c not in hideCols]
-		Utils.AdjustGridSize( self.grid, rowsRequired = sum(1 for t,s,e in competition.allEvents()), colsRequired = len(self.headerNames) )
-		self.grid.ClearGrid()
-		self.setColNames()
+		data = GridData.getChartData( model )
+		self.headerNames = data.headerNames
 		
-		for col in six.moves.range(self.grid.GetNumberCols()):
+		colAttrs = []
+		for col in six.moves.range(len(self.headerNames)):
 			attr = gridlib.GridCellAttr()
 			attr.SetFont( font )
 			attr.SetReadOnly( True )
@@ -103,45 +87,9 @@ class Chart(wx.Panel):
 				attr.SetAlignment( wx.ALIGN_CENTRE, wx.ALIGN_TOP )
 			elif self.headerNames[col].startswith( 'H' ):
 				attr.SetAlignment( wx.ALIGN_CENTRE, wx.ALIGN_TOP )
-			self.grid.SetColAttr( col, attr )
+			colAttrs.append( attr )
 		
-		row = 0
-		for tournament in competition.tournaments:
-			self.grid.SetCellValue( row, 0, tournament.name )
-			for system in tournament.systems:
-				self.grid.SetCellValue( row, 1, system.name )
-				for i, event in enumerate(system.events):
-					writeCell = WriteCell( self.grid, row, 2 )
-					
-					writeCell( u'{}'.format(i+1) )
-					writeCell(u' {}'.format(event.heatsMax) )
-					writeCell( u'\n'.join(event.composition).replace(u'\n',u' ({})\n'.format(len(event.composition)),1) )
-					
-					riders = [state.labels.get(c, None) for c in event.composition]
-					writeCell( u'\n'.join([u'{}'.format(rider.bib if rider.bib else u'') if rider else '' for rider in riders]) )
-					if getattr(model, 'chartShowNames', True):
-						writeCell( u'\n'.join([rider.full_name if rider else u'' for rider in riders]) )
-					if getattr(model, 'chartShowTeams', True):
-						writeCell( u'\n'.join([rider.team if rider else u'' for rider in riders]) )
-					
-					for heat in six.moves.range(3):
-						if event.heatsMax > 1:
-							writeCell( u'\n'.join(event.getHeatPlaces(heat+1)) )
-						else:
-							writeCell( u'' )
-					
-					out = [event.winner] + event.others
-					writeCell( u'\n'.join(out).replace(u'\n',u' ({})\n'.format(len(out)),1) )
-					riders = [state.labels.get(c, None) for c in out]
-					writeCell( u'\n'.join([u'{}'.format(rider.bib if rider.bib else '') if rider else '' for rider in riders]) )
-					if getattr(model, 'chartShowNames', True):
-						writeCell( '\n'.join([rider.full_name if rider else '' for rider in riders]) )
-					if getattr(model, 'chartShowTeams', True):
-						writeCell( '\n'.join([rider.team if rider else '' for rider in riders]) )
-					row += 1
-					
-		self.grid.AutoSizeColumns( False )
-		self.grid.AutoSizeRows( False )
+		self.table.setData( self.grid, data, colAttrs )
 		
 	def commit( self ):
 		pass
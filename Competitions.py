@@ -5,8 +5,8 @@ import Model
 from TestData import getTestData, getRandomTestData
 import copy
 
-def getCompetitions():
-	competitions = [
+def makeCompetitions():
+	''' Generates the competition formats in order.  Each format is built when it is reached. '''
 #		Competition( 'Track: Sprint World Cup', [
 #			Tournament( '', [
 #				System( '1/8 Finals', [
@@ -55,6 +55,7 @@ def getCompetitions():
 #			]),
 #		]),
 		
+	yield (
 		Competition( 'Track: Sprint World Cup and World Championships', [
 			Tournament( '', [
 				System( '1/16 Finals', [
@@ -101,8 +102,10 @@ def getCompetitions():
 					Event( '1E2 2E2 -> 3R 4R', 3 ),
 				]),
 			])
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint Olympic Games', [
 			Tournament( '', [
 				System( '1/16 Finals', [
@@ -152,8 +155,10 @@ def getCompetitions():
 					Event( '1G2 2G2 -> 3R 4R', 3 ),
 				]),
 			]),
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint 1/2 World Championships', [
 			Tournament( '', [
 				System( '1/8 Finals', [
@@ -186,8 +191,10 @@ def getCompetitions():
 					Event( '1E2 2E2 -> 3R 4R', 3 ),
 				]),
 			])
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint 1/2 Former World Cup', [
 			Tournament( '', [
 				System( '1/4 Finals', [
@@ -208,8 +215,10 @@ def getCompetitions():
 					Event( '1C2 2C2 -> 3R 4R', 3 )
 				]),
 			])
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint 1/2 Finals + 2', [
 			Tournament( '', [
 				System( '5-6 Final', [
@@ -224,8 +233,10 @@ def getCompetitions():
 					Event( '1C2 2C2 -> 3R 4R', 3 )
 				]),
 			])
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint 1/2 Finals', [
 			Tournament( '', [
 				System( '1/2 Finals', [
@@ -237,19 +248,21 @@ def getCompetitions():
 					Event( '1C2 2C2 -> 3R 4R', 3 )
 				]),
 			])
-		]),
+		])
+	)
 		
+	yield (
 		Competition( 'Track: Sprint Direct Finals', [
 			Tournament( '', [
 				System( 'Finals', [
 					Event( 'N1 N2 -> 1R 2R', 3 ),
 				]),
 			])
-		]),
-	]
+		])
+	)
 	
 	#-----------------------------------------------------------------------------------------
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 12-14', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -265,7 +278,7 @@ def getCompetitions():
 			])
 		])
 	)
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 15-20', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -290,7 +303,7 @@ def getCompetitions():
 			])
 		])
 	)
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 21', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -316,7 +329,7 @@ def getCompetitions():
 			])
 		])
 	)
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 22-28', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -344,7 +357,7 @@ def getCompetitions():
 			])
 		])
 	)
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 29-42', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -376,7 +389,7 @@ def getCompetitions():
 			])
 		])
 	)
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 43-49', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -419,7 +432,7 @@ def getCompetitions():
 		])
 	)
 	'''
-	competitions.append(
+	yield (
 		Competition( 'Track: Keirin 50-56', [
 			Tournament( '', [
 				System( '1st Round', [
@@ -468,7 +481,7 @@ def getCompetitions():
 	'''
 
 	#-----------------------------------------------------------------------------------------
-	competitions.append(
+	yield (
 		Competition( 'MTB: XCE 36', [
 			Tournament( '', [
 				System( 'Round 1', [
@@ -492,7 +505,7 @@ def getCompetitions():
 	)
 	
 	#-----------------------------------------------------------------------------------------
-	competitions.append(
+	yield (
 		Competition( 'MTB: XCE 12', [
 			Tournament( '', [
 				System( '1/2 Finals', [
@@ -508,7 +521,7 @@ def getCompetitions():
 	)
 	
 	#-----------------------------------------------------------------------------------------
-	competitions.append(
+	yield (
 		Competition( 'MTB: XCE 32', [
 			Tournament( '', [
 				System( '1/8 Finals', [
@@ -541,7 +554,7 @@ def getCompetitions():
 
 	#-----------------------------------------------------------------------------------------
 	# Code the round and rank of the eliminated riders in the RR codes as the last values.
-	competitions.append(
+	yield (
 		Competition( 'MTB: XCE 16', [
 			Tournament( '', [
 				System( '1/4 Finals', [
@@ -562,7 +575,7 @@ def getCompetitions():
 		])
 	)
 	
-	competitions.append(
+	yield (
 		Competition( 'MTB: XCE 8', [
 			Tournament( '', [
 				System( '1/2 Finals', [
@@ -578,7 +591,7 @@ def getCompetitions():
 	)
 	
 	#-----------------------------------------------------------------------------------------
-	competitions.append(
+	fourCross = [
 		Competition( 'MTB: Four Cross 64', [
 			Tournament( '', [
 				System( 'Round 1', [
@@ -625,11 +638,11 @@ def getCompetitions():
 				]),
 			])
 		]),
-	)
+	]
 	
 	# Derive Four Cross for 32 and 16 starters from 64 starters.
 	for i in six.moves.range(2):
-		fcX = copy.deepcopy( competitions[-1] )
+		fcX = copy.deepcopy( fourCross[-1] )
 		fcX.tournaments[0].systems.pop( 0 )
 		fcX.starters //= 2
 		fcX.name = 'MTB: Four Cross %d' % fcX.starters
@@ -638,7 +651,10 @@ def getCompetitions():
 		for system in fcX.tournaments[0].systems:
 			if system.name.startswith( 'Round' ):
 				system.name = 'Round %d' % (int(system.name.split()[1]) - 1)
-		competitions.append( fcX )
+		fcX.setIndexes()
+		fourCross.append( fcX )
+	for fc in fourCross:
+		yield fc
 	
 	#-----------------------------------------------------------------------------------------
 	def genN( iStart, iEnd, stride=1 ):
@@ -647,7 +663,7 @@ def getCompetitions():
 	def gen( suffix, iStart, iEnd, stride=1 ):
 		return ' '.join( '{}{}'.format(i, suffix) for i in six.moves.range(iStart, iEnd+1, stride) )
 	
-	competitions.append(
+	yield (
 		Competition( 'Track: Track Endurance Eliminator', [
 			Tournament( '', [
 				System( 'Round 1', [
@@ -681,24 +697,64 @@ def getCompetitions():
 					Event( gen('D',1,24) + ' -> ' + gen('R',1,24), 1 ),
 				]),
 			])
-		]),
+		])
 	)
-	return competitions
+
+competitionTemplates = []		# The formats built so far, in order.
+competitionMaker = None
+def iterCompetitionTemplates():
+	''' Yields the competition formats in order, building each one the first time it is reached.
+		The templates must never be changed - use copies. '''
+	global competitionMaker
+	i = 0
+	while 1:
+		if i == len(competitionTemplates):
+			if competitionMaker is None:
+				competitionMaker = makeCompetitions()
+			try:
+				competitionTemplates.append( next(competitionMaker) )
+			except StopIteration:
+				return
+		yield competitionTemplates[i]
+		i += 1
+
+def getCompetitionTemplates():
+	''' Build all the competition formats once. '''
+	return list( iterCompetitionTemplates() )
+
+def getCompetitionFormats():
+	''' Returns [(name, starters), ...] of all formats without copying anything. '''
+	return [(c.name, c.starters) for c in getCompetitionTemplates()]
+
+def getCompetition( name ):
+	''' Returns a fresh competition of the format with the given name. '''
+	for c in iterCompetitionTemplates():
+		if c.name == name:
+			return c.copyFormat()
+	raise KeyError( name )
+
+def getCompetitions():
+	return [c.copyFormat() for c in getCompetitionTemplates()]
+
+def findCompetitionTemplate( name ):
+	# Only builds the formats up to an exact match.
+	for c in iterCompetitionTemplates():
+		if c.name == name:
+			return c
+	templates = getCompetitionTemplates()
+	for c in templates:
+		if name in c.name:
+			return c
+	return templates[0]
 
 def SetDefaultData( name = None, random = False ):
 	if not name:
-		name = 'World Championships'
+		name = 'Track: Sprint World Cup and World Championships'
 		
 	model = Model.Model()
-	for i, competition in enumerate(getCompetitions()):
-		if i == 0:
-			model.competition = competition
-			
-		if name in competition.name:
-			model.competition = competition
-			break
+	model.competition = findCompetitionTemplate( name ).copyFormat()
 	
-	testData = getRandomTestData( competition.starters ) if random else getTestData()
+	testData = getRandomTestData( model.competition.starters ) if random else getTestData()
 	for bib, first_name, last_name, team, qt in testData:
 		rider = Model.Rider( bib, first_name, last_name, team, qualifyingTime = qt )
 		model.riders.append( rider )
@@ -725,4 +781,4 @@ def DoRandomSimulation( model = None ):
 		competition.propagate()
 
 if __name__ == '__main__':
-	getCompetitions()
+	getCompetitionTemplates()
@@ -7,6 +7,8 @@ import sys
 import six
 import Utils
 import Model
+import Journal
+import Spans
 from ReorderableGrid import ReorderableGrid, GridCellMultiLineStringRenderer
 from roundbutton import RoundButton
 from Competitions import SetDefaultData
@@ -174,12 +176,7 @@ class RestartDialog( wx.Dialog ):
 			relegation = self.grid.GetCellValue( row, self.iColRelegation )
 			places.append( (bib, status, warning, relegation) )
 		
-		start = self.event.starts[-1]
-		start.setPlaces( places )
-		start.restartRequired = True
-		self.event.propagate()
-		Model.model.competition.propagate()
-		Model.model.setChanged( True )
+		Journal.execute( 'restart', self.event, places )
 		Utils.setTitle()
 		
 	def onOK( self, event ):
@@ -268,8 +265,8 @@ class EventSelect(EnablePanel):
 		if not model:
 			return
 			
-		self.events = [e for t, s, e in model.competition.getCanStart()]
-		self.events.sort( key = lambda e: (0 if e == self.event else 1, e.tournament.i, e.system.i, e.getHeat(), e.i) )
+		self.events = [e for t, s, e in model.competition.getUpcoming()]
+		self.events.sort( key = lambda e: 0 if e == self.event else 1 )		# Keep the selected event first.
 			
 		Utils.AdjustGridSize( self.grid, rowsRequired = len(self.events) )
 		for row, e in enumerate(self.events):
@@ -423,10 +420,7 @@ class EventPosition(EnablePanel):
 				CacheDNSs.discard( bib )
 			startPositions.append( (bib, '') )
 		
-		start = self.event.starts[-1]
-		start.setStartPositions( startPositions )
-		
-		Model.model.setChanged( True )
+		Journal.execute( 'setStartPositions', self.event, startPositions )
 		Utils.setTitle()
 
 class EventOutcome(EnablePanel):
@@ -687,10 +681,12 @@ class EventFinishOrder(EnablePanel):
 		newBibs = set( newBibOrder )
 		newBibOrder.extend( b for b in oldBibOrder if b not in newBibs )
 		
+		bibRow = { bib: row for row, bib in enumerate(oldBibOrder) }
 		for row, bib in enumerate(newBibOrder):
 			if oldBibOrder[row] != bib:
-				i = oldBibOrder.index( bib )
+				i = bibRow[bib]
 				oldBibOrder[i], oldBibOrder[row] = oldBibOrder[row], oldBibOrder[i]
+				bibRow[oldBibOrder[i]], bibRow[bib] = i, row
 				Utils.SwapGridRows( self.grid, row, i )
 	
 	def setEvent( self, event ):
@@ -750,13 +746,7 @@ class EventFinishOrder(EnablePanel):
 				continue
 			times.append( (row+1, t) )
 		
-		start = self.event.starts[-1]
-		start.setPlaces( places )
-		start.setTimes( times )
-		
-		self.event.propagate()
-		Model.model.setChanged( True )
-		Model.model.competition.propagate()
+		Journal.execute( 'setPlaces', self.event, places, times )
 		Utils.setTitle()
 		
 class Events(wx.Panel):
@@ -797,6 +787,7 @@ class Events(wx.Panel):
 		return self.eventSelect.grid
 		
 	#-------------------------------------------------------------------------
+	@Spans.timed( 'Events.doEventSelectSelect' )
 	def doEventSelectSelect( self, e ):
 		CacheDNSs.clear()
 		if not self.eventSelect.grid.GetNumberRows():
@@ -805,23 +796,23 @@ class Events(wx.Panel):
 		if not selectedRows:
 			return
 		event = self.eventSelect.events[selectedRows[0]]
-		event.getStart()
+		Journal.execute( 'getStart', event, None, None )
 		self.eventSelect.event = event
 		self.eventPosition.event = event
 		self.eventResult.event = None
 		self.event = event
-		Model.model.setChanged( True )
 		Utils.setTitle()
 		self.setState( 1 )
 		
 	#-------------------------------------------------------------------------
+	@Spans.timed( 'Events.doEventPositionStart' )
 	def doEventPositionStart( self, e ):
 		self.eventPosition.commit()
 		self.setState( 2 )
 		
+	@Spans.timed( 'Events.doEventPositionCancel' )
 	def doEventPositionCancel( self, e ):
-		del( self.event.starts[-1] )
-		Model.model.setChanged( True )
+		Journal.execute( 'deleteStart', self.event )
 		Utils.setTitle()
 		self.reset()
 		
@@ -833,10 +824,10 @@ class Events(wx.Panel):
 	def doEventOutcomeRestart( self, e ):
 		self.restartDialog.refresh( self.event )
 		if self.restartDialog.ShowModal() == wx.ID_OK:
-			self.event.getStart()
-			Model.model.setChanged( True )
-			Utils.setTitle()
-			self.setState( 1 )
+			with Spans.span( 'Events.doEventOutcomeRestart' ):	# Not the time in the dialog.
+				Journal.execute( 'getStart', self.event, None, None )
+				Utils.setTitle()
+				self.setState( 1 )
 		
 	def doEventOutcomeCancel( self, e ):
 		self.setState( 1 )
@@ -845,10 +836,10 @@ class Events(wx.Panel):
 	def doEventResultOK( self, e ):
 		self.resultConfirmDialog.refresh( self.eventResult.grid )
 		if self.resultConfirmDialog.ShowModal() == wx.ID_OK:
-			self.eventResult.commit()
-			Model.model.setChanged( True )
-			Utils.setTitle()
-			self.reset()
+			with Spans.span( 'Events.doEventResultOK' ):	# Not the time in the dialog.
+				self.eventResult.commit()
+				Utils.setTitle()
+				self.reset()
 		
 	def doEventResultCancel( self, e ):
 		self.eventResult.event = None
@@ -1,23 +1,59 @@
 from __future__ import print_function
 
+import re
 import xlrd
 import xml.etree.ElementTree
 import os
 import six
 import math
+import zipfile
+import datetime
 import itertools
 import unicodedata
 
 def toAscii( s ):
 	if not s:
 		return ''
-	s = u'{}'.format(s).encode('ascii', 'ignore').decode()
+	ret = u'{}'.format(s).encode('ascii', 'ignore').decode()
 	if ret.endswith( '.0' ):
 		ret = ret[:-2]
 	return ret
 
 #----------------------------------------------------------------------------
 
+def excelDateValue( value, datemode, date_as_tuple ):
+	''' Convert an Excel date or time number to a time string, a date string or a datetuple. '''
+	if isinstance(value, float) and value < 1.0:
+		t = value * (24.0*60.0*60.0)
+		if int(t + 0.000001) == int(t+1.0):
+			secs = int(t + 0.000001)
+			fract = 0.0
+		else:
+			fract, secs = math.modf( t )
+			if fract < 0.000000001:
+				fract = 0.0
+			secs = int(secs)
+		if fract:
+			return '%02d:%02d:%02d.%s' % ( secs // (60*60), (secs // 60) % 60, secs % 60, ('%.20f'%fract)[2:])
+		return '%02d:%02d:%02d' % (secs // (60*60), (secs // 60) % 60, secs % 60)
+	
+	try:
+		datetuple = xlrd.xldate_as_tuple(value, datemode)
+	except:
+		return 'UnreadableDate'
+	if date_as_tuple:
+		return datetuple
+	# time only - no date component
+	if datetuple[0] == 0 and datetuple[1] == 0 and  datetuple[2] == 0:
+		return "%02d:%02d:%02d" % datetuple[3:]
+	# date only, no time
+	elif datetuple[3] == 0 and datetuple[4] == 0 and datetuple[5] == 0:
+		return "%04d/%02d/%02d" % datetuple[:3]
+	else: # full date
+		return "%04d/%02d/%02d %02d:%02d:%02d" % datetuple
+
+#----------------------------------------------------------------------------
+
 class ReadExcelXls( object ):
 	def __init__(self, filename):
 		if not os.path.isfile(filename):
@@ -33,8 +69,8 @@ class ReadExcelXls( object ):
 	def sheet_names( self ):
 		return self.book.sheet_names()
 		
-	def _parse_row(self, sheet, row_index, date_as_tuple):
-		""" Sanitize incoming excel data """
+	def _parse_row(self, sheet, row_index, date_as_tuple, cols=None):
+		""" Sanitize incoming excel data.  If cols is given, the other columns are left as ''. """
 		# Data Type Codes:
 		#  EMPTY 0
 		#  TEXT 1 a Unicode string
@@ -43,57 +79,175 @@ class ReadExcelXls( object ):
 		#  BOOLEAN 4 int; 1 means TRUE, 0 means FALSE
 		#  ERROR 5
 		values = []
-		for type, value in zip(sheet.row_types(row_index), sheet.row_values(row_index)):
-			if type == 2:
+		for col, (type, value) in enumerate(zip(sheet.row_types(row_index), sheet.row_values(row_index))):
+			if cols is not None and col not in cols:
+				value = ''
+			elif type == 2:
 				if value == int(value):
 					value = int(value)
 			elif type == 3:
-				if isinstance(value, float) and value < 1.0:
-					t = value * (24.0*60.0*60.0)
-					if int(t + 0.000001) == int(t+1.0):
-						secs = int(t + 0.000001)
-						fract = 0.0
-					else:
-						fract, secs = math.modf( t )
-						if fract < 0.000000001:
-							fract = 0.0
-						secs = int(secs)
-					if fract:
-						value = '%02d:%02d:%02d.%s' % ( secs // (60*60), (secs // 60) % 60, secs % 60, ('%.20f'%fract)[2:])
-					else:
-						value = '%02d:%02d:%02d' % (secs // (60*60), (secs // 60) % 60, secs % 60)
-				else:
-					try:
-						datetuple = xlrd.xldate_as_tuple(value, self.book.datemode)
-						validDate = True
-					except:
-						value = 'UnreadableDate'
-						validDate = False
-					if validDate:
-						if date_as_tuple:
-							value = datetuple
-						else:
-							# time only - no date component
-							if datetuple[0] == 0 and datetuple[1] == 0 and  datetuple[2] == 0:
-								value = "%02d:%02d:%02d" % datetuple[3:]
-							# date only, no time
-							elif datetuple[3] == 0 and datetuple[4] == 0 and datetuple[5] == 0:
-								value = "%04d/%02d/%02d" % datetuple[:3]
-							else: # full date
-								value = "%04d/%02d/%02d %02d:%02d:%02d" % datetuple
+				value = excelDateValue( value, self.book.datemode, date_as_tuple )
 			elif type == 5:
 				value = xlrd.error_text_from_code[value]
 			values.append(value)
 		return values
 		
-	def iter_list(self, sname, date_as_tuple=False):
+	def iter_list(self, sname, date_as_tuple=False, cols=None):
 		sheet = self.book.sheet_by_name(sname) # XLRDError
 		for i in range(sheet.nrows):
-			yield self._parse_row(sheet, i, date_as_tuple)
+			yield self._parse_row(sheet, i, date_as_tuple, cols)
 
 #----------------------------------------------------------------------------
 
-ReadExcelXlsx = ReadExcelXls
+class ReadExcelXlsx( object ):
+	''' Read-only .xlsx reader.  Rows are parsed from the sheet xml as they are read. '''
+	
+	NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+	NSRel = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+	NSPackageRel = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+	
+	# Built-in number formats that are dates or times.
+	DateFormatIds = set( range(14, 23) ) | set( range(45, 48) )
+	
+	def __init__(self, filename):
+		if not os.path.isfile(filename):
+			raise ValueError("%s is not a valid filename" % filename)
+		try:
+			self.zf = zipfile.ZipFile( filename )
+			self._read_workbook()
+		except (zipfile.BadZipfile, KeyError, xml.etree.ElementTree.ParseError) as e:
+			raise ValueError("%s is not a valid xlsx file (%s)" % (filename, e))
+		self.shared_strings = None		# Read the first time a sheet is read.
+		self.date_styles = None
+	
+	def _parse( self, name ):
+		with self.zf.open( name ) as f:
+			return xml.etree.ElementTree.parse( f ).getroot()
+	
+	def _read_workbook( self ):
+		workbook = self._parse( 'xl/workbook.xml' )
+		workbookPr = workbook.find( self.NS + 'workbookPr' )
+		self.datemode = 1 if workbookPr is not None and workbookPr.get('date1904', '0').lower() in ('1', 'true') else 0
+		
+		targets = {}
+		for rel in self._parse( 'xl/_rels/workbook.xml.rels' ).iter( self.NSPackageRel + 'Relationship' ):
+			target = rel.get( 'Target' )
+			targets[rel.get('Id')] = target[1:] if target.startswith('/') else 'xl/' + target
+		
+		self.sheet_files = []			# [(sheet name, file name in the zip)]
+		for sheet in workbook.iter( self.NS + 'sheet' ):
+			self.sheet_files.append( (sheet.get('name'), targets[sheet.get(self.NSRel + 'id')]) )
+	
+	def _get_text( self, e ):
+		# Rich text is in runs.  Ignore the phonetic runs.
+		t = e.find( self.NS + 't' )
+		if t is not None:
+			return t.text or u''
+		return u''.join( t.text or u'' for r in e.iter(self.NS + 'r') for t in r.iter(self.NS + 't') )
+	
+	def _read_shared_strings( self ):
+		self.shared_strings = []
+		try:
+			f = self.zf.open( 'xl/sharedStrings.xml' )
+		except KeyError:
+			return
+		with f:
+			for event, e in xml.etree.ElementTree.iterparse( f ):
+				if e.tag == self.NS + 'si':
+					self.shared_strings.append( self._get_text(e) )
+					e.clear()
+	
+	def _read_date_styles( self ):
+		''' Find the cell styles with a date or time number format. '''
+		self.date_styles = set()
+		try:
+			styles = self._parse( 'xl/styles.xml' )
+		except KeyError:
+			return
+		dateFormatIds = set( self.DateFormatIds )
+		numFmts = styles.find( self.NS + 'numFmts' )
+		if numFmts is not None:
+			for numFmt in numFmts.iter( self.NS + 'numFmt' ):
+				code = re.sub( r'"[^"]*"|\[[^]]*\]|\\.', '', numFmt.get('formatCode', '') ).lower()
+				if any( c in code for c in 'dmyhs' ):
+					dateFormatIds.add( int(numFmt.get('numFmtId')) )
+		cellXfs = styles.find( self.NS + 'cellXfs' )
+		if cellXfs is not None:
+			for i, xf in enumerate(cellXfs.iter(self.NS + 'xf')):
+				if int(xf.get('numFmtId', 0)) in dateFormatIds:
+					self.date_styles.add( str(i) )
+	
+	def sheet_names( self ):
+		return [name for name, fname in self.sheet_files]
+	
+	@staticmethod
+	def _col_index( ref ):
+		col = 0
+		for c in ref:
+			if c.isdigit():
+				break
+			col = col * 26 + ord(c.upper()) - ord('A') + 1
+		return col - 1
+	
+	def _parse_cell( self, c, date_as_tuple ):
+		t = c.get( 't', 'n' )
+		if t == 'inlineStr':
+			e = c.find( self.NS + 'is' )
+			return self._get_text( e ) if e is not None else u''
+		v = c.find( self.NS + 'v' )
+		if v is None or v.text is None:
+			return ''
+		v = v.text
+		if t == 's':
+			return self.shared_strings[int(v)]
+		if t == 'n':
+			value = float( v )
+			if c.get('s') in self.date_styles:
+				return excelDateValue( value, self.datemode, date_as_tuple )
+			return int(value) if value == int(value) else value
+		if t == 'b':
+			return int(v)
+		return v	# str (formula result), e (error text), d (ISO date)
+	
+	def iter_list(self, sname, date_as_tuple=False, cols=None):
+		''' Yields the rows of the sheet.  If cols is given, only those columns are converted and the others are ''. '''
+		try:
+			fname = next( fname for name, fname in self.sheet_files if name == sname )
+		except StopIteration:
+			raise ValueError( 'No sheet named "%s"' % sname )
+		if self.shared_strings is None:
+			self._read_shared_strings()
+		if self.date_styles is None:
+			self._read_date_styles()
+		
+		tagRow = self.NS + 'row'
+		tagCell = self.NS + 'c'
+		tagDimension = self.NS + 'dimension'
+		width = 0
+		iRow = 0
+		with self.zf.open( fname ) as f:
+			for event, e in xml.etree.ElementTree.iterparse( f ):
+				if e.tag == tagDimension:
+					# The sheet's used range, for example A1:G2000.  Pad the rows to the same width like xlrd.
+					width = self._col_index( e.get('ref', 'A1').split(':')[-1] ) + 1
+				elif e.tag == tagRow:
+					r = e.get( 'r' )
+					if r:
+						while iRow < int(r) - 1:		# Missing rows are empty.
+							yield [''] * width
+							iRow += 1
+					values = []
+					for c in e.iter(tagCell):
+						ref = c.get( 'r' )
+						col = self._col_index( ref ) if ref else len(values)
+						if len(values) < col:
+							values.extend( [''] * (col - len(values)) )
+						values.append( self._parse_cell(c, date_as_tuple) if cols is None or col in cols else '' )
+					if len(values) < width:
+						values.extend( [''] * (width - len(values)) )
+					yield values
+					iRow += 1
+					e.clear()
 
 #----------------------------------------------------------------------------
 
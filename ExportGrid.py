@@ -1,27 +1,18 @@
 import wx
+import io
 import os
+import re
 import six
 import xlwt
 import Utils
 import Model
 import math
-import cgi
 import base64
-from FitSheetWrapper import FitSheetWrapper
-from contextlib import contextmanager
+import arial10
+from HtmlWriter import tag, escape, htmlDocument, writeHtmlBrand, writeHtmlRows, RightJustifyCols
 
 #---------------------------------------------------------------------------
 
-@contextmanager
-def tag( buf, name, attrs = {} ):
-	if isinstance(attrs, six.string_types) and attrs:
-		attrs = { 'class': attrs }
-	buf.write( u'<{}>'.format( u' '.join(
-			[name] + [u'{}="{}"'.format(attr, value) for attr, value in six.iteritems(attrs)]
-		) ) )
-	yield
-	buf.write( u'</{}>\n'.format(name) )
-
 brandText = u'Powered by SprintMgr (sites.google.com/site/crossmgrsoftware)'
 
 def getHeaderFName():
@@ -51,7 +42,17 @@ def getHeaderBitmap():
 	
 	return wx.Bitmap( os.path.join(Utils.getImageFolder(), 'SprintMgr.png'), wx.BITMAP_TYPE_PNG )
 
-def writeHtmlHeader( buf, title ):
+def getImagePng( image ):
+	''' Returns a wx.Image encoded as png, without a temporary file. '''
+	stream = io.BytesIO()
+	image.SaveFile( stream, wx.BITMAP_TYPE_PNG )
+	return stream.getvalue()
+
+def getPngDataUri( png ):
+	return u'data:image/png;base64,{}'.format( base64.b64encode(png).decode('ascii') )
+
+def writeHtmlHeader( buf, title, headerSrc = None ):
+	''' Write the header graphic and the title.  The graphic is embedded unless headerSrc is given. '''
 	buf.write( '<style>\n' )
 	buf.write( 'td { vertical-align: top; }\n')
 	buf.write( 'th { vertical-align: top; }\n')
@@ -59,19 +60,129 @@ def writeHtmlHeader( buf, title ):
 	with tag(buf, 'table', {'class': 'TitleTable'} ):
 		with tag(buf, 'tr'):
 			with tag(buf, 'td', dict(valign='top')):
-				data = base64.b64encode(open(getHeaderFName(),'rb').read())
-				buf.write( '<img id="idImgHeader" src="data:image/png;base64,%s" />' % data )
+				if not headerSrc:
+					with open(getHeaderFName(), 'rb') as fp:
+						headerSrc = getPngDataUri( fp.read() )
+				buf.write( u'<img id="idImgHeader" src="{}" />'.format(headerSrc) )
 			with tag(buf, 'td'):
 				buf.write( '&nbsp;&nbsp;&nbsp;&nbsp;' )
 			with tag(buf, 'td'):
 				with tag(buf, 'span', {'id': 'idRaceName'}):
-					buf.write( cgi.escape(title).replace('\n', '<br/>\n') )
+					buf.write( escape(title).replace('\n', '<br/>\n') )
 				if Model.model.organizer:
 					with tag(buf, 'br'):
 						pass
 					with tag(buf, 'span', {'id': 'idOrganizer'}):
 						buf.write( 'by ' )
-						buf.write( cgi.escape(Model.model.organizer) )
+						buf.write( escape(Model.model.organizer) )
+
+def writeHtmlTable( buf, title, colnames, rows, headerSrc = None ):
+	''' Write the title, the colnames and the rows as an html results table.  The rows can be a generator. '''
+	writeHtmlHeader( buf, title, headerSrc )
+	writeHtmlRows( buf, colnames, rows, RightJustifyCols )
+	writeHtmlBrand( buf )
+	return buf
+
+#---------------------------------------------------------------------------
+# Excel sheets are written one row at a time from any iterable of rows, so an export does not need a grid.
+# The column widths are computed with the same rules as FitSheetWrapper (using the memoized
+# widths in arial10), but are set once at the end.
+#
+
+ExcelFlushRows = 1000		# Rows kept in memory by xlwt before they are flushed to its temporary file.
+
+def getCellFit( value, isBold = False ):
+	''' Returns the (width, height) that FitSheetWrapper would use for a cell.  The height is None for a single line. '''
+	label = u' {}'.format(value)
+	width, height = arial10.getTextWidthHeight( label, isBold )
+	return int(math.ceil(width)), (height if label.find( '\n' ) >= 0 else None)
+
+def getExcelSheetName( name, sheetNames = None ):
+	''' Returns a valid Excel sheet name.  If given a set of the names already used, makes the name unique and adds it. '''
+	sheetName = re.sub('[+!#$%&+~`".:;|\\/?*\[\] ]+', ' ', name)[:31]
+	if sheetNames is not None:
+		i = 1
+		while sheetName.lower() in sheetNames:
+			i += 1
+			suffix = u' {}'.format(i)
+			sheetName = sheetName[:31-len(suffix)] + suffix
+		sheetNames.add( sheetName.lower() )
+	return sheetName
+
+def writeExcelSheet( sheet, title, colnames, rows ):
+	''' Write the title, the colnames and the rows to an xlwt sheet.  The rows can be a generator. '''
+	titleStyle = xlwt.XFStyle()
+	titleStyle.font.bold = True
+	titleStyle.font.height += titleStyle.font.height // 2
+	
+	rowTop = 0
+	if title:
+		for line in title.split('\n'):
+			sheet.write(rowTop, 0, line, titleStyle)
+			rowTop += 1
+		rowTop += 1
+	
+	# Write the colnames and data.
+	headerStyleLeft = xlwt.XFStyle()
+	headerStyleLeft.borders.bottom = xlwt.Borders.MEDIUM
+	headerStyleLeft.font.bold = True
+	headerStyleLeft.alignment.horz = xlwt.Alignment.HORZ_LEFT
+	headerStyleLeft.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
+	
+	headerStyleRight = xlwt.XFStyle()
+	headerStyleRight.borders.bottom = xlwt.Borders.MEDIUM
+	headerStyleRight.font.bold = True
+	headerStyleRight.alignment.horz = xlwt.Alignment.HORZ_RIGHT
+	headerStyleRight.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
+	
+	styleLeft = xlwt.XFStyle()
+	styleLeft.alignment.horz = xlwt.Alignment.HORZ_LEFT
+	styleLeft.alignment.wrap = True
+	styleLeft.alignment.vert = xlwt.Alignment.VERT_TOP
+		
+	styleRight = xlwt.XFStyle()
+	styleRight.alignment.horz = xlwt.Alignment.HORZ_RIGHT
+	styleRight.alignment.wrap = True
+	styleRight.alignment.vert = xlwt.Alignment.VERT_TOP
+	
+	styles = [styleRight if c in RightJustifyCols else styleLeft for c in colnames]
+	widths = [0] * len(colnames)
+	
+	def writeRow( rowCur, values, styles, isBold = False ):
+		heightMax = 0
+		for col, (v, style) in enumerate(six.moves.zip(values, styles)):
+			sheet.write( rowCur, col, v, style )
+			width, height = getCellFit( v, isBold )
+			if width > widths[col]:
+				widths[col] = width
+			if height and height > heightMax:
+				heightMax = height
+		if heightMax:
+			sheet.row(rowCur).height = heightMax
+	
+	writeRow( rowTop, colnames, [headerStyleRight if c in RightJustifyCols else headerStyleLeft for c in colnames], True )
+	rowMax = rowTop
+	blankRows = []		# Empty rows are only written if there is a row after them.
+	for values in rows:
+		if not any( v.strip() for v in values ):
+			blankRows.append( values )
+			continue
+		for values in blankRows + [values]:
+			rowMax += 1
+			writeRow( rowMax, values, styles )
+			if (rowMax - rowTop) % ExcelFlushRows == 0:
+				sheet.flush_row_data()
+		blankRows = []
+	
+	for col, width in enumerate(widths):
+		sheet.col(col).width = width
+	
+	# Add branding at the bottom of the sheet.
+	style = xlwt.XFStyle()
+	style.alignment.horz = xlwt.Alignment.HORZ_LEFT
+	sheet.write( rowMax + 2, 0, brandText, style )
+
+#---------------------------------------------------------------------------
 
 class ExportGrid( object ):
 	PDFLineFactor = 1.10
@@ -98,9 +209,8 @@ class ExportGrid( object ):
 		self.leftJustifyCols = {}
 		self.rightJustifyCols = {}
 		
-		rightJustify = {'Pos', 'Bib', 'Time'}
 		for c, n in enumerate(self.colnames):
-			if n in rightJustify:
+			if n in RightJustifyCols:
 				self.rightJustifyCols[c] = True
 			else:
 				self.leftJustifyCols[c] = True
@@ -251,79 +361,8 @@ class ExportGrid( object ):
 	
 	def toExcelSheet( self, sheet ):
 		''' Write the contents of the grid to an xlwt excel sheet. '''
-		titleStyle = xlwt.XFStyle()
-		titleStyle.font.bold = True
-		titleStyle.font.height += titleStyle.font.height / 2
-		
-		rowTop = 0
-		if self.title:
-			for line in self.title.split('\n'):
-				sheet.write(rowTop, 0, line, titleStyle)
-				rowTop += 1
-			rowTop += 1
-		
-		sheetFit = FitSheetWrapper( sheet )
-		
-		# Write the colnames and data.
-		headerStyleLeft = xlwt.XFStyle()
-		headerStyleLeft.borders.bottom = xlwt.Borders.MEDIUM
-		headerStyleLeft.font.bold = True
-		headerStyleLeft.alignment.horz = xlwt.Alignment.HORZ_LEFT
-		headerStyleLeft.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
-
-		headerStyleRight = xlwt.XFStyle()
-		headerStyleRight.borders.bottom = xlwt.Borders.MEDIUM
-		headerStyleRight.font.bold = True
-		headerStyleRight.alignment.horz = xlwt.Alignment.HORZ_RIGHT
-		headerStyleRight.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
-
-		styleLeft = xlwt.XFStyle()
-		styleLeft.alignment.horz = xlwt.Alignment.HORZ_LEFT
-		styleLeft.alignment.wrap = True
-		styleLeft.alignment.vert = xlwt.Alignment.VERT_TOP
-			
-		styleRight = xlwt.XFStyle()
-		styleRight.alignment.horz = xlwt.Alignment.HORZ_RIGHT
-		styleRight.alignment.wrap = True
-		styleRight.alignment.vert = xlwt.Alignment.VERT_TOP
-			
-		rowMax = 0
-		for col, c in enumerate(self.colnames):
-			sheetFit.write( rowTop, col, c, headerStyleLeft if col in self.leftJustifyCols else headerStyleRight, bold=True )
-			style = styleLeft if col in self.leftJustifyCols else styleRight
-			for row, v in enumerate(self.data[col]):
-				rowCur = rowTop + 1 + row
-				if rowCur > rowMax:
-					rowMax = rowCur
-				sheetFit.write( rowCur, col, v, style )
-				
-		# Add branding at the bottom of the sheet.
-		style = xlwt.XFStyle()
-		style.alignment.horz = xlwt.Alignment.HORZ_LEFT
-		sheet.write( rowMax + 2, 0, brandText, style )
+		writeExcelSheet( sheet, self.title, self.colnames, six.moves.zip(*self.data) )
 		
 	def toHtml( self, buf ):
 		''' Write the contents to the buffer in HTML format. '''
-		writeHtmlHeader( buf, self.title )
-		
-		with tag(buf, 'table', {'class': 'results'} ):
-			with tag(buf, 'thead'):
-				with tag(buf, 'tr'):
-					for col in self.colnames:
-						with tag(buf, 'th'):
-							buf.write( cgi.escape(col).replace('\n', '<br/>\n') )
-			with tag(buf, 'tbody'):
-				for row in six.moves.range(max(len(d) for d in self.data)):
-					with tag(buf, 'tr'):
-						for col in six.moves.range(len(self.colnames)):
-							with tag(buf, 'td', {'class':'rAlign'} if col not in self.leftJustifyCols else {}):
-								try:
-									buf.write( cgi.escape(self.data[col][row]).replace('\n', '<br/>\n') )
-								except IndexError:
-									buf.write( '&nbsp;' )
-									
-		with tag(buf, 'p', {'class': 'smallfont'}):
-			buf.write( 'Powered by ' )
-			with tag(buf, 'a', dict(href="http://www.sites.google.com/site/crossmgrsoftware")):
-				buf.write( 'SprintMgr' )
-		return buf
+		return writeHtmlTable( buf, self.title, self.colnames, six.moves.zip(*self.data) )
@@ -1,6 +1,5 @@
 import arial10
 import datetime
-import Utils
 import math
 
 class FitSheetWrapper(object):
@@ -31,14 +30,12 @@ class FitSheetWrapper(object):
 		elif isinstance(label, datetime.time):
 			label = '00:00:00'
 		else:
-			label = Utils.removeDiacritic(u' {}'.format(label) )
+			label = u' {}'.format(label)
+		width, height = arial10.getTextWidthHeight(label, isBold)
 		if label.find( '\n' ) >= 0:
-			width, height = arial10.fitWidthHeight(label, isBold)
 			if height > self.heights.get(r, 0):
 				self.heights[r] = height
 				self.sheet.row(r).height = height
-		else:
-			width = arial10.fitWidth(label, isBold)
 		width = int(math.ceil(width))
 		if width > self.widths.get(c, 0):
 			self.widths[c] = width
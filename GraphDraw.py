@@ -9,72 +9,45 @@ import bisect
 pickle = six.moves.cPickle
 from collections import defaultdict
 
-class Graph( wx.Control ):
-	def __init__( self, parent, id = wx.ID_ANY ):
-		super(Graph, self).__init__( parent, id )
-		
-		self.model = None
-		self.selectedRider = None
-		self.SetDoubleBuffered( True )
-		
-		self.Bind(wx.EVT_PAINT, self.OnPaint)
-		self.Bind(wx.EVT_LEFT_DOWN, self.OnLeftDown)
-		self.Bind(wx.EVT_LEFT_UP, self.OnLeftUp)
-		self.Bind(wx.EVT_SIZE, self.OnSize)
-		self.Bind(wx.EVT_ERASE_BACKGROUND, lambda evt: None)
-		
-		self.rectRiders = []
-		self.colX = []
+#----------------------------------------------------------------------
+# Text extents are cached per font size and weight.
+# The font size search measures the same strings at the same sizes every time the window is resized.
+#
+TextExtentFontsMax = 64
+textExtentCache = {}
 
-	def OnSize( self, evt ):
-		self.Refresh()
-	
-	def OnLeftDown( self, evt ):
-		self.selectedRider = None
-		wx.CallAfter( self.Refresh )
-	
-	def OnLeftUp( self, evt ):
-		if not self.colX:
-			return
-		
-		x, y = evt.GetX(), evt.GetY()
-		i = max( 0, bisect.bisect_left(self.colX, x, hi=len(self.colX)-1) - 1 )
-		if self.colX[i] <= x < self.colX[i+1]:
-			for rect, rider in self.rectRiders[i]:
-				if rect.Contains(x, y):
-					if self.selectedRider != rider:
-						self.selectedRider = rider;
-						wx.CallAfter( self.Refresh )
-					return
-				if rect.GetY() > y:
-					return
-	
-	def OnPaint(self, evt):
-		dc = wx.PaintDC(self)
-		self.Draw(dc)
+def getTextExtentCache( fontSize, weight ):
+	key = (fontSize, weight)
+	try:
+		return textExtentCache[key]
+	except KeyError:
+		if len(textExtentCache) >= TextExtentFontsMax:
+			textExtentCache.clear()
+		cache = textExtentCache[key] = {}
+		return cache
+
+class MeasuredFont( object ):
+	''' A font with a cache of its text extents. '''
+	def __init__( self, fontSize, weight = wx.FONTWEIGHT_NORMAL ):
+		self.font = wx.Font((0,fontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, weight)
+		self.extents = getTextExtentCache( fontSize, weight )
 	
-	def Print( self, dc ):
-		self.Draw( dc, True )
+	def getFullTextExtent( self, dc, text ):
+		try:
+			return self.extents[text]
+		except KeyError:
+			dc.SetFont( self.font )
+			extent = self.extents[text] = tuple( dc.GetFullTextExtent(text) )
+			return extent
 	
-	def Draw( self, dc, toPrinter=False ):
-		width, height = dc.GetSize()
-		if not width or not height:
-			width, height = self.GetClientSize()
-		
-		#---------------------------------------------------------------------------
-		# Set up a memory dc to draw into.
-		dcIn = dc
-		bitmap = wx.Bitmap( width, height )
-		dcMemory = wx.MemoryDC()
-		dcMemory.SelectObject( bitmap )
-		dc = wx.GCDC( dcMemory )		# Use a graphics context dc to get anti-aliased drawing.
-		
-		#---------------------------------------------------------------------------
-		backgroundColour = wx.WHITE
-		dc.SetBackground( wx.WHITE_BRUSH )
-		dc.Clear()
-			
-		model = self.model or Model.model
+	def getTextWidth( self, dc, text ):
+		return self.getFullTextExtent(dc, text)[0]
+
+#----------------------------------------------------------------------
+class GraphLayout( object ):
+	''' The position of everything in the graph.
+		Does not depend on the selected rider, so clicking on a rider only draws the highlights. '''
+	def __init__( self, dc, model, width, height, toPrinter ):
 		competition = model.competition
 		state = competition.state
 		
@@ -85,12 +58,6 @@ class Graph( wx.Control ):
 			if 'rank' in v:
 				name += u' \u2192 {}'.format( v['rank'] )
 			return name
-			
-		def riderName( id ):
-			try:
-				return state.labels[id].bib_full_name
-			except KeyError:
-				return u''
 		
 		# Set the list of qualifiers.  Double-space the rows.
 		grid = [[{'title':u'Qualifiers'}, {}]]
@@ -157,7 +124,7 @@ class Graph( wx.Control ):
 					grid[col].append( {} )
 				col += 1
 	
-		results, dnfs, dqs = model.competition.getResults()
+		results, dnfs, dqs = competition.getResults()
 		grid.append( [{'title':u'Final Classification'}, {}] )
 		for i, (classification, rider) in enumerate(results):
 			values = {'classification':classification}
@@ -193,28 +160,23 @@ class Graph( wx.Control ):
 			return None, None
 	
 		# Binary search for the right font size.
-		fontSize = 0.4 * height / float(model.competition.starters)
+		fontSize = 0.4 * height / float(competition.starters)
 		fontSizeMin, fontSizeMax = 0.0, fontSize * 3
 		for ff in six.moves.range(10):
 			fontSize = int((fontSizeMax + fontSizeMin) / 2.0)
 			
-			font = wx.Font((0,fontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
-			boldFont = wx.Font((0,fontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD)
-			dc.SetFont( font )
-			textHeight = dc.GetTextExtent( u'My What a Nice String!' )[1]
+			font = MeasuredFont( fontSize )
+			boldFont = MeasuredFont( fontSize, wx.FONTWEIGHT_BOLD )
+			textHeight = font.getFullTextExtent( dc, u'My What a Nice String!' )[1]
 			rowHeight = textHeight * 1.15
 			
 			colWidths = [0] * len(grid)
 			for c, col in enumerate(grid):
 				for v in col:
 					if 'title' in v:
-						dc.SetFont( boldFont )
-						colWidths[c] = max( colWidths[c], dc.GetFullTextExtent(v['title'])[0] )
-						dc.SetFont( font )
-					elif 'name' in v:
-						colWidths[c] = max( colWidths[c], dc.GetFullTextExtent(v['name'] + '00. ')[0] )
+						colWidths[c] = max( colWidths[c], boldFont.getTextWidth(dc, v['title']) )
 					if v.get('rider',None):
-						colWidths[c] = max( colWidths[c], dc.GetFullTextExtent(v['rider'].bib_full_name + '00. ')[0] )
+						colWidths[c] = max( colWidths[c], font.getTextWidth(dc, v['rider'].bib_full_name + '00. ') )
 			
 			border = width / 15 if toPrinter else 8
 			xLeft = border
@@ -233,47 +195,30 @@ class Graph( wx.Control ):
 					break
 				fontSizeMin = fontSize
 		
-		thinLine = max( 1, int(fontSize / 10.0) )
-		thickLine = max( 4, int(fontSize / 3.0) )
-		
-		whiteFont = wx.Font((0,fontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
-		greenPen = wx.Pen(wx.Colour(0,200,0), thinLine)
-		greenPenThick = wx.Pen(wx.Colour(0,200,0), thickLine)
-		redPen = wx.Pen( wx.RED, thinLine )
-		redPenThick = wx.Pen(wx.Colour(255,0,0), thickLine)
-		blackPen = wx.Pen(wx.BLACK, thinLine)
-		bluePen = wx.Pen(wx.Colour(0,0,200), thinLine)
-		whitePen = wx.Pen( wx.WHITE, thinLine )
-		blackBrush = wx.BLACK_BRUSH
-		whiteBrush = wx.WHITE_BRUSH
+		self.fontSize = fontSize
+		self.font = font
+		self.boldFont = boldFont
+		self.thinLine = max( 1, int(fontSize / 10.0) )
+		self.thickLine = max( 4, int(fontSize / 3.0) )
 		
-		dc.SetBrush( whiteBrush )
-		
-		topSpace = 0
+		self.pageTitle = None
 		if toPrinter:
 			titleFontSize = border / 4
-			titleFont = wx.Font((0,titleFontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
-			dc.SetFont( titleFont )
-			model = Model.model
-			cNum = model.communique_number.get(GraphDraw.phase, '')
-			dc.DrawText( u'Communiqu\u00E9: {}  Sprint Summary for {}: {}'.format(cNum, model.competition_name, model.category),
-				border, border - 2*titleFontSize )
-			
-		dc.SetFont( font )
-		
-		controlRatio = 0.78
-		def drawSCurve( x1, y1, x2, y2 ):
-			cx1, cy1 = x2 - (x2 - x1)*controlRatio, y1
-			cx2, cy2 = x1 + (x2 - x1)*controlRatio, y2
-			dc.DrawSpline( [wx.Point(x1,y1), wx.Point(cx1,cy1), wx.Point(cx2,cy2), wx.Point(x2,y2)] )
+			cNum = Model.model.communique_number.get(GraphDraw.phase, '')
+			self.pageTitle = (
+				wx.Font((0,titleFontSize), wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL),
+				u'Communiqu\u00E9: {}  Sprint Summary for {}: {}'.format(cNum, Model.model.competition_name, Model.model.category),
+				border, border - 2*titleFontSize,
+			)
 		
-		# Draw the connections.
+		# Connections are (rider, colour, segments).  Segments are (isCurve, x1, y1, x2, y2).
+		self.connections = []
 		for c, col in enumerate(grid):
 			for r, v in enumerate(col):
 				if 'rider' not in v:
 					continue
 				rider = v['rider']
-				x1 = colX[c] + dc.GetFullTextExtent(getFullName(rider, v))[0]
+				x1 = colX[c] + font.getTextWidth(dc, getFullName(rider, v))
 				y1 = yTop + r * rowHeight + rowHeight / 2
 				
 				cTo, rTo = getToCR(c, rider)
@@ -283,15 +228,8 @@ class Graph( wx.Control ):
 				x2 = colX[cTo]
 				y2 = yTop + rTo * rowHeight + rowHeight / 2
 				
-				if 'winner' in v:
-					if rider == self.selectedRider:
-						dc.SetPen( greenPenThick if v['winner'] else redPenThick )
-					else:
-						dc.SetPen( greenPen if v['winner'] else redPen )
-				else:
-					dc.SetPen( greenPenThick if rider == self.selectedRider else greenPen )
-				
-				drawSCurve( x1, y1, x2, y2 )
+				colour = 'red' if 'winner' in v and not v['winner'] else 'green'
+				self.connections.append( (rider, colour, [(True, x1, y1, x2, y2)]) )
 			
 		# Create a map of the last event for all riders.
 		riderLastEvent = {}
@@ -312,7 +250,7 @@ class Graph( wx.Control ):
 						return True
 			return False
 			
-		# Draw the connections to the results.
+		# Connect to the results.
 		colAvoidCount = [6 if competition.starters == 24 else 1] * len(grid)
 		cTo = len(grid) - 1
 		for rTo, v in enumerate(grid[-1]):
@@ -326,80 +264,40 @@ class Graph( wx.Control ):
 				
 			cFrom, rFrom = riderLastEvent[rider]
 			
-			dc.SetPen( greenPenThick if rider == self.selectedRider else greenPen )
-				
-			x1 = colX[cFrom] + dc.GetFullTextExtent(getFullName(rider,v))[0]
+			x1 = colX[cFrom] + font.getTextWidth(dc, getFullName(rider,v))
 			y1 = yTop + rFrom * rowHeight + rowHeight / 2
 			x2 = colX[cTo]
 			y2 = yTop + rTo * rowHeight + rowHeight / 2
 			
 			if competition.starters == 18 or not getIsBlocked(cFrom, rFrom, cTo, rTo):
-				drawSCurve( x1, y1, x2, y2 )
+				segments = [(True, x1, y1, x2, y2)]
 			else:
 				maxRowBetween = max( len(grid[c]) for c in six.moves.range(cFrom+1, cTo) )
 				xa = colX[cFrom+1]
 				rAvoid = maxRowBetween + colAvoidCount[cFrom]
 				colAvoidCount[cFrom] += 2
 				ya = yTop + rAvoid * rowHeight
-				drawSCurve( x1, y1, xa, ya )
 				for cNext in six.moves.range(cFrom+2, cTo+1):
 					if not getIsBlocked(cNext, rAvoid, cTo, rTo):
 						break
 				xb = colX[min(cNext+1, len(grid)-1)] - colSpace
 				yb = ya
-				dc.DrawLine( xa, ya, xb, yb )
-				drawSCurve( xb, yb, x2, y2 )
+				segments = [(True, x1, y1, xa, ya), (False, xa, ya, xb, yb), (True, xb, yb, x2, y2)]
+			self.connections.append( (rider, 'green', segments) )
 		
-		def drawName( name, x, y, selected, pos = -1 ):
-			if not name:
-				return u''
-			if pos > 0:
-				name = u'{:02d}. {}'.format( pos, name )
-			dc.SetFont( whiteFont )
-			xborder = fontSize / 2
-			yborder = fontSize / 10
-			width, height = dc.GetFullTextExtent(name)[:2]
-			if selected:
-				dc.SetBrush( blackBrush )
-				dc.SetPen( blackPen )
-				dc.DrawRoundedRectangle( x-xborder, y-yborder, width + xborder*2, height + yborder*2, (height + yborder*2) / 4 )
-				dc.SetTextForeground( wx.WHITE )
-				if pos > 0 and name.startswith(u'0'):
-					name = name[1:]
-					x += dc.GetFullTextExtent(u'0')[0]
-				dc.DrawText( name, x, y )
-				dc.SetTextForeground( wx.BLACK )
-				dc.SetFont( font )
-			else:
-				if pos > 0 and name.startswith(u'0'):
-					name = name[1:]
-					x += dc.GetFullTextExtent(u'0')[0]
-				dc.SetBrush( wx.WHITE_BRUSH )
-				dc.SetPen( wx.TRANSPARENT_PEN )
-				dc.DrawRoundedRectangle( x-xborder, y-yborder, width + xborder*2, height + yborder*2, (height + yborder*2) / 4 )
-				dc.DrawText( name, x, y )
-			return name
-		
-		# Draw the node names.
+		# Titles are (text, x, y).  Names are (rider, text, x, y, box) where box is (x, y, width, height, radius).
+		self.titles = []
+		self.names = []
 		self.rectRiders = []
+		xborder = fontSize / 2
+		yborder = fontSize / 10
 		for c, col in enumerate(grid):
 			colRects = []
 			for r, v in enumerate(col):
 				x = colX[c]
 				y = yTop + r * rowHeight
 				if 'title' in v:
-					dc.SetFont( boldFont )
-					dc.DrawText( v['title'], x, y )
-					dc.SetFont( font )
-				elif 'name' in v:
-					try:
-						pos = v['classification']
-					except KeyError:
-						pos = -1
-					rider = v.get('rider', None)
-					if rider:
-						name = drawName( getFullName(rider, v), x, y, rider == self.selectedRider, pos )
-						colRects.append( (wx.Rect(x, y, dc.GetFullTextExtent(name)[0], rowHeight), rider) )
+					self.titles.append( (v['title'], x, y) )
 				elif 'rider' in v:
 					rider = v['rider']
 					if rider:
@@ -410,17 +308,205 @@ class Graph( wx.Control ):
 								name = u'{}.  {}'.format(pos, name)
 							else:
 								name = u'{}  {}'.format(pos, name)
-						drawName( name, x, y, rider == self.selectedRider )
-						colRects.append( (wx.Rect(x, y, dc.GetFullTextExtent(name)[0], rowHeight), rider) )
+						if name:
+							w, h = font.getFullTextExtent(dc, name)[:2]
+							box = (x-xborder, y-yborder, w + xborder*2, h + yborder*2, (h + yborder*2) / 4)
+							self.names.append( (rider, name, x, y, box) )
+						colRects.append( (wx.Rect(x, y, font.getTextWidth(dc, name), rowHeight), rider) )
 			self.rectRiders.append( colRects )
 		self.colX = colX
+	
+	@staticmethod
+	def drawSCurve( dc, x1, y1, x2, y2 ):
+		controlRatio = 0.78
+		cx1, cy1 = x2 - (x2 - x1)*controlRatio, y1
+		cx2, cy2 = x1 + (x2 - x1)*controlRatio, y2
+		dc.DrawSpline( [wx.Point(x1,y1), wx.Point(cx1,cy1), wx.Point(cx2,cy2), wx.Point(x2,y2)] )
+	
+	def getPens( self, lineWidth ):
+		return {'green':wx.Pen(wx.Colour(0,200,0), lineWidth), 'red':wx.Pen(wx.Colour(255,0,0), lineWidth)}
+	
+	def drawConnection( self, dc, pens, connection ):
+		rider, colour, segments = connection
+		dc.SetPen( pens[colour] )
+		for isCurve, x1, y1, x2, y2 in segments:
+			if isCurve:
+				self.drawSCurve( dc, x1, y1, x2, y2 )
+			else:
+				dc.DrawLine( x1, y1, x2, y2 )
+	
+	def drawName( self, dc, name, selected ):
+		rider, text, x, y, box = name
+		dc.SetFont( self.font.font )
+		if selected:
+			dc.SetBrush( wx.BLACK_BRUSH )
+			dc.SetPen( wx.Pen(wx.BLACK, self.thinLine) )
+			dc.DrawRoundedRectangle( *box )
+			dc.SetTextForeground( wx.WHITE )
+			dc.DrawText( text, x, y )
+			dc.SetTextForeground( wx.BLACK )
+		else:
+			dc.SetBrush( wx.WHITE_BRUSH )
+			dc.SetPen( wx.TRANSPARENT_PEN )
+			dc.DrawRoundedRectangle( *box )
+			dc.DrawText( text, x, y )
+	
+	def draw( self, dc ):
+		''' Draw the graph with nothing selected. '''
+		dc.SetBrush( wx.WHITE_BRUSH )
+		if self.pageTitle:
+			font, text, x, y = self.pageTitle
+			dc.SetFont( font )
+			dc.DrawText( text, x, y )
+		
+		pens = self.getPens( self.thinLine )
+		for connection in self.connections:
+			self.drawConnection( dc, pens, connection )
+		
+		dc.SetFont( self.boldFont.font )
+		for text, x, y in self.titles:
+			dc.DrawText( text, x, y )
+		for name in self.names:
+			self.drawName( dc, name, False )
+	
+	def drawSelected( self, dc, selectedRider ):
+		''' Draw the highlights of the selected rider over the graph. '''
+		pens = self.getPens( self.thickLine )
+		bounds = []
+		for connection in self.connections:
+			if connection[0] == selectedRider:
+				self.drawConnection( dc, pens, connection )
+				for isCurve, x1, y1, x2, y2 in connection[2]:
+					bounds.append( wx.Rect(int(min(x1,x2)), int(min(y1,y2)), int(abs(x2-x1))+1, int(abs(y2-y1))+1).Inflate(self.thickLine, self.thickLine) )
+		
+		# Draw the names covered by the thick lines again, then the selected names.
+		for name in self.names:
+			if name[0] != selectedRider:
+				rect = wx.Rect( *[int(v) for v in name[4][:4]] )
+				if any( rect.Intersects(b) for b in bounds ):
+					self.drawName( dc, name, False )
+		for name in self.names:
+			if name[0] == selectedRider:
+				self.drawName( dc, name, True )
+
+def drawGraphBitmap( model, width, height, toPrinter = False ):
+	''' Returns (layout, bitmap) of the graph of the model.  Does not need a window. '''
+	bitmap = wx.Bitmap( width, height )
+	dcMemory = wx.MemoryDC( bitmap )
+	dc = wx.GCDC( dcMemory )		# Use a graphics context dc to get anti-aliased drawing.
+	dc.SetBackground( wx.WHITE_BRUSH )
+	dc.Clear()
+	layout = GraphLayout( dc, model, width, height, toPrinter )
+	layout.draw( dc )
+	del dc
+	dcMemory.SelectObject( wx.NullBitmap )
+	return layout, bitmap
+
+ImageSize = (1366, 768)
+
+def getGraphImage( model, width = ImageSize[0], height = ImageSize[1] ):
+	return drawGraphBitmap( model, width, height )[1].ConvertToImage()
+
+#----------------------------------------------------------------------
+class Graph( wx.Control ):
+	def __init__( self, parent, id = wx.ID_ANY ):
+		super(Graph, self).__init__( parent, id )
+		
+		self.model = None
+		self.selectedRider = None
+		self.SetDoubleBuffered( True )
+		
+		self.Bind(wx.EVT_PAINT, self.OnPaint)
+		self.Bind(wx.EVT_LEFT_DOWN, self.OnLeftDown)
+		self.Bind(wx.EVT_LEFT_UP, self.OnLeftUp)
+		self.Bind(wx.EVT_SIZE, self.OnSize)
+		self.Bind(wx.EVT_ERASE_BACKGROUND, lambda evt: None)
+		
+		self.rectRiders = []
+		self.colX = []
+		
+		# The layout and the bitmap of the graph, and the bitmap with the selected rider drawn over it.
+		self.layoutKey = None
+		self.layout = None
+		self.bitmap = None
+		self.selectedKey = None
+		self.selectedBitmap = None
+	
+	def OnSize( self, evt ):
+		self.Refresh()
+	
+	def OnLeftDown( self, evt ):
+		self.selectedRider = None
+		wx.CallAfter( self.Refresh )
+	
+	def OnLeftUp( self, evt ):
+		if not self.colX:
+			return
+		
+		x, y = evt.GetX(), evt.GetY()
+		i = max( 0, bisect.bisect_left(self.colX, x, hi=len(self.colX)-1) - 1 )
+		if self.colX[i] <= x < self.colX[i+1]:
+			for rect, rider in self.rectRiders[i]:
+				if rect.Contains(x, y):
+					if self.selectedRider != rider:
+						self.selectedRider = rider;
+						wx.CallAfter( self.Refresh )
+					return
+				if rect.GetY() > y:
+					return
+	
+	def OnPaint(self, evt):
+		dc = wx.PaintDC(self)
+		layout = self.Draw(dc)
+		self.rectRiders = layout.rectRiders
+		self.colX = layout.colX
+	
+	def Print( self, dc ):
+		self.Draw( dc, True )
+		# Don't keep the printer bitmaps - they are large.
+		self.layoutKey = self.bitmap = self.selectedKey = self.selectedBitmap = None
+	
+	def getLayoutKey( self, width, height, toPrinter ):
+		model = self.model or Model.model
+		return (model, getattr(model, 'version', 0), width, height, toPrinter)
+	
+	def getBitmap( self, width, height, toPrinter ):
+		''' Returns the bitmap of the graph.  The layout is only computed again if the model, size or toPrinter changed. '''
+		layoutKey = self.getLayoutKey( width, height, toPrinter )
+		if layoutKey != self.layoutKey or self.bitmap is None:
+			self.layout, bitmap = drawGraphBitmap( layoutKey[0], width, height, toPrinter )
+			self.layoutKey, self.bitmap = layoutKey, bitmap
+			self.selectedKey = self.selectedBitmap = None
+		
+		if not self.selectedRider:
+			return self.bitmap
+		
+		selectedKey = layoutKey + (self.selectedRider,)
+		if selectedKey != self.selectedKey:
+			bitmap = wx.Bitmap( width, height )
+			dcMemory = wx.MemoryDC( bitmap )
+			dcMemory.DrawBitmap( self.bitmap, 0, 0 )
+			dc = wx.GCDC( dcMemory )
+			self.layout.drawSelected( dc, self.selectedRider )
+			del dc
+			dcMemory.SelectObject( wx.NullBitmap )
+			self.selectedKey, self.selectedBitmap = selectedKey, bitmap
+		return self.selectedBitmap
+	
+	def Draw( self, dc, toPrinter=False ):
+		''' Draw the graph into the dc.  Returns the layout. '''
+		width, height = dc.GetSize()
+		if not width or not height:
+			width, height = self.GetClientSize()
 		
-		# Copy the bitmap into the original dc.
-		dcIn.Blit( 0, 0, width, height, dcMemory, 0, 0 )
+		bitmap = self.getBitmap( width, height, toPrinter )
+		dcMemory = wx.MemoryDC( bitmap )
+		dc.Blit( 0, 0, width, height, dcMemory, 0, 0 )
 		dcMemory.SelectObject( wx.NullBitmap )
+		return self.layout
 
 	def getImage( self, toPrinter = False ):
-		bitmap = wx.Bitmap( 1366, 768 )
+		bitmap = wx.Bitmap( *ImageSize )
 		mdc = wx.MemoryDC( bitmap )
 		self.Draw( mdc, toPrinter )
 		image = bitmap.ConvertToImage()
@@ -0,0 +1,231 @@
+import six
+
+#------------------------------------------------------------------------------------------------
+# The contents of the Results and Chart grids, computed from the model without wx.
+# The pages copy these into their grids.  The benchmark times them without a display.
+#
+
+Arrow = u'\u2192'
+ArrowCol = u'    '		# Header of the arrow column between the start list and the results.
+
+class GridData( object ):
+	def __init__( self, headerNames, rows, greyRows = None, competitionTime = None ):
+		self.headerNames = headerNames
+		self.rows = rows						# One list of strings per row, one string per header.
+		self.greyRows = greyRows or set()		# Rows shown with a grey background (DNQ qualifiers).
+		self.competitionTime = competitionTime	# Estimated competition time in seconds, or None.
+
+def getHideCols( headerNames, showNames, showTeams ):
+	toHide = set()
+	for col, h in enumerate(headerNames):
+		if h == u'Name' and not showNames:
+			toHide.add( col )
+		elif h == u'Team' and not showTeams:
+			toHide.add( col )
+	return toHide
+
+def getTitle( model, pageTitle ):
+	''' The title of an export: the page title, then the competition. '''
+	return u'{}\n{} ({})\n{}'.format( pageTitle, model.competition_name, model.date.strftime('%Y-%m-%d'), model.category )
+
+#------------------------------------------------------------------------------------------------
+
+def getSeedingData( model ):
+	headerNames = [u'Bib', u'First Name', u'Last Name', u'Team', u'Team Code', u'License']
+	rows = [[u'{}'.format(r.bib), r.first_name, r.last_name, r.team, r.team_code, r.license] for r in model.riders]
+	return GridData( headerNames, rows )
+
+def getSeedingPageData( model ):
+	return u'Communique: {}\nQualifier Seeding '.format(model.communique_number.get(u'Seeding', u'')), getSeedingData( model )
+
+#------------------------------------------------------------------------------------------------
+
+def getChartData( model ):
+	competition = model.competition
+	state = competition.state
+	showNames = getattr(model, 'chartShowNames', True)
+	showTeams = getattr(model, 'chartShowTeams', True)
+	
+	headerNames = [u'', u'System', u'Event', u'Heats', u'In', u'Bib', u'Name', u'Team', u'H1', u'H2', u'H3', u'Out', u'Bib', u'Name', u'Team']
+	hideCols = getHideCols( headerNames, showNames, showTeams )
+	headerNames = [h for c, h in enumerate(headerNames) if c not in hideCols]
+	
+	def getRiderCells( ids ):
+		riders = [state.labels.get(c, None) for c in ids]
+		cells = [u'\n'.join([u'{}'.format(rider.bib if rider.bib else u'') if rider else u'' for rider in riders])]
+		if showNames:
+			cells.append( u'\n'.join([rider.full_name if rider else u'' for rider in riders]) )
+		if showTeams:
+			cells.append( u'\n'.join([rider.team if rider else u'' for rider in riders]) )
+		return cells
+	
+	rows = []
+	for tournament in competition.tournaments:
+		tournamentName = tournament.name
+		for system in tournament.systems:
+			systemName = system.name
+			for i, event in enumerate(system.events):
+				row = [tournamentName or u'', systemName, u'{}'.format(i+1), u' {}'.format(event.heatsMax)]
+				tournamentName = systemName = u''
+				
+				row.append( u'\n'.join(event.composition).replace(u'\n',u' ({})\n'.format(len(event.composition)),1) )
+				row.extend( getRiderCells(event.composition) )
+				
+				for heat in six.moves.range(3):
+					row.append( u'\n'.join(event.getHeatPlaces(heat+1)) if event.heatsMax > 1 else u'' )
+				
+				out = [event.winner] + event.others
+				row.append( u'\n'.join(out).replace(u'\n',u' ({})\n'.format(len(out)),1) )
+				row.extend( getRiderCells(out) )
+				rows.append( row )
+	return GridData( headerNames, rows )
+
+#------------------------------------------------------------------------------------------------
+
+def getResultChoices( competition ):
+	choices = [u'Qualifiers']
+	for tournament in competition.tournaments:
+		for system in tournament.systems:
+			choices.append( (u'%s: ' % tournament.name if tournament.name else u'') + system.name )
+	choices.append( u'Final Classification' )
+	return choices
+
+def getResultsTitle( phase, communiqueNumber ):
+	return u'Communiqu\u00E9: {}\n{} {} '.format(
+				communiqueNumber,
+				phase,
+				'' if phase.startswith(u'Final') or phase.startswith('Time') else u'Draw Sheet/Intermediate Results' )
+
+def getQualifiersData( model ):
+	starters = model.competition.starters
+	
+	headerNames = [u'Pos', u'Bib', u'Name', u'Team', u'Time']
+	hideCols = getHideCols( headerNames, getattr(model, 'resultsShowNames', True), getattr(model, 'resultsShowTeams', True) )
+	headerNames = [h for c, h in enumerate(headerNames) if c not in hideCols]
+	
+	riders = sorted( model.riders, key = lambda r: r.keyQualifying() )
+	for row, r in enumerate(riders):
+		if row >= starters or r.status == 'DNQ':
+			riders[row:] = sorted( riders[row:], key=lambda r: r.keyQualifying()[1:] )
+			break
+	
+	rows = []
+	greyRows = set()
+	for row, r in enumerate(riders):
+		if row < starters and r.status != 'DNQ':
+			pos = u'{}'.format(row + 1)
+		else:
+			pos = u'DNQ'
+			greyRows.add( row )
+		rows.append( [value for col, value in enumerate([pos, u' {}'.format(r.bib), r.full_name, r.team, r.qualifyingTimeText]) if col not in hideCols] )
+	return GridData( headerNames, rows, greyRows, model.qualifyingCompetitionTime )
+
+def getFinalClassificationData( model ):
+	headerNames = [u'Pos', u'Bib', u'Name', u'Team', u'License']
+	hideCols = getHideCols( headerNames, getattr(model, 'resultsShowNames', True), getattr(model, 'resultsShowTeams', True) )
+	headerNames = [h for c, h in enumerate(headerNames) if c not in hideCols]
+	
+	results, dnfs, dqs = model.competition.getResults()
+	rows = []
+	for classification, r in results:
+		if not r:
+			rows.append( [u''] * len(headerNames) )
+		else:
+			rows.append( [u' {}'.format(value) for col, value in enumerate([classification, r.bib if r.bib else u'', r.full_name, r.team, r.license]) if col not in hideCols] )
+	return GridData( headerNames, rows )
+
+SeriesMgrHeaderNames = [u'Pos', u'Bib', u'LastName', u'FirstName', u'Team', u'License', u'Category']
+
+def getSeriesMgrData( model ):
+	''' The final classification, then the DNF, DQ and DNQ riders, for SeriesMgr.  The positions and bibs are not strings. '''
+	def getRow( pos, r ):
+		return [pos, r.bib if r.bib else u'', r.last_name.upper(), r.first_name, r.team, r.license, model.category]
+	
+	results, dnfs, dqs = model.competition.getResults()
+	rows = [getRow(classification, r) for classification, r in results if r]
+	rows.extend( getRow(u'DNF', r) for r in dnfs )
+	rows.extend( getRow(u'DQ', r) for r in dqs )
+	rows.extend( getRow(u'DNQ', r) for r in model.getDNQs() )
+	return GridData( SeriesMgrHeaderNames, rows )
+
+def getSystemData( model, system ):
+	competition = model.competition
+	state = competition.state
+	showNames = getattr(model, 'resultsShowNames', True)
+	showTeams = getattr(model, 'resultsShowTeams', True)
+	
+	heatsMax = max( event.heatsMax for event in system.events )
+	if heatsMax == 1:
+		headerNames = [u'Event',u'Bib',u'Name',u'Note',u'Team',ArrowCol,u'Pos',u'Bib',u'Name',u'Note',u'Team',u'Time']
+	else:
+		headerNames = [u'Event',u'Bib',u'Name',u'Note',u'Team',u'H1',u'H2',u'H3',ArrowCol,u'Pos',u'Bib',u'Name',u'Note',u'Team',u'Time']
+	hideCols = getHideCols( headerNames, showNames, showTeams )
+	headerNames = [h for c, h in enumerate(headerNames) if c not in hideCols]
+	
+	def getRiderCells( event, riders, before ):
+		cells = [u'\n'.join([u'{}'.format(rider.bib) if rider and rider.bib else u'' for rider in riders])]
+		if showNames:
+			cells.append( u'\n'.join([rider.full_name if rider else u'' for rider in riders]) )
+		cells.append( u'\n'.join([competition.getRelegationsWarningsStr(rider.bib, event, before) if rider else u'' for rider in riders]) )
+		if showTeams:
+			cells.append( u'\n'.join([rider.team if rider else u'' for rider in riders]) )
+		return cells
+	
+	rows = []
+	for row, event in enumerate(system.events):
+		cells = [u'{}'.format(row+1)]
+		cells.extend( getRiderCells(event, [state.labels.get(c, None) for c in event.composition], True) )
+		
+		if heatsMax != 1:
+			for heat in six.moves.range(heatsMax):
+				cells.append( u'\n'.join(event.getHeatPlaces(heat+1)) if event.heatsMax != 1 else u'' )
+		
+		cells.append( u' '.join([u'',Arrow,u'']) )
+		
+		out = [event.winner] + event.others
+		riders = [state.labels.get(c, None) for c in out]
+		cells.append( u'\n'.join( u'{}'.format(i+1) for i in six.moves.range(len(riders))) )
+		cells.extend( getRiderCells(event, riders, False) )
+		value = u''
+		if event.winner in state.labels:
+			try:
+				value = u'%.3f' % event.starts[-1].times[1]
+			except (KeyError, IndexError, ValueError):
+				pass
+		cells.append( value )
+		rows.append( cells )
+	return GridData( headerNames, rows, competitionTime = system.competitionTime )
+
+def getResultsData( model, resultName ):
+	''' Returns the GridData of a choice from getResultChoices. '''
+	if u'Qualifiers' in resultName:
+		return getQualifiersData( model )
+	if u'Final Classification' in resultName:
+		return getFinalClassificationData( model )
+	
+	competition = model.competition
+	for tournament in competition.tournaments:
+		for system in tournament.systems:
+			if (u'%s: ' % tournament.name if tournament.name else u'') + system.name == resultName:
+				return getSystemData( model, system )
+	return getSystemData( model, system )	# Not found - use the last system as the page did.
+
+#------------------------------------------------------------------------------------------------
+
+def getChartPageData( model ):
+	return u'Full Table', getChartData( model )
+
+def getResultsPageData( model, resultName = None ):
+	''' Returns (title, GridData) of a Results choice, by default the one shown on the Results page. '''
+	if resultName is None:
+		choices = getResultChoices( model.competition )
+		resultName = choices[model.showResults if 0 <= model.showResults < len(choices) else 0]
+	return getResultsTitle(resultName, model.communique_number.get(resultName, u'')), getResultsData( model, resultName )
+
+def iterPageData( model ):
+	''' Yields (name, title, GridData) of the Full Table and every Results choice.  Each one is computed when it is needed. '''
+	title, data = getChartPageData( model )
+	yield u'Full Table', title, data
+	for resultName in getResultChoices( model.competition ):
+		title, data = getResultsPageData( model, resultName )
+		yield resultName, title, data
@@ -0,0 +1,131 @@
+import wx
+import wx.grid as gridlib
+
+import six
+from GridData import GridData
+
+#------------------------------------------------------------------------------------------------
+# Virtual grid table over a GridData.
+#
+# The grid asks the table for the values and attributes of the cells it draws, so only the visible
+# cells are read.  A refresh replaces the rows and sizes the rows and columns from cached text extents
+# instead of setting every cell and calling AutoSizeColumns/AutoSizeRows.
+#
+
+TextExtentMax = 20000
+textExtentCache = {}		# textExtentCache[(font description, text)] = (width, height)
+
+def getMultiLineTextExtent( dc, fontDesc, text ):
+	key = (fontDesc, text)
+	try:
+		return textExtentCache[key]
+	except KeyError:
+		if len(textExtentCache) >= TextExtentMax:
+			textExtentCache.clear()
+		extent = textExtentCache[key] = tuple( dc.GetMultiLineTextExtent(text)[:2] )
+		return extent
+
+class GridDataTable( gridlib.GridTableBase ):
+	GreyColour = wx.Colour(200,200,200)
+	
+	def __init__( self ):
+		gridlib.GridTableBase.__init__( self )
+		self.data = GridData( [], [] )
+		self.numberRows = 0
+		self.colAttrs = []
+		self.greyAttrs = []
+	
+	def GetNumberRows( self ):
+		return self.numberRows
+	
+	def GetNumberCols( self ):
+		return len(self.data.headerNames)
+	
+	def GetValue( self, row, col ):
+		try:
+			return self.data.rows[row][col]
+		except IndexError:
+			return u''
+	
+	def SetValue( self, row, col, value ):
+		# Only called for the editable columns.
+		try:
+			self.data.rows[row][col] = value
+		except IndexError:
+			pass
+	
+	def IsEmptyCell( self, row, col ):
+		return not self.GetValue( row, col )
+	
+	def GetColLabelValue( self, col ):
+		try:
+			return self.data.headerNames[col]
+		except IndexError:
+			return u''
+	
+	def GetAttr( self, row, col, kind ):
+		try:
+			attr = (self.greyAttrs if row in self.data.greyRows else self.colAttrs)[col]
+		except IndexError:
+			return None
+		attr.IncRef()
+		return attr
+	
+	def setData( self, grid, data, colAttrs, rowsRequired = 0 ):
+		''' Show the data with an attribute for each column, then size the rows and columns to fit. '''
+		rowsOld, colsOld = self.GetNumberRows(), self.GetNumberCols()
+		
+		self.data = data
+		self.numberRows = max( len(data.rows), rowsRequired )
+		self.colAttrs = colAttrs
+		self.greyAttrs = []
+		for attr in colAttrs:
+			attr = attr.Clone()
+			attr.SetBackgroundColour( self.GreyColour )
+			self.greyAttrs.append( attr )
+		
+		grid.BeginBatch()
+		for countNew, countOld, deleted, appended in (
+				(self.GetNumberRows(), rowsOld, gridlib.GRIDTABLE_NOTIFY_ROWS_DELETED, gridlib.GRIDTABLE_NOTIFY_ROWS_APPENDED),
+				(self.GetNumberCols(), colsOld, gridlib.GRIDTABLE_NOTIFY_COLS_DELETED, gridlib.GRIDTABLE_NOTIFY_COLS_APPENDED) ):
+			if countNew < countOld:
+				grid.ProcessTableMessage( gridlib.GridTableMessage(self, deleted, countNew, countOld - countNew) )
+			elif countNew > countOld:
+				grid.ProcessTableMessage( gridlib.GridTableMessage(self, appended, countNew - countOld) )
+		grid.ProcessTableMessage( gridlib.GridTableMessage(self, gridlib.GRIDTABLE_REQUEST_VIEW_GET_VALUES) )
+		self.autoSize( grid )
+		grid.EndBatch()
+		grid.ForceRefresh()
+	
+	def autoSize( self, grid ):
+		''' The same sizes as AutoSizeColumns/AutoSizeRows, from the cached extents of the cell text. '''
+		dc = wx.ClientDC( grid )
+		
+		font = grid.GetLabelFont()
+		dc.SetFont( font )
+		fontDesc = font.GetNativeFontInfoDesc()
+		colWidths = [getMultiLineTextExtent(dc, fontDesc, h)[0] for h in self.data.headerNames]
+		rowHeights = [0] * self.GetNumberRows()
+		if grid.GetRowLabelSize() > 0:
+			rowHeights = [getMultiLineTextExtent(dc, fontDesc, u'{}'.format(row+1))[1] for row in six.moves.range(self.GetNumberRows())]
+		
+		fontDescLast = None
+		for col, attr in enumerate(self.colAttrs):
+			font = attr.GetFont() if attr.HasFont() else grid.GetDefaultCellFont()
+			fontDesc = font.GetNativeFontInfoDesc()
+			if fontDesc != fontDescLast:
+				dc.SetFont( font )
+				fontDescLast = fontDesc
+			wMax = colWidths[col]
+			for row, values in enumerate(self.data.rows):
+				w, h = getMultiLineTextExtent( dc, fontDesc, values[col] )
+				if w > wMax:
+					wMax = w
+				if h > rowHeights[row]:
+					rowHeights[row] = h
+			colWidths[col] = wMax
+		
+		for col, w in enumerate(colWidths):
+			grid.SetColSize( col, max(w + 10, grid.GetColMinimalAcceptableWidth()) if w else grid.GetDefaultColSize() )
+		grid.SetRowSizes( gridlib.GridSizesInfo(grid.GetDefaultRowSize(),
+			[max(h + 6, grid.GetRowMinimalAcceptableHeight()) if h else grid.GetDefaultRowSize() for h in rowHeights]) )
@@ -0,0 +1,130 @@
+import six
+from contextlib import contextmanager
+try:
+	from html import escape
+except ImportError:
+	from cgi import escape		# Python 2
+
+#---------------------------------------------------------------------------
+# Html pages with the results style.  Does not need wx, so the live results server can use it.
+#
+
+RightJustifyCols = {'Pos', 'Bib', 'Time'}
+
+@contextmanager
+def tag( buf, name, attrs = {} ):
+	if isinstance(attrs, six.string_types) and attrs:
+		attrs = { 'class': attrs }
+	buf.write( u'<{}>'.format( u' '.join(
+			[name] + [u'{}="{}"'.format(attr, value) for attr, value in six.iteritems(attrs)]
+		) ) )
+	yield
+	buf.write( u'</{}>\n'.format(name) )
+
+HtmlStyle = u'''
+body{ font-family: sans-serif; }
+
+#idRaceName {
+	font-size: 200%;
+	font-weight: bold;
+}
+#idImgHeader { box-shadow: 4px 4px 4px #888888; }
+.smallfont { font-size: 80%; }
+.bigfont { font-size: 120%; }
+.hidden { display: none; }
+
+table.results
+{
+	font-family:"Trebuchet MS", Arial, Helvetica, sans-serif;
+	border-collapse:collapse;
+}
+table.results td, table.results th 
+{
+	font-size:1em;
+	padding:3px 7px 2px 7px;
+	text-align: left;
+}
+table.results th 
+{
+	font-size:1.1em;
+	text-align:left;
+	padding-top:5px;
+	padding-bottom:4px;
+	background-color:#7FE57F;
+	color:#000000;
+}
+table.results tr.odd
+{
+	color:#000000;
+	background-color:#EAF2D3;
+}
+table.results tr:hover
+{
+	color:#000000;
+	background-color:#FFFFCC;
+}
+table.results tr.odd:hover
+{
+	color:#000000;
+	background-color:#FFFFCC;
+}
+
+table.results td {
+	border-top:1px solid #98bf21;
+}
+
+table.results td.noborder {
+	border-top:0px solid #98bf21;
+}
+
+table.results td.rAlign, table.results th.rAlign {
+	text-align:right;
+}
+
+table.results tr td.fastest{
+	color:#000000;
+	background-color:#80FF80;
+}
+
+@media print { .noprint { display: none; } }'''
+
+@contextmanager
+def htmlDocument( buf, title ):
+	''' Write an html page with the results style.  The body is written in the with block. '''
+	buf.write( u'<!DOCTYPE html>\n' )
+	with tag(buf, 'html'):
+		with tag(buf, 'head'):
+			with tag(buf, 'title'):
+				buf.write( escape(title.replace(u'\n', u' ')) )
+			with tag(buf, 'meta', dict(charset="UTF-8", author="Edward Sitarski", copyright="Edward Sitarski, 2013", generator="SprintMgr")):
+				pass
+			with tag(buf, 'style', dict( type="text/css")):
+				buf.write( HtmlStyle )
+		with tag(buf, 'body'):
+			yield
+
+def writeHtmlBrand( buf ):
+	with tag(buf, 'p', {'class': 'smallfont'}):
+		buf.write( 'Powered by ' )
+		with tag(buf, 'a', dict(href="http://www.sites.google.com/site/crossmgrsoftware")):
+			buf.write( 'SprintMgr' )
+
+def writeHtmlRows( buf, colnames, rows, rightJustifyCols = () ):
+	''' Write a results table.  The rows can be a generator. '''
+	rightAlign = {'class':'rAlign'}
+	aligns = [rightAlign if c in rightJustifyCols else {} for c in colnames]
+	with tag(buf, 'table', {'class': 'results'} ):
+		with tag(buf, 'thead'):
+			with tag(buf, 'tr'):
+				for col in colnames:
+					with tag(buf, 'th'):
+						buf.write( escape(col).replace('\n', '<br/>\n') )
+		with tag(buf, 'tbody'):
+			for values in rows:
+				with tag(buf, 'tr'):
+					for col, align in enumerate(aligns):
+						with tag(buf, 'td', align):
+							try:
+								buf.write( escape(values[col]).replace('\n', '<br/>\n') )
+							except IndexError:
+								buf.write( '&nbsp;' )
@@ -0,0 +1,171 @@
+import six
+pickle = six.moves.cPickle
+
+import Model
+import undo
+import Spans
+from Autosave import Writer, replaceFile
+
+#------------------------------------------------------------------------------------------------
+# Journaled race file.
+#
+# The .smr file is a pickled Model (the base snapshot) followed by pickled commands.
+# Older versions of SprintMgr read the snapshot and ignore the rest.  The snapshot only pickles
+# classes and types they have (see Model.Slotted and Model.State.__getstate__).
+#
+# Competition actions (start created, start positions, places, restarts) are applied
+# as commands and appended to the file, so a save only writes the change.
+# Other changes (seeding, qualifying times, properties) set model.changed, and the next
+# writeRace writes a new snapshot.  A new snapshot is also written when the log gets long.
+#
+# The snapshots and commands are pickled on the caller's thread and written by an Autosave.Writer
+# thread, which keeps rotating backups.  Each command is appended and fsynced as soon as it arrives.
+# Only snapshots wait for a burst of changes to end.
+#
+# A crash loses at most the command being written.  A truncated command is ignored when the file is read.
+#
+
+CompactCommands = 500		# Write a new snapshot after this many commands.
+
+def getEventKey( event ):
+	return (event.tournament.i, event.system.i, event.i)
+
+def getEvent( competition, key ):
+	iTournament, iSystem, iEvent = key
+	return competition.tournaments[iTournament].systems[iSystem].events[iEvent]
+
+def applyCommand( competition, command ):
+	''' Apply a command to the competition.  Returns the new start for 'getStart', otherwise None. '''
+	name, key, args = command[0], command[1], command[2:]
+	event = getEvent( competition, key )
+	if name == 'getStart':
+		startPositions, canDrawLots = args
+		start = event.getStart()
+		if startPositions is not None:
+			start.startPositions = list( startPositions )
+			start.canDrawLots = canDrawLots
+		return start
+	elif name == 'deleteStart':
+		del event.starts[-1]
+		competition.setStartsChanged( event )
+	elif name == 'setStartPositions':
+		startPositions, = args
+		event.starts[-1].setStartPositions( startPositions )
+	elif name == 'setPlaces':
+		places, times = args
+		start = event.starts[-1]
+		start.setPlaces( places )
+		start.setTimes( times )
+		event.propagate()
+		competition.propagate()
+	elif name == 'restart':
+		places, = args
+		start = event.starts[-1]
+		start.setPlaces( places )
+		start.restartRequired = True
+		competition.setStartsChanged( event )
+		event.propagate()
+		competition.propagate()
+	else:
+		raise ValueError( 'Unknown command: {}'.format(name) )
+	return None
+
+class Journal( object ):
+	def __init__( self, model, fileName ):
+		self.model = model
+		self.fileName = fileName
+		self.commands = 0
+		self.writer = Writer( fileName )
+	
+	@Spans.timed( 'Journal.writeSnapshot' )
+	def writeSnapshot( self ):
+		''' Pickle the model.  The writer replaces the race file with it. '''
+		self.writer.putSnapshot( pickle.dumps(self.model, 2) )
+		self.commands = 0
+	
+	@Spans.timed( 'Journal.append' )
+	def append( self, command ):
+		self.writer.putCommand( pickle.dumps(command, 2) )
+		self.commands += 1
+	
+	def needsCompaction( self ):
+		return self.commands >= CompactCommands
+	
+	def isFailed( self ):
+		return self.writer.failed
+	
+	def flush( self ):
+		self.writer.flush()
+	
+	def close( self ):
+		self.writer.close()
+
+journal = None		# The journal of the race file of Model.model.
+
+def isJournaling():
+	''' True if changes to Model.model can be appended to the journal. '''
+	return journal is not None and not journal.isFailed() and journal.model is Model.model and not Model.model.changed
+
+def execute( command, event, *args ):
+	''' Apply a command to Model.model, add it to the undo, and append it to the journal.
+		If the model has other unsaved changes, just mark it as changed so the next save writes a snapshot. '''
+	delta = undo.EventDelta( Model.model, event )
+	result = applyCommand( Model.model.competition, (command, getEventKey(event)) + args )
+	Model.model.incrementVersion()
+	if command == 'getStart':
+		if result is None:
+			return None
+		args = (list(result.startPositions), result.canDrawLots)
+	undo.push( delta )		# Only if the command changed something.  Otherwise the redo is kept.
+	
+	if isJournaling():
+		journal.append( (command, getEventKey(event)) + args )
+	else:
+		Model.model.setChanged( True )
+	return result
+
+def readRace( fileName ):
+	''' Read the snapshot and replay the commands.  Returns (model, commandCount). '''
+	commands = []
+	with open(fileName, 'rb') as fp:
+		model = pickle.load( fp )
+		model.competition.restorePropagated()
+		while 1:
+			try:
+				commands.append( pickle.load(fp) )
+			except EOFError:
+				break
+			except Exception:
+				break		# Truncated by a crash.
+	for command in commands:
+		applyCommand( model.competition, command )
+	return model, len(commands)
+
+def writeRace( model, fileName ):
+	''' Save the model.  Only writes a snapshot if the journal cannot hold the changes.
+		The file is written in the background.  Raises the error of a failed background write. '''
+	global journal
+	if journal is None or journal.model is not model or journal.fileName != fileName:
+		close()
+		journal = Journal( model, fileName )
+		journal.writeSnapshot()
+	elif model.changed or journal.isFailed() or journal.needsCompaction():
+		journal.writeSnapshot()
+	model.setChanged( False )
+	
+	error = journal.writer.popError()
+	if error:
+		model.setChanged( True )	# Write a snapshot again on the next save.
+		raise error
+
+def flush():
+	''' Wait until the journal is on the disk. '''
+	if journal:
+		journal.flush()
+
+def close():
+	''' Write everything pending and stop the journal. '''
+	global journal
+	if journal:
+		journal.close()
+		journal = None
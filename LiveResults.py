@@ -0,0 +1,430 @@
+import gzip
+import json
+import time
+import socket
+import asyncio
+import threading
+
+import six
+from six.moves.urllib.parse import urlsplit, parse_qs, unquote
+
+import Spans
+import GridData
+from HtmlWriter import tag, escape, htmlDocument, writeHtmlRows, writeHtmlBrand, RightJustifyCols
+
+#------------------------------------------------------------------------------------------------
+# Live results server for the phones and screens on the venue network (Python 3).
+#
+# The model is only read by the thread that changes it.  When the model version changes, that thread
+# calls LiveServer.publish, which copies what the server shows into plain lists and dicts, and hands
+# the copy to the server thread.  The server runs asyncio in its own thread, so it never waits for
+# the user interface, and the user interface only waits for the copy.
+#
+# Each resource keeps the ETag of the change that last modified it, so clients with the current
+# ETag get a 304.  The json, html and gzip encodings are made once per change and shared by all clients.
+# To wait for a change:
+#	GET /api/results?wait=30 with If-None-Match		long-poll: returns when the resource changes, or a 304 after the wait
+#	GET /api/events									server-sent events: the new ETags of the changed resources
+#
+#	/								index of the resources
+#	/results.html	/api/results	final classification, DNFs and DQs
+#	/ready.html		/api/ready		events that can start, in the order they are usually run
+#	/bracket.html	/api/bracket	every system with its events
+#	/system-N.html	/api/system-N	one system with the riders and heat places of each event
+#
+# The html pages use the long-poll to reload themselves when their resource changes.
+#
+
+DefaultPort = 8765
+WaitMax = 60.0				# Longest long-poll wait.
+KeepAliveSeconds = 30.0		# Close idle connections after this.
+EventsPingSeconds = 15.0	# Comment sent on idle event streams so proxies keep them open.
+HeadersMax = 64
+GzipMin = 512				# Smaller bodies are not compressed.
+
+#------------------------------------------------------------------------------------------------
+# Snapshot of the model.  Built on the thread that changes the model.
+#
+
+def getRider( rider ):
+	if not rider or rider.isOpen():
+		return None
+	return {'bib': rider.bib, 'name': rider.full_name, 'team': rider.team}
+
+def getEventData( event ):
+	state = event.competition.state
+	labels = state.labels
+	remainingComposition = [c for c in event.composition if state.inContention(c)]
+	heatPlaces = []
+	if event.heatsMax > 1:
+		for heat in six.moves.range(event.heatsMax):
+			heatPlaces.append( {u'{}'.format(labels[c].bib): p for c, p in zip(remainingComposition, event.getHeatPlaces(heat+1)) if p} )
+	return {
+		'event': event.i + 1,
+		'heat': event.getHeat(),
+		'heatsMax': event.heatsMax,
+		'in': [getRider(labels.get(c)) for c in event.composition],
+		'heatPlaces': heatPlaces,		# For each heat, the place or status of the riders still in contention by bib.
+		'out': [getRider(labels.get(c)) for c in event.output],
+	}
+
+def getSystemName( tournament, system ):
+	return (u'%s: ' % tournament.name if tournament.name else u'') + system.name
+
+def getSnapshot( model ):
+	''' Returns {resource name: {'title', 'data', 'table'}}, where table is (headerNames, rows) for the html. '''
+	competition = model.competition
+	snapshot = {}
+	
+	def add( name, pageTitle, data, table ):
+		snapshot[name] = {'title': GridData.getTitle(model, pageTitle), 'data': data, 'table': table}
+	
+	results, dnfs, dqs = competition.getResults()
+	finalData = GridData.getFinalClassificationData( model )
+	add( 'results', u'Final Classification', {
+			'results': [dict(getRider(r) or {}, pos=classification) for classification, r in results],
+			'dnf': [getRider(r) for r in dnfs],
+			'dq': [getRider(r) for r in dqs],
+		}, (finalData.headerNames, finalData.rows) )
+	
+	ready = competition.getUpcoming()
+	add( 'ready', u'Ready to Start', [{
+			'tournament': t.name,
+			'system': s.name,
+			'event': e.i + 1,
+			'heat': e.getHeat(),
+			'heatsMax': e.heatsMax,
+			'riders': [getRider(competition.state.labels[c]) for c in e.composition if competition.state.inContention(c)],
+		} for t, s, e in ready],
+		([u'Event', u'Bib', u'Name', u'Team'], [[e.multi_line_name, e.multi_line_bibs, e.multi_line_rider_names, e.multi_line_rider_teams] for t, s, e in ready]) )
+	
+	systems = []
+	for tournament in competition.tournaments:
+		for system in tournament.systems:
+			name = u'system-{}'.format( len(systems) + 1 )
+			systemData = {'name': getSystemName(tournament, system), 'path': name, 'events': [getEventData(e) for e in system.events]}
+			systems.append( systemData )
+			data = GridData.getSystemData( model, system )
+			add( name, systemData['name'], systemData, (data.headerNames, data.rows) )
+	
+	chartData = GridData.getChartData( model )
+	add( 'bracket', u'Full Table', {'systems': systems}, (chartData.headerNames, chartData.rows) )
+	
+	links = [('results', u'Final Classification'), ('ready', u'Ready to Start'), ('bracket', u'Full Table')]
+	links.extend( (s['path'], s['name']) for s in systems )
+	add( 'index', u'Live Results', [{'name': text, 'html': u'/{}.html'.format(name), 'json': u'/api/{}'.format(name)} for name, text in links], None )
+	return snapshot
+
+#------------------------------------------------------------------------------------------------
+# Server side.  Everything below runs on the server thread.
+#
+
+ReloadScript = u'''<script>
+(function() {
+	function poll() {
+		fetch( location.pathname + '?wait=55', {headers: {'If-None-Match': %s}, cache: 'no-store'} ).then( function(r) {
+			if( r.status == 200 ) { location.reload(); } else { setTimeout( poll, r.status == 304 ? 0 : 5000 ); }
+		} ).catch( function() { setTimeout( poll, 5000 ); } );
+	}
+	poll();
+})();
+</script>
+'''
+
+class Resource( object ):
+	''' A resource of a snapshot.  Each encoding is made the first time it is requested. '''
+	def __init__( self, name, source, etag ):
+		self.name = name
+		self.source = source
+		self.etag = etag
+		self.encoded = {}	# encoded[(kind, gzipped)] = body
+	
+	def getBody( self, kind, gzipped = False ):
+		key = (kind, gzipped)
+		try:
+			return self.encoded[key]
+		except KeyError:
+			pass
+		if gzipped:
+			body = gzip.compress( self.getBody(kind), 6 )
+		elif kind == 'json':
+			body = json.dumps( {'title': self.source['title'], 'data': self.source['data']}, separators=(',', ':') ).encode( 'utf-8' )
+		else:
+			body = self.getHtml()
+		self.encoded[key] = body
+		return body
+	
+	def getHtml( self ):
+		title = self.source['title']
+		html = six.StringIO()
+		with htmlDocument(html, title):
+			with tag(html, 'h2'):
+				html.write( escape(title).replace(u'\n', u'<br/>\n') )
+			if self.source['table']:
+				headerNames, rows = self.source['table']
+				writeHtmlRows( html, headerNames, rows, RightJustifyCols )
+			else:
+				with tag(html, 'ul'):
+					for link in self.source['data']:
+						with tag(html, 'li'):
+							with tag(html, 'a', dict(href=link['html'])):
+								html.write( escape(link['name']) )
+			writeHtmlBrand( html )
+			html.write( ReloadScript % json.dumps(self.etag) )
+		return html.getvalue().encode( 'utf-8' )
+
+class Request( object ):
+	def __init__( self, method, path, query, version, headers ):
+		self.method = method
+		self.path = path
+		self.query = query
+		self.version = version
+		self.headers = headers		# Lower case names.
+	
+	@property
+	def keepAlive( self ):
+		connection = self.headers.get('connection', '').lower()
+		return connection == 'keep-alive' or (self.version == 'HTTP/1.1' and connection != 'close')
+	
+	def acceptsGzip( self ):
+		return 'gzip' in self.headers.get('accept-encoding', '')
+	
+	def getWait( self ):
+		try:
+			return max( 0.0, min(WaitMax, float(self.query.get('wait', ['0'])[0])) )
+		except ValueError:
+			return 0.0
+
+Reasons = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 503: 'Service Unavailable'}
+
+class LiveServer( object ):
+	def __init__( self, host = '', port = DefaultPort ):
+		self.host = host
+		self.port = port
+		self.loop = None
+		self.server = None
+		self.thread = None
+		self.modelVersion = None				# Model thread: the model version of the last snapshot.
+		
+		self.token = u'{:x}'.format( int(time.time()) )		# So ETags from an earlier run never match.
+		self.changeCount = 0
+		self.resources = {}
+		self.changed = None					# Future set with the changed resource names by the next snapshot.
+		self.connections = 0
+	
+	#--------------------------------------------------------------------------------------------
+	# Called from the model thread.
+	
+	def start( self ):
+		''' Start the server thread.  Raises the error if the port cannot be opened. '''
+		started = threading.Event()
+		errors = []
+		
+		def run():
+			loop = self.loop = asyncio.new_event_loop()
+			asyncio.set_event_loop( loop )
+			self.changed = loop.create_future()
+			try:
+				self.server = loop.run_until_complete( asyncio.start_server(self.handle, self.host or None, self.port, backlog = 1024) )
+			except Exception as e:
+				errors.append( e )
+				started.set()
+				loop.close()
+				return
+			started.set()
+			try:
+				loop.run_forever()
+			finally:
+				self.server.close()
+				loop.run_until_complete( self.server.wait_closed() )
+				for task in asyncio.all_tasks( loop ):
+					task.cancel()
+				loop.run_until_complete( asyncio.sleep(0) )
+				loop.close()
+		
+		self.thread = threading.Thread( target = run, name = 'LiveResults' )
+		self.thread.daemon = True
+		self.thread.start()
+		started.wait()
+		if errors:
+			self.thread = self.loop = None
+			raise errors[0]
+	
+	def stop( self ):
+		if self.isRunning():
+			self.loop.call_soon_threadsafe( self.loop.stop )
+			self.thread.join( 5.0 )
+		self.thread = self.loop = self.server = None
+		self.modelVersion = None
+	
+	def isRunning( self ):
+		return self.thread is not None and self.thread.is_alive()
+	
+	def publish( self, model ):
+		''' Send a snapshot to the server if the model changed since the last one.  Returns True if it did. '''
+		version = (id(model), model.version)
+		if version == self.modelVersion or not self.isRunning():
+			return False
+		with Spans.span( 'LiveResults.snapshot' ):
+			snapshot = getSnapshot( model )
+		self.modelVersion = version
+		self.loop.call_soon_threadsafe( self.setSnapshot, snapshot )
+		return True
+	
+	def getUrls( self ):
+		hosts = [self.host] if self.host else [getLanAddress(), u'localhost']
+		return [u'http://{}:{}/'.format(h, self.port) for h in hosts if h]
+	
+	#--------------------------------------------------------------------------------------------
+	# Server thread.
+	
+	def setSnapshot( self, snapshot ):
+		self.changeCount += 1
+		etag = u'"{}-{}"'.format( self.token, self.changeCount )
+		resources = {}
+		changed = []
+		for name, source in six.iteritems(snapshot):
+			resource = self.resources.get( name )
+			if resource is None or resource.source != source:
+				resource = Resource( name, source, etag )
+				changed.append( name )
+			resources[name] = resource
+		changed.extend( name for name in self.resources if name not in resources )
+		self.resources = resources
+		if changed:
+			changedFuture, self.changed = self.changed, self.loop.create_future()
+			changedFuture.set_result( changed )
+	
+	async def waitForChange( self, timeout ):
+		''' Returns the names of the changed resources, or None after the timeout. '''
+		try:
+			return await asyncio.wait_for( asyncio.shield(self.changed), timeout )
+		except asyncio.TimeoutError:
+			return None
+	
+	async def handle( self, reader, writer ):
+		self.connections += 1
+		try:
+			while True:
+				request = await asyncio.wait_for( readRequest(reader), KeepAliveSeconds )
+				if request is None:
+					break
+				if not await self.respond( request, writer ):
+					break
+		except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+			pass
+		finally:
+			self.connections -= 1
+			writer.close()
+	
+	async def respond( self, request, writer ):
+		''' Returns True if the connection can be used for another request. '''
+		if request.method not in ('GET', 'HEAD'):
+			return await writeResponse( writer, request, 405, b'' )
+		
+		path = request.path
+		if path == '/api/events':
+			await self.streamEvents( writer )
+			return False
+		
+		if path in ('/', '/index.html'):
+			name, kind = 'index', 'html'
+		elif path.startswith('/api/'):
+			name, kind = path[5:], 'json'
+		elif path.endswith('.html'):
+			name, kind = path[1:-5], 'html'
+		else:
+			return await writeResponse( writer, request, 404, b'' )
+		
+		if not self.resources:
+			return await writeResponse( writer, request, 503, b'' )
+		
+		# Long-poll: wait while the client has the current version.
+		ifNoneMatch = request.headers.get( 'if-none-match' )
+		wait = request.getWait()
+		deadline = self.loop.time() + wait
+		resource = self.resources.get( name )
+		while resource and resource.etag == ifNoneMatch and wait:
+			remaining = deadline - self.loop.time()
+			if remaining <= 0.0 or await self.waitForChange( remaining ) is None:
+				break
+			resource = self.resources.get( name )
+		
+		if resource is None:
+			return await writeResponse( writer, request, 404, b'' )
+		if resource.etag == ifNoneMatch:
+			return await writeResponse( writer, request, 304, b'', etag = resource.etag )
+		
+		gzipped = request.acceptsGzip() and len(resource.getBody(kind)) >= GzipMin
+		return await writeResponse(
+			writer, request, 200, resource.getBody(kind, gzipped), etag = resource.etag, gzipped = gzipped,
+			contentType = 'application/json' if kind == 'json' else 'text/html; charset=utf-8',
+		)
+	
+	async def streamEvents( self, writer ):
+		''' Server-sent events: {resource name: ETag} of the resources in each change. '''
+		writer.write( b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+			b'Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n' )
+		data = {name: r.etag for name, r in six.iteritems(self.resources)}
+		while True:
+			if data is None:
+				writer.write( b': ping\n\n' )
+			else:
+				writer.write( u'event: change\ndata: {}\n\n'.format(json.dumps(data)).encode('utf-8') )
+			await writer.drain()
+			changed = await self.waitForChange( EventsPingSeconds )
+			data = None if changed is None else {name: self.resources[name].etag if name in self.resources else None for name in changed}
+
+async def readRequest( reader ):
+	''' Returns the Request, or None if the client closed the connection. '''
+	line = await reader.readline()
+	if not line:
+		return None
+	try:
+		method, target, version = line.decode('latin-1').split()
+	except ValueError:
+		raise ValueError( 'bad request line' )
+	headers = {}
+	for i in six.moves.range(HeadersMax + 1):
+		line = await reader.readline()
+		if line in (b'\r\n', b'\n', b''):
+			break
+		if i == HeadersMax:
+			raise ValueError( 'too many headers' )
+		name, sep, value = line.decode('latin-1').partition( ':' )
+		headers[name.strip().lower()] = value.strip()
+	url = urlsplit( target )
+	return Request( method, unquote(url.path), parse_qs(url.query), version, headers )
+
+async def writeResponse( writer, request, status, body, etag = None, gzipped = False, contentType = 'text/plain' ):
+	''' Returns True if the connection can be kept open. '''
+	keepAlive = request.keepAlive and status != 405
+	headers = [
+		u'HTTP/1.1 {} {}'.format( status, Reasons[status] ),
+		u'Content-Type: {}'.format( contentType ),
+		u'Content-Length: {}'.format( len(body) ),
+		u'Cache-Control: no-cache',			# Always check the ETag.
+		u'Access-Control-Allow-Origin: *',
+		u'Vary: Accept-Encoding',
+		u'Connection: {}'.format( 'keep-alive' if keepAlive else 'close' ),
+	]
+	if etag:
+		headers.append( u'ETag: {}'.format(etag) )
+	if gzipped:
+		headers.append( u'Content-Encoding: gzip' )
+	writer.write( (u'\r\n'.join(headers) + u'\r\n\r\n').encode('latin-1') )
+	if request.method != 'HEAD':
+		writer.write( body )
+	await writer.drain()
+	return keepAlive
+
+def getLanAddress():
+	''' The address of this computer on the local network. '''
+	s = socket.socket( socket.AF_INET, socket.SOCK_DGRAM )
+	try:
+		s.connect( ('10.255.255.255', 1) )		# Nothing is sent.  Only picks the interface.
+		return s.getsockname()[0]
+	except (socket.error, OSError):
+		return None
+	finally:
+		s.close()
@@ -1,3 +1,6 @@
+import time
+startupTimes = [('start', time.time())]		# (phase, time) for the startup report.
+
 import wx
 import wx.adv
 from wx.lib.wordwrap import wordwrap
@@ -7,38 +10,79 @@ import sys
 import six
 import datetime
 import random
-import time
-import json
-import webbrowser
 import locale
 import traceback
-import xlwt
 import wx.lib.agw.flatnotebook as fnb
 from optparse import OptionParser
-import codecs
-import base64
-import uuid
 pickle = six.moves.cPickle
 StringIO = six.moves.StringIO
 
 import Utils
 import Model
+import Journal
+import undo
 import Version
+import Spans
 
-from Properties			import Properties
-from Seeding			import Seeding
-from Qualifiers			import Qualifiers
-from Events				import Events
-from Results			import Results
-from Chart				import Chart
-from GraphDraw			import GraphDraw
 from Competitions		import SetDefaultData
-from Printing			import SprintMgrPrintout, GraphDrawPrintout
-from ExportGrid			import ExportGrid, tag, writeHtmlHeader
-from FitSheetWrapper	import FitSheetWrapper
 from Events				import FontSize
 
-from SetGraphic			import SetGraphicDialog
+# The page modules, and the export and print modules, are imported when they are first used.
+
+#----------------------------------------------------------------------------------
+
+def addStartupTime( phase ):
+	startupTimes.append( (phase, time.time()) )
+
+def writeStartupReport():
+	tStart = startupTimes[0][1]
+	Utils.writeLog( u'startup: {} total={:.3f}s'.format(
+		u' '.join( u'{}={:.3f}s'.format(phase, t - tLast) for (_, tLast), (phase, t) in zip(startupTimes, startupTimes[1:]) ),
+		startupTimes[-1][1] - tStart,
+	) )
+
+def getPageClass( className ):
+	# Plain imports (not importlib) so PyInstaller finds the page modules.
+	if className == 'Properties':
+		from Properties import Properties
+		return Properties
+	if className == 'Seeding':
+		from Seeding import Seeding
+		return Seeding
+	if className == 'Qualifiers':
+		from Qualifiers import Qualifiers
+		return Qualifiers
+	if className == 'Results':
+		from Results import Results
+		return Results
+	if className == 'Events':
+		from Events import Events
+		return Events
+	if className == 'GraphDraw':
+		from GraphDraw import GraphDraw
+		return GraphDraw
+	if className == 'Chart':
+		from Chart import Chart
+		return Chart
+	if className == 'Performance':
+		from Performance import Performance
+		return Performance
+	raise ValueError( u'Unknown page: {}'.format(className) )
+
+class DeferredPage( wx.Panel ):
+	''' Notebook page that creates its contents the first time it is needed. '''
+	def __init__( self, parent, className ):
+		wx.Panel.__init__( self, parent )
+		self.className = className
+		self.page = None
+		self.SetSizer( wx.BoxSizer(wx.VERTICAL) )
+	
+	def getPage( self ):
+		if self.page is None:
+			self.page = getPageClass(self.className)( self )
+			self.GetSizer().Add( self.page, 1, flag=wx.EXPAND )
+			self.Layout()
+		return self.page
 
 #----------------------------------------------------------------------------------
 
@@ -134,9 +178,12 @@ def ShowTipAtStartup():
 		pass
 
 def replaceJsonVar( s, varName, value ):
+	import json
 	return s.replace( '%s = null' % varName, '%s = %s' % (varName, json.dumps(value)), 1 )
 
 #----------------------------------------------------------------------------------
+
+LiveResultsCheckMilliseconds = 500		# How often the live results server is checked for model changes.
 		
 class MainWin( wx.Frame ):
 	def __init__( self, parent, id = wx.ID_ANY, title='', size=(200,200) ):
@@ -153,6 +200,12 @@ class MainWin( wx.Frame ):
 		self.filehistory.Load(self.config)
 		
 		self.fileName = None
+		self.pageVersion = {}	# Model version when each page was last refreshed.
+		
+		# The live results server gets a snapshot of the model when the model changes.
+		self.liveServer = None
+		self.liveTimer = wx.Timer( self )
+		self.Bind( wx.EVT_TIMER, self.onLiveTimer, self.liveTimer )
 		
 		# Default print options.
 		self.printData = wx.PrintData()
@@ -196,8 +249,17 @@ class MainWin( wx.Frame ):
 		item = self.fileMenu.Append( wx.ID_ANY , "&Export to Excel...", "Export to an Excel Spreadsheet (.xls)" )
 		self.Bind(wx.EVT_MENU, self.menuExportToExcel, item )
 		
+		item = self.fileMenu.Append( wx.ID_ANY , "Export All &Tables to Excel...", "Export the Full Table and all the Results to one Excel Spreadsheet (.xls)" )
+		self.Bind(wx.EVT_MENU, self.menuExportAllToExcel, item )
+		
 		item = self.fileMenu.Append( wx.ID_ANY , "Export to &HTML...", "Export to HTML (.html)" )
 		self.Bind(wx.EVT_MENU, self.menuExportToHtml, item )
+		
+		item = self.fileMenu.Append( wx.ID_ANY , "Publish &Web Site...", "Write every page to a folder with an index.  Only the changed pages are written." )
+		self.Bind(wx.EVT_MENU, self.menuPublishWebSite, item )
+		
+		self.liveResultsItem = self.fileMenu.AppendCheckItem( wx.ID_ANY , "&Live Results Server...", "Serve the results to browsers on this network" )
+		self.Bind(wx.EVT_MENU, self.menuLiveResults, self.liveResultsItem )
 
 		self.fileMenu.AppendSeparator()
 		
@@ -220,6 +282,17 @@ class MainWin( wx.Frame ):
 		
 		self.menuBar.Append( self.fileMenu, "&File" )
 
+		#-----------------------------------------------------------------------
+		self.editMenu = wx.Menu()
+		
+		self.editMenu.Append( wx.ID_UNDO , "&Undo\tCtrl+Z", "Undo the last change" )
+		self.Bind(wx.EVT_MENU, self.menuUndo, id=wx.ID_UNDO )
+		
+		self.editMenu.Append( wx.ID_REDO , "&Redo\tCtrl+Y", "Redo the last undo" )
+		self.Bind(wx.EVT_MENU, self.menuRedo, id=wx.ID_REDO )
+		
+		self.menuBar.Append( self.editMenu, "&Edit" )
+		
 		#-----------------------------------------------------------------------
 
 		# Configure the field of the display.
@@ -232,25 +305,28 @@ class MainWin( wx.Frame ):
 		self.notebook.Bind( fnb.EVT_FLATNOTEBOOK_PAGE_CHANGED, self.onPageChanging )
 		
 		# Add all the pages to the notebook.
+		# The pages are created when they are first shown (see getPage).
 		self.pages = []
+		self.deferredPages = []
 
-		def addPage( page, name ):
-			self.notebook.AddPage( page, name )
-			self.pages.append( page )
+		def addPage( deferredPage, name ):
+			self.notebook.AddPage( deferredPage, name )
+			self.deferredPages.append( deferredPage )
+			self.pages.append( None )
 			
 		self.attrClassName = [
-			[ 'properties',		Properties,			'Properties' ],
-			[ 'seeding',		Seeding,			'Seeding' ],
-			[ 'qualifiers',		Qualifiers,			'Qualifiers' ],
-			[ 'results',		Results,			'Start Lists & Results' ],
-			[ 'events',			Events,				'Events' ],
-			[ 'graphDraw',		GraphDraw,			'Summary' ],
-			[ 'chart',			Chart,				'Full Table' ],
+			[ 'properties',		'Properties',		'Properties' ],
+			[ 'seeding',		'Seeding',			'Seeding' ],
+			[ 'qualifiers',		'Qualifiers',		'Qualifiers' ],
+			[ 'results',		'Results',			'Start Lists & Results' ],
+			[ 'events',			'Events',			'Events' ],
+			[ 'graphDraw',		'GraphDraw',		'Summary' ],
+			[ 'chart',			'Chart',			'Full Table' ],
 		]
 		
 		for i, (a, c, n) in enumerate(self.attrClassName):
-			setattr( self, a, c(self.notebook) )
-			addPage( getattr(self, a), n )
+			setattr( self, a, None )
+			addPage( DeferredPage(self.notebook, c), n )
 			
 		#self.notebook.ChangeSelection( 0 )
 		self.notebook.SetSelection( 0 )
@@ -292,6 +368,11 @@ class MainWin( wx.Frame ):
 		#------------------------------------------------------------------------------
 		self.SetMenuBar( self.menuBar )
 		
+		# The Performance page is not in the menus.  Show it with Ctrl+Alt+P.
+		idPerformance = wx.NewIdRef()
+		self.Bind(wx.EVT_MENU, self.menuShowPerformance, id=idPerformance )
+		self.SetAcceleratorTable( wx.AcceleratorTable([(wx.ACCEL_CTRL|wx.ACCEL_ALT, ord('P'), idPerformance)]) )
+		
 		#------------------------------------------------------------------------------
 		self.Bind(wx.EVT_CLOSE, self.onCloseWindow)
 		
@@ -302,15 +383,20 @@ class MainWin( wx.Frame ):
 		wx.CallAfter( self.Refresh )
 
 	def resetEvents( self ):
-		self.events.reset()
+		if self.events is not None:
+			self.events.reset()
 		
 	def menuUndo( self, event ):
-		undo.doUndo()
-		self.refresh()
+		if undo.doUndo():
+			self.resetEvents()
+			self.refresh()
+			self.writeRace()
 		
 	def menuRedo( self, event ):
-		undo.doRedo()
-		self.refresh()
+		if undo.doRedo():
+			self.resetEvents()
+			self.refresh()
+			self.writeRace()
 		
 	def menuTipAtStartup( self, event ):
 		showing = self.config.ReadBool('showTipAtStartup', True)
@@ -338,33 +424,32 @@ class MainWin( wx.Frame ):
 		self.printData = wx.PrintData( dlg.GetPageSetupData().GetPrintData() )
 		dlg.Destroy()
 
-	def getTitle( self ):
+	def getTitle( self, pageTitle = None ):
+		import GridData
 		model = Model.model
-		iSelection = self.notebook.GetSelection()
-		try:
-			pageTitle = self.pages[iSelection].getTitle()
-		except:
-			pageTitle = self.attrClassName[iSelection][2]
-			
-		title = '%s\n%s (%s)\n%s' % (
-			pageTitle,
-			model.competition_name, model.date.strftime('%Y-%m-%d'),
-			model.category,
-		)
-		return title
+		if pageTitle is None:
+			iSelection = self.notebook.GetSelection()
+			try:
+				pageTitle = self.getPage(iSelection).getTitle()
+			except:
+				pageTitle = self.attrClassName[iSelection][2]
+		return GridData.getTitle( model, pageTitle )
 	
 	def setFontSize( self, fontSize ):
 		font = wx.Font( (0,fontSize), wx.FONTFAMILY_SWISS, wx.FONTSTLE_NORMAL, wx.FONTWEIGHT_NORMAL )
 		for attr, _1, _2 in self.attrClassName:
 			page = getattr( self, attr )
+			if page is None:
+				continue
 			Utils.ChangeFontInChildren( page, font )
 			page.GetSizer().Layout()
 		Events.FontSize = fontSize
 	
 	def menuPrintPreview( self, event ):
+		from Printing import SprintMgrPrintout, GraphDrawPrintout
 		self.commit()
 		title = self.getTitle()
-		page = self.pages[self.notebook.GetSelection()]
+		page = self.getCurrentPage()
 		try:
 			grid = page.getGrid()
 			printout = SprintMgrPrintout( title, grid )
@@ -391,9 +476,10 @@ class MainWin( wx.Frame ):
 		pfrm.Show(True)
 
 	def menuPrint( self, event ):
+		from Printing import SprintMgrPrintout, GraphDrawPrintout
 		self.commit()
 		title = self.getTitle()
-		page = self.pages[self.notebook.GetSelection()]
+		page = self.getCurrentPage()
 		try:
 			grid = page.getGrid()
 			printout = SprintMgrPrintout( title, grid )
@@ -420,19 +506,37 @@ class MainWin( wx.Frame ):
 
 	#--------------------------------------------------------------------------------------------
 
+	def getPageData( self, iSelection ):
+		''' Returns (pageTitle, GridData) from the model for the pages that have one, otherwise None. '''
+		import GridData
+		getData = {
+			'Chart':	GridData.getChartPageData,
+			'Results':	GridData.getResultsPageData,
+		}.get( self.attrClassName[iSelection][1], None )
+		return getData( Model.model ) if getData else None
+	
 	def menuExportToExcel( self, event ):
+		import xlwt
+		import webbrowser
+		from ExportGrid import ExportGrid, writeExcelSheet
 		self.commit()
 		iSelection = self.notebook.GetSelection()
-		page = self.pages[iSelection]
-		try:
-			grid = page.getGrid()
-		except:
-			return
 		
-		try:
-			pageTitle = self.pages[iSelection].getTitle()
-		except:
-			pageTitle = self.attrClassName[iSelection][2]
+		# Export from the model if we can.  Otherwise, export the page's grid.
+		pageData = self.getPageData( iSelection )
+		if pageData:
+			pageTitle, data = pageData
+		else:
+			page = self.getPage( iSelection )
+			try:
+				grid = page.getGrid()
+			except:
+				return
+			
+			try:
+				pageTitle = page.getTitle()
+			except:
+				pageTitle = self.attrClassName[iSelection][2]
 		
 		if not self.fileName or len(self.fileName) < 4:
 			Utils.MessageOK(self, 'You must Save before you can Export to Excel', 'Excel Write')
@@ -450,17 +554,21 @@ class MainWin( wx.Frame ):
 
 		xlFName = os.path.join( dName, os.path.basename(xlFName) )
 
-		title = self.getTitle()
+		title = self.getTitle( pageTitle if pageData else None )
 		
-		wb = xlwt.Workbook()
-		sheetName = pageTitle
-		sheetName = re.sub('[+!#$%&+~`".:;|\\/?*\[\] ]+', ' ', sheetName)[:31]
-		sheetCur = wb.add_sheet( sheetName )
-		export = ExportGrid( title, grid )
-		export.toExcelSheet( sheetCur )
+		with Spans.span( 'export.excel' ):
+			wb = xlwt.Workbook()
+			sheetName = pageTitle
+			sheetName = re.sub('[+!#$%&+~`".:;|\\/?*\[\] ]+', ' ', sheetName)[:31]
+			sheetCur = wb.add_sheet( sheetName )
+			if pageData:
+				writeExcelSheet( sheetCur, title, data.headerNames, iter(data.rows) )
+			else:
+				ExportGrid( title, grid ).toExcelSheet( sheetCur )
 
 		try:
-			wb.save( xlFName )
+			with Spans.span( 'export.excel.save' ):
+				wb.save( xlFName )
 			webbrowser.open( xlFName, new = 2, autoraise = True )
 			Utils.MessageOK(self, 'Excel file written to:\n\n   %s' % xlFName, 'Excel Export')
 		except IOError:
@@ -468,7 +576,52 @@ class MainWin( wx.Frame ):
 						'Cannot write "%s".\n\nCheck if this spreadsheet is open.\nIf so, close it, and try again.' % xlFName,
 						'Excel File Error', iconMask=wx.ICON_ERROR )
 						
+	def menuExportAllToExcel( self, event ):
+		import xlwt
+		import webbrowser
+		import GridData
+		from ExportGrid import writeExcelSheet, getExcelSheetName
+		self.commit()
+		
+		if not self.fileName or len(self.fileName) < 4:
+			Utils.MessageOK(self, 'You must Save before you can Export to Excel', 'Excel Write')
+			return
+		
+		xlFName = self.fileName[:-4] + '-All.xls'
+		dlg = wx.DirDialog( self, 'Folder to write "%s"' % os.path.basename(xlFName),
+						style=wx.DD_DEFAULT_STYLE, defaultPath=os.path.dirname(xlFName) )
+		ret = dlg.ShowModal()
+		dName = dlg.GetPath()
+		dlg.Destroy()
+		if ret != wx.ID_OK:
+			return
+		
+		xlFName = os.path.join( dName, os.path.basename(xlFName) )
+		
+		# Each table is computed from the model and written before the next one, without the pages.
+		with Spans.span( 'export.excelAll' ):
+			wb = xlwt.Workbook()
+			sheetNames = set()
+			for name, pageTitle, data in GridData.iterPageData( Model.model ):
+				sheetCur = wb.add_sheet( getExcelSheetName(name, sheetNames) )
+				writeExcelSheet( sheetCur, self.getTitle(pageTitle), data.headerNames, iter(data.rows) )
+		
+		try:
+			with Spans.span( 'export.excelAll.save' ):
+				wb.save( xlFName )
+			webbrowser.open( xlFName, new = 2, autoraise = True )
+			Utils.MessageOK(self, 'Excel file written to:\n\n   %s' % xlFName, 'Excel Export')
+		except IOError:
+			Utils.MessageOK(self,
+						'Cannot write "%s".\n\nCheck if this spreadsheet is open.\nIf so, close it, and try again.' % xlFName,
+						'Excel File Error', iconMask=wx.ICON_ERROR )
+	
 	def menuExportFinalClassificationToExcel( self, event ):
+		import math
+		import xlwt
+		import arial10
+		import webbrowser
+		import GridData
 		self.commit()
 		
 		pageTitle = 'Final Classification'
@@ -499,58 +652,45 @@ class MainWin( wx.Frame ):
 		sheetName = re.sub('[+!#$%&+~`".:;|\\/?*\[\] ]+', ' ', sheetName)[:31]
 
 		sheetCur = wb.add_sheet( sheetName )
-		sheetFit = FitSheetWrapper( sheetCur )
-		
-		headerNames = [u'Pos', u'Bib', u'LastName', u'FirstName', u'Team', u'License', u'Category']
-		leftJustifyCols = { h for h in headerNames if h not in {u'Pos', u'Bib'} }
-		
-		leftStyle = xlwt.XFStyle()
-		leftStyle.alignment.horz = xlwt.Alignment.HORZ_LEFT
 		
-		rightStyle = xlwt.XFStyle()
-		rightStyle.alignment.horz = xlwt.Alignment.HORZ_RIGHT
-		
-		leftHeaderStyle = xlwt.XFStyle()
-		leftHeaderStyle.borders.bottom = xlwt.Borders.MEDIUM
-		leftHeaderStyle.font.bold = True
-		leftHeaderStyle.alignment.horz = xlwt.Alignment.HORZ_LEFT
-		leftHeaderStyle.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
-	
-		rightHeaderStyle = xlwt.XFStyle()
-		rightHeaderStyle.borders.bottom = xlwt.Borders.MEDIUM
-		rightHeaderStyle.font.bold = True
-		rightHeaderStyle.alignment.horz = xlwt.Alignment.HORZ_RIGHT
-		rightHeaderStyle.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
-	
-		rowTop = 0
-		results, dnfs, dqs = competition.getResults()
-		for col, c in enumerate(headerNames):
-			sheetFit.write( rowTop, col, c, leftHeaderStyle if c in leftJustifyCols else rightHeaderStyle, bold=True )
-		rowTop += 1
-		
-		for row, r in enumerate(results):
-			if r:
-				for col, value in enumerate([row+1, r.bib if r.bib else u'', r.last_name.upper(), r.first_name, r.team, r.license, model.category]):
-					sheetFit.write( rowTop, col, value, leftStyle if headerNames[col] in leftJustifyCols else rightStyle )
-			rowTop += 1
-		
-		for r in dnfs:
-			for col, value in enumerate([u'DNF', r.bib if r.bib else u'', r.last_name.upper(), r.first_name, r.team, r.license, model.category]):
-				sheetFit.write( rowTop, col, value, leftStyle if headerNames[col] in leftJustifyCols else rightStyle )
-			rowTop += 1
+		with Spans.span( 'export.finalClassification' ):
+			data = GridData.getSeriesMgrData( model )
+			headerNames = data.headerNames
+			leftJustifyCols = { h for h in headerNames if h not in {u'Pos', u'Bib'} }
+			
+			leftStyle = xlwt.XFStyle()
+			leftStyle.alignment.horz = xlwt.Alignment.HORZ_LEFT
 			
-		for r in dqs:
-			for col, value in enumerate([u'DQ', r.bib if r.bib else u'', r.last_name.upper(), r.first_name, r.team, r.license, model.category]):
-				sheetFit.write( rowTop, col, value, leftStyle if headerNames[col] in leftJustifyCols else rightStyle )
-			rowTop += 1
+			rightStyle = xlwt.XFStyle()
+			rightStyle.alignment.horz = xlwt.Alignment.HORZ_RIGHT
 			
-		for r in model.getDNQs():
-			for col, value in enumerate([u'DQ', r.bib if r.bib else u'', r.last_name.upper(), r.first_name, r.team, r.license, model.category]):
-				sheetFit.write( rowTop, col, value, leftStyle if headerNames[col] in leftJustifyCols else rightStyle )
-			rowTop += 1
+			leftHeaderStyle = xlwt.XFStyle()
+			leftHeaderStyle.borders.bottom = xlwt.Borders.MEDIUM
+			leftHeaderStyle.font.bold = True
+			leftHeaderStyle.alignment.horz = xlwt.Alignment.HORZ_LEFT
+			leftHeaderStyle.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
+		
+			rightHeaderStyle = xlwt.XFStyle()
+			rightHeaderStyle.borders.bottom = xlwt.Borders.MEDIUM
+			rightHeaderStyle.font.bold = True
+			rightHeaderStyle.alignment.horz = xlwt.Alignment.HORZ_RIGHT
+			rightHeaderStyle.alignment.wrap = xlwt.Alignment.WRAP_AT_RIGHT
+			
+			styles = [leftStyle if h in leftJustifyCols else rightStyle for h in headerNames]
+			for col, h in enumerate(headerNames):
+				sheetCur.write( 0, col, h, leftHeaderStyle if h in leftJustifyCols else rightHeaderStyle )
+			for row, values in enumerate(data.rows):
+				for col, value in enumerate(values):
+					sheetCur.write( row + 1, col, value, styles[col] )
+			
+			# Size each column once from all its values.
+			for col, h in enumerate(headerNames):
+				width = max( arial10.getTextWidth(u' {}'.format(h), True), arial10.getColumnWidth(u' {}'.format(values[col]) for values in data.rows) )
+				sheetCur.col(col).width = int(math.ceil(width))
 
 		try:
-			wb.save( xlFName )
+			with Spans.span( 'export.finalClassification.save' ):
+				wb.save( xlFName )
 			webbrowser.open( xlFName, new = 2, autoraise = True )
 			Utils.MessageOK(self, 'Excel file written to:\n\n   %s' % xlFName, 'Excel Export')
 		except IOError:
@@ -559,9 +699,11 @@ class MainWin( wx.Frame ):
 						'Excel File Error', iconMask=wx.ICON_ERROR )
 	
 	def menuExportToHtml( self, event ):
+		import webbrowser
+		from ExportGrid import ExportGrid, htmlDocument, writeHtmlHeader, getImagePng, getPngDataUri
 		self.commit()
 		iSelection = self.notebook.GetSelection()
-		page = self.pages[iSelection]
+		page = self.getPage( iSelection )
 		
 		grid = None
 		image = None
@@ -580,7 +722,7 @@ class MainWin( wx.Frame ):
 			return
 		
 		try:
-			pageTitle = self.pages[iSelection].getTitle()
+			pageTitle = page.getTitle()
 		except:
 			pageTitle = self.attrClassName[iSelection][2]
 		
@@ -602,99 +744,21 @@ class MainWin( wx.Frame ):
 
 		title = self.getTitle()
 		
-		htmlStream = StringIO()
-		html = codecs.getwriter('utf8')( htmlStream )
-		
-		with tag(html, 'html'):
-			with tag(html, 'head'):
-				with tag(html, 'title'):
-					html.write( title.replace(u'\n', u' ') )
-				with tag(html, 'meta', dict(charset="UTF-8", author="Edward Sitarski", copyright="Edward Sitarski, 2013", generator="SprintMgr")):
-					pass
-				with tag(html, 'style', dict( type="text/css")):
-					html.write( '''
-body{ font-family: sans-serif; }
-
-#idRaceName {
-	font-size: 200%;
-	font-weight: bold;
-}
-#idImgHeader { box-shadow: 4px 4px 4px #888888; }
-.smallfont { font-size: 80%; }
-.bigfont { font-size: 120%; }
-.hidden { display: none; }
-
-table.results
-{
-	font-family:"Trebuchet MS", Arial, Helvetica, sans-serif;
-	border-collapse:collapse;
-}
-table.results td, table.results th 
-{
-	font-size:1em;
-	padding:3px 7px 2px 7px;
-	text-align: left;
-}
-table.results th 
-{
-	font-size:1.1em;
-	text-align:left;
-	padding-top:5px;
-	padding-bottom:4px;
-	background-color:#7FE57F;
-	color:#000000;
-}
-table.results tr.odd
-{
-	color:#000000;
-	background-color:#EAF2D3;
-}
-table.results tr:hover
-{
-	color:#000000;
-	background-color:#FFFFCC;
-}
-table.results tr.odd:hover
-{
-	color:#000000;
-	background-color:#FFFFCC;
-}
-
-table.results td {
-	border-top:1px solid #98bf21;
-}
-
-table.results td.noborder {
-	border-top:0px solid #98bf21;
-}
-
-table.results td.rAlign, table.results th.rAlign {
-	text-align:right;
-}
-
-table.results tr td.fastest{
-	color:#000000;
-	background-color:#80FF80;
-}
-
-@media print { .noprint { display: none; } }''' )
-
-			with tag(html, 'body'):
-				if grid:
-					ExportGrid( title, grid ).toHtml(html)
-				elif image:
-					pngFName = os.path.join( dName, '{}.png'.format(uuid.uuid4()) )
-					image.SaveFile( pngFName, wx.BITMAP_TYPE_PNG )
-					with open(pngFName, 'rb') as fp:
-						data = base64.b64encode( fp.read() )
-					os.remove( pngFName )
-					writeHtmlHeader( html, title )
-					html.write( '<img id="idResultsSummary" src="data:image/png;base64,%s" />' % data )
-		
-		html = htmlStream.getvalue()
+		tStart = Spans.timer()
+		html = StringIO()
+		with htmlDocument(html, title):
+			if grid:
+				ExportGrid( title, grid ).toHtml(html)
+			elif image:
+				writeHtmlHeader( html, title )
+				html.write( u'<img id="idResultsSummary" src="{}" />'.format(getPngDataUri(getImagePng(image))) )
+		
+		html = html.getvalue().encode( 'utf-8' )
+		if Spans.isEnabled():
+			Spans.record( 'export.html', Spans.timer() - tStart )
 		
 		try:
-			with open(htmlFName, 'wb') as fp:
+			with Spans.span( 'export.html.save' ), open(htmlFName, 'wb') as fp:
 				fp.write( html )
 			webbrowser.open( htmlFName, new = 2, autoraise = True )
 			Utils.MessageOK(self, u'Html file written to:\n\n   %s' % htmlFName, 'Html Write')
@@ -703,21 +767,88 @@ table.results tr td.fastest{
 						u'Cannot write "%s".\n\nCheck if this file is open.\nIf so, close it, and try again.' % htmlFName,
 						u'Html File Error', iconMask=wx.ICON_ERROR )
 	
+	def menuPublishWebSite( self, event ):
+		import webbrowser
+		import WebSite
+		self.commit()
+		
+		if not self.fileName or len(self.fileName) < 4:
+			Utils.MessageOK(self, u'You must Save before you can Publish a Web Site', u'Publish Web Site')
+			return
+		
+		# Publishing to the same folder again only writes the changed pages.
+		dName = self.fileName[:-4] + '-Web'
+		dlg = wx.DirDialog( self, u'Web Site Folder', style=wx.DD_DEFAULT_STYLE, defaultPath=dName )
+		ret = dlg.ShowModal()
+		dName = dlg.GetPath()
+		dlg.Destroy()
+		if ret != wx.ID_OK:
+			return
+		
+		try:
+			with Spans.span( 'export.webSite' ):
+				written, unchanged = WebSite.publish( dName, Model.model )
+		except (IOError, OSError) as e:
+			Utils.MessageOK(self, u'Cannot write to "{}".\n\n{}'.format(dName, e), u'Publish Web Site', iconMask=wx.ICON_ERROR )
+			return
+		
+		webbrowser.open( os.path.join(dName, WebSite.IndexFName), new = 2, autoraise = True )
+		Utils.MessageOK(self, u'Web site written to:\n\n   {}\n\n{} files written, {} pages unchanged.'.format(dName, len(written), unchanged), u'Publish Web Site')
+	
+	def menuLiveResults( self, event ):
+		if self.liveServer:
+			self.liveTimer.Stop()
+			self.liveServer.stop()
+			self.liveServer = None
+			self.liveResultsItem.Check( False )
+			return
+		
+		import LiveResults
+		self.liveResultsItem.Check( False )
+		port = wx.GetNumberFromUser( u'Serve the live results to browsers on this network.', u'Port:', u'Live Results Server',
+			LiveResults.DefaultPort, 1024, 65535, self )
+		if port < 0:
+			return
+		
+		server = LiveResults.LiveServer( '', port )
+		try:
+			server.start()
+		except (IOError, OSError) as e:
+			Utils.MessageOK(self, u'Cannot start the server on port {}.\n\n{}'.format(port, e), u'Live Results Server', iconMask=wx.ICON_ERROR )
+			return
+		
+		self.liveServer = server
+		self.liveResultsItem.Check( True )
+		server.publish( Model.model )
+		self.liveTimer.Start( LiveResultsCheckMilliseconds )
+		Utils.MessageOK(self, u'Live results at:\n\n   {}'.format(u'\n   '.join(server.getUrls())), u'Live Results Server' )
+	
+	def onLiveTimer( self, event ):
+		# Only copies the model if it changed.  The server sends the changes to the clients on its own thread.
+		if self.liveServer:
+			self.liveServer.publish( Model.model )
+	
 	#--------------------------------------------------------------------------------------------
 	def onCloseWindow( self, event ):
+		if self.liveServer:
+			self.liveTimer.Stop()
+			self.liveServer.stop()
 		self.showResultsPage()
-		self.writeRace()
+		try:
+			self.writeRace()
+		except (IOError, OSError):
+			pass
+		Journal.close()		# Wait for the background writes.
+		Spans.dump( Utils.writeLog )
 		wx.Exit()
 
+	@Spans.timed( 'MainWin.writeRace' )
 	def writeRace( self ):
 		self.commit()
 		if not self.fileName:
 			self.setTitle()
 			return
-		model = Model.model
-		with open(self.fileName, 'wb') as fp:
-			pickle.dump( model, fp, 2 )
-		model.setChanged( False )
+		Journal.writeRace( Model.model, self.fileName )
 		self.setTitle()
 		
 	def showResultsPage( self ):
@@ -785,8 +916,7 @@ table.results tr td.fastest{
 		if not fileName:
 			return
 		try:
-			with open(fileName, 'rb') as fp:
-				Model.model = pickle.load( fp )
+			Model.model, commandCount = Journal.readRace( fileName )
 		except IOError:
 			Utils.MessageOK(self, u'Cannot Open File "{}".'.format(fileName), u'Cannot Open File', iconMask=wx.ICON_ERROR )
 			return
@@ -796,7 +926,12 @@ table.results tr td.fastest{
 		self.updateRecentFiles()
 		Model.model.setChanged( False )
 		# Model.model.competition.reset()
-		Model.model.competition.propagate()
+		Model.model.competition.propagate()		# Only the events that were pending when the file was saved.
+		try:
+			Journal.writeRace( Model.model, fileName )	# Start the journal from a new snapshot.
+		except (IOError, OSError):
+			Journal.close()
+			Model.model.setChanged( True )
 		self.refreshAll()
 		if Model.model.canReassignStarters():
 			self.showPageName( 'Properties' )
@@ -826,7 +961,7 @@ table.results tr td.fastest{
 		try:
 			self.writeRace()
 		except:
-			Utils.MessageOK(self, u'Write Failed.  Competition NOT saved.\n\n"{}".'.format(fileName),
+			Utils.MessageOK(self, u'Write Failed.  Competition NOT saved.\n\n"{}".'.format(self.fileName),
 								u'Write Failed', iconMask=wx.ICON_ERROR )
 		self.updateRecentFiles()
 
@@ -865,6 +1000,7 @@ table.results tr td.fastest{
 			Utils.MessageOK(self, u'Cannot open file "{}".'.format(fileName), u'Cannot Open File', iconMask=wx.ICON_ERROR )
 			return
 			
+		Journal.close()	# The file was truncated - start again with a snapshot.
 		self.fileName = fileName
 		self.menuSave( event )
 		
@@ -905,6 +1041,7 @@ table.results tr td.fastest{
 			Utils.MessageOK(self, _("Unable to open the clipboard."), _("Error"), wx.ICON_ERROR )
 
 	def menuSetGraphic( self, event ):
+		from SetGraphic import SetGraphicDialog
 		imgPath = self.getGraphicFName()
 		dlg = SetGraphicDialog( self, graphic = imgPath )
 		if dlg.ShowModal() == wx.ID_OK:
@@ -925,6 +1062,7 @@ table.results tr td.fastest{
 		return defaultFName
 	
 	def getGraphicBase64( self ):
+		import base64
 		graphicFName = self.getGraphicFName()
 		if not graphicFName:
 			return None
@@ -996,18 +1134,41 @@ table.results tr td.fastest{
 
 	#--------------------------------------------------------------------------------------
 
+	def getPage( self, i ):
+		''' Returns the page, creating it if it has not been shown yet. '''
+		if self.pages[i] is None:
+			self.pages[i] = self.deferredPages[i].getPage()
+			setattr( self, self.attrClassName[i][0], self.pages[i] )
+		return self.pages[i]
+	
 	def getCurrentPage( self ):
-		return self.pages[self.notebook.GetSelection()]
+		return self.getPage( self.notebook.GetSelection() )
+	
+	def menuShowPerformance( self, event ):
+		for i, (a, c, n) in enumerate(self.attrClassName):
+			if c == 'Performance':
+				break
+		else:
+			# Add the page the first time it is asked for.
+			self.attrClassName.append( [ 'performance', 'Performance', 'Performance' ] )
+			self.performance = None
+			deferredPage = DeferredPage( self.notebook, 'Performance' )
+			self.notebook.AddPage( deferredPage, 'Performance' )
+			self.deferredPages.append( deferredPage )
+			self.pages.append( None )
+			i = len(self.pages) - 1
+		self.showPage( i )
+		self.callPageRefresh( i )	# The timings change without a model change.
 	
 	def showPage( self, iPage ):
 		try:
 			self.writeRace()
 		except:
 			self.commit()
-		self.callPageRefresh( iPage )
+		self.callPageRefreshIfChanged( iPage )
 		#self.notebook.ChangeSelection( iPage )
 		self.notebook.SetSelection( iPage )
-		self.pages[self.notebook.GetSelection()].Layout()
+		self.getCurrentPage().Layout()
 		self.Layout()
 
 	def showPageName( self, name ):
@@ -1028,35 +1189,48 @@ table.results tr td.fastest{
 	def refresh( self ):
 		self.refreshCurrentPage()
 
+	def getModelVersion( self ):
+		return (Model.model, Model.model.version)
+	
 	def callPageRefresh( self, i ):
 		try:
-			self.pages[i].refresh()
+			page = self.getPage(i)
+			with Spans.span( 'refresh.' + self.attrClassName[i][1] ):
+				page.refresh()
 		except (AttributeError, IndexError) as e:
 			pass
+		self.pageVersion[i] = self.getModelVersion()
+	
+	def callPageRefreshIfChanged( self, i ):
+		if self.pageVersion.get(i, None) != self.getModelVersion():
+			self.callPageRefresh( i )
 
 	def callPageCommit( self, i ):
+		if not (0 <= i < len(self.pages)) or self.pages[i] is None:
+			return		# Page not created - nothing to commit.
+		delta = undo.ModelDelta( Model.model )
 		try:
 			self.pages[i].commit()
 			self.setTitle()
 		except (AttributeError, IndexError) as e:
 			pass
+		if undo.push( delta ):
+			Model.model.setChanged( True )
 
 	def onPageChanging( self, event ):
 		notebook = event.GetEventObject()
 		self.callPageCommit( event.GetOldSelection() )
-		self.callPageRefresh( event.GetSelection() )
+		self.callPageRefreshIfChanged( event.GetSelection() )
 		try:
-			Utils.writeLog( u'page: {}\n'.format(notebook.GetPage(event.GetSelection()).__class__.__name__) )
+			Utils.writeLog( u'page: {}\n'.format(self.attrClassName[event.GetSelection()][1]) )
 		except IndexError:
 			pass
 		event.Skip()	# Required to properly repaint the screen.
 
 	def refreshAll( self ):
+		# Only refresh the current page.  The others are refreshed when they are shown.
+		self.pageVersion = {}
 		self.refresh()
-		iSelect = self.notebook.GetSelection()
-		for i, p in enumerate(self.pages):
-			if i != iSelect:
-				self.callPageRefresh( i )
 		self.setTitle()
 
 # Set log file location.
@@ -1097,19 +1271,29 @@ def MainLoop():
 			pass
 	
 	Utils.writeLog( 'start: {}'.format(Version.AppVerName) )
+	addStartupTime( 'imports' )
+	Spans.setEnabled( True )
 	
 	# Create some sample data.
 	Model.model = SetDefaultData()
+	addStartupTime( 'model' )
 	
 	# Configure the main window.
 	sWidth, sHeight = wx.GetDisplaySize()
 	mainWin = MainWin( None, title=Version.AppVerName, size=(sWidth*0.9,sHeight*0.9) )
 	if options.fullScreen:
 		mainWin.Maximize( True )
+	addStartupTime( 'window' )
 		
 	mainWin.refreshAll()
 	mainWin.CenterOnScreen()
 	mainWin.Show()
+	addStartupTime( 'show' )
+	
+	def onFirstFrame():
+		addStartupTime( 'firstFrame' )
+		writeStartupReport()
+	wx.CallAfter( onFirstFrame )
 
 	# Set the upper left icon.
 	icon = wx.Icon( os.path.join(Utils.getImageFolder(), 'SprintMgr.ico'), wx.BITMAP_TYPE_ICO )
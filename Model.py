@@ -1,11 +1,18 @@
 import sys
 import six
+import copy
+import heapq
 import random
+import hashlib
+import bisect
 import datetime
+import itertools
 import traceback
 
 from collections import defaultdict
-import Utils
+import TimeUtils
+import Spans
+pickle = six.moves.cPickle
 
 QualifyingTimeDefault = 99*60*60
 
@@ -14,8 +21,37 @@ SprintFinalCompetitionTime = 3*60.0
 
 KeirinCompetitionTime = 5*60.0
 
-class Rider( object ):
-	status = ''
+class Slotted( object ):
+	''' Base of the model classes with __slots__ (there are many of them in a simulation).
+		They are pickled as a dict like plain objects, so previous versions can read the files.
+		Attributes must also be pickled as types previous versions have (see State.__getstate__). '''
+	__slots__ = ()
+	slotDefaults = {}		# Values of the slots that are missing in files from previous versions.
+	cacheSlots = ()			# Derived data - not saved or copied.
+	
+	def __getstate__( self ):
+		state = {}
+		for attr in self.__slots__:
+			if attr in self.cacheSlots:
+				continue
+			try:
+				state[attr] = getattr( self, attr )
+			except AttributeError:
+				pass
+		return state
+	
+	def __setstate__( self, state ):
+		for attr, value in six.iteritems(self.slotDefaults):
+			setattr( self, attr, copy.copy(value) )
+		for attr, value in six.iteritems(state):
+			try:
+				setattr( self, attr, value )
+			except AttributeError:
+				pass	# Not used anymore.
+
+class Rider( Slotted ):
+	__slots__ = ('bib', 'first_name', 'last_name', 'team', 'team_code', 'license', 'qualifyingTime', 'iSeeding', 'status')
+	slotDefaults = {'status': ''}
 	
 	def __init__( self, bib,
 			first_name = '', last_name = '', team = '', team_code = '', license = '',
@@ -52,7 +88,7 @@ class Rider( object ):
 		
 	@property
 	def qualifyingTimeText( self ):
-		return Utils.SecondsToStr(self.qualifyingTime) if self.qualifyingTime < QualifyingTimeDefault else ''
+		return TimeUtils.SecondsToStr(self.qualifyingTime) if self.qualifyingTime < QualifyingTimeDefault else ''
 		
 	@property
 	def full_name( self ):
@@ -82,23 +118,120 @@ class Rider( object ):
 
 #------------------------------------------------------------------------------------------------
 
-class State( object ):
+versionCounter = itertools.count( 1 )
+
+class VersionedDict( dict ):
+	''' A dict that gets a new version on every change.  Versions are unique across all VersionedDicts.
+		After trackChanges, the changed keys are also collected in changedKeys (None after a clear). '''
+	version = 0
+	changedKeys = None
+	
+	def __init__( self, *args, **kwargs ):
+		dict.__init__( self, *args, **kwargs )
+		self.version = next( versionCounter )
+	
+	def __reduce_ex__( self, protocol ):
+		# Pickled as a plain dict so previous versions can read the file (State wraps it again on load).
+		# The version is not saved.  It is only unique in this process.
+		return (dict, (dict(self),))
+	
+	def __copy__( self ):
+		return VersionedDict( self )		# A copy gets its own version.
+	
+	def __deepcopy__( self, memo ):
+		return VersionedDict( copy.deepcopy(dict(self), memo) )
+	
+	def trackChanges( self ):
+		self.changedKeys = set()
+	
+	def __setitem__( self, key, value ):
+		self.version = next( versionCounter )
+		if self.changedKeys is not None:
+			self.changedKeys.add( key )
+		dict.__setitem__( self, key, value )
+	
+	def __delitem__( self, key ):
+		self.version = next( versionCounter )
+		if self.changedKeys is not None:
+			self.changedKeys.add( key )
+		dict.__delitem__( self, key )
+	
+	def pop( self, *args ):
+		self.version = next( versionCounter )
+		if self.changedKeys is not None:
+			self.changedKeys.add( args[0] )
+		return dict.pop( self, *args )
+	
+	def popitem( self ):
+		self.version = next( versionCounter )
+		key, value = dict.popitem( self )
+		if self.changedKeys is not None:
+			self.changedKeys.add( key )
+		return key, value
+	
+	def setdefault( self, key, default = None ):
+		self.version = next( versionCounter )
+		if self.changedKeys is not None:
+			self.changedKeys.add( key )
+		return dict.setdefault( self, key, default )
+	
+	def update( self, *args, **kwargs ):
+		self.version = next( versionCounter )
+		if self.changedKeys is not None:
+			other = dict( *args, **kwargs )
+			self.changedKeys.update( other )
+			dict.update( self, other )
+		else:
+			dict.update( self, *args, **kwargs )
+	
+	def clear( self ):
+		self.version = next( versionCounter )
+		self.changedKeys = None
+		dict.clear( self )
+
+class State( Slotted ):
+	__slots__ = ('labels', 'noncontinue', 'OpenRider')
+	
 	def __init__( self ):
-		self.labels = {}
-		self.noncontinue = {}
+		self.labels = VersionedDict()
+		self.noncontinue = VersionedDict()
 		self.OpenRider = Rider( 0, '', 'OPEN' )
 		self.OpenRider.qualifyingTime = QualifyingTimeDefault + 1.0
+	
+	def __getstate__( self ):
+		state = Slotted.__getstate__( self )
+		for attr in ('labels', 'noncontinue'):
+			if attr in state:
+				state[attr] = dict( state[attr] )		# Plain dicts, as in previous versions.
+		return state
+		
+	def __setstate__( self, state ):
+		Slotted.__setstate__( self, state )
+		# Fix up data from previous versions.
+		for attr in ('labels', 'noncontinue'):
+			if not isinstance(getattr(self, attr), VersionedDict):
+				setattr( self, attr, VersionedDict(getattr(self, attr)) )
+	
+	def getVersion( self ):
+		''' Changes when labels or noncontinue change. '''
+		return (self.labels.version, self.noncontinue.version)
 		
 	def setQualifyingTimes( self, qtIn, competition ):
 		''' Expect qtIn to be of the form [(rider1, t1), (rider2, t2), ...]'''
-		self.labels = {}
+		self.labels = VersionedDict()
 		qt = sorted( (t, rider.iSeeding, rider) for rider, t in qtIn if rider.status != 'DNQ' )[:competition.starters]
 		for i, (t, iSeeding, rider) in enumerate(qt):
 			self.labels['N{}'.format(i+1)] = rider
 		# Set extra open spaces to make sure we have enough starters.
+		# Only the labels the events read are set.  The others up to N128 are implicitly the OpenRider.
+		inputs = competition.getDependencies()
 		for i in six.moves.range(len(qtIn), 128):
-			self.labels['N{}'.format(i+1)] = self.OpenRider
+			label = 'N{}'.format(i+1)
+			if label in inputs:
+				self.labels[label] = self.OpenRider
 		self.OpenRider.qualifyingTime =  QualifyingTimeDefault + 1.0
+		competition.setPropagateAll()
+		competition.resetRelegationsWarnings()
 
 	def inContention( self, id ):
 		return self.labels.get(id, None) != self.OpenRider and id not in self.noncontinue
@@ -110,11 +243,21 @@ class State( object ):
 	def canReassignStarters( self ):
 		''' Check if not competitions have started and we can reasign starters. '''
 		return all( label.startswith('N') for label in six.iterkeys(self.labels) )
+	
+	def removeOpenLabels( self, inputs ):
+		''' Remove the open spaces that no event reads.  Files from previous versions have them up to N128. '''
+		for label in [label for label, rider in six.iteritems(self.labels) if rider is self.OpenRider and label.startswith('N') and label not in inputs]:
+			del self.labels[label]
 
 #------------------------------------------------------------------------------------------------
 
-class Start( object ):
-	placesTimestamp = None		# Timestamp when places were modified.
+class Start( Slotted ):
+	__slots__ = (
+		'event', 'lastStart', 'heat', 'firstStartInHeat', 'startPositions', 'finishPositions', 'continuingPositions',
+		'places', 'times', 'relegated', 'inside', 'warning', 'noncontinue', 'restartRequired', 'canDrawLots',
+		'placesTimestamp',		# Timestamp when places were modified.
+	)
+	slotDefaults = {'placesTimestamp': None, 'warning': set()}
 	
 	finishCode = {
 		'Inside':	1,
@@ -123,11 +266,11 @@ class Start( object ):
 		'DQ':		4,
 	}
 	
-	warning = set()
-	
 	def __init__( self, event, lastStart ):
 		self.event = event
 		self.lastStart = lastStart
+		self.placesTimestamp = None
+		self.warning = set()
 		self.startPositions = []
 		self.finishPositions = []	# id, including finishers, DNF and DNS.
 		self.continuingPositions = []	# id, including finishers - no DNF and DNS.
@@ -148,11 +291,12 @@ class Start( object ):
 			random.shuffle( self.startPositions )
 			self.canDrawLots = True
 		else:
+			inside = set( lastStart.inside )
 			if lastStart.restartRequired:
 				self.firstStartInHeat = False
 				self.heat = lastStart.heat
 				self.startPositions = [r for r in lastStart.inside] + \
-						[c for c in lastStart.startPositions if c not in lastStart.inside]
+						[c for c in lastStart.startPositions if c not in inside]
 				self.canDrawLots = False
 			else:
 				self.heat = lastStart.heat + 1
@@ -163,13 +307,13 @@ class Start( object ):
 					while s and not s.firstStartInHeat:
 						s = s.lastStart
 					self.startPositions = [r for r in lastStart.inside] + \
-							[c for c in reversed(s.startPositions) if c not in lastStart.inside]
+							[c for c in reversed(s.startPositions) if c not in inside]
 					self.canDrawLots = False
 				elif self.heat == 3:
 					if lastStart.inside:
 						# Don't randomize the start positions again if the last run had a relegation.
 						self.startPositions = [r for r in lastStart.inside] + \
-								[c for c in lastStart.startPositions if c not in lastStart.inside]
+								[c for c in lastStart.startPositions if c not in inside]
 						self.canDrawLots = False
 					else:
 						# Randomize the start positions again.
@@ -218,6 +362,10 @@ class Start( object ):
 		bibToId = { state.labels[c].bib: c for c in remainingComposition }
 		
 		self.noncontinue = {}
+		
+		# Remove the previous warnings from the competition's counts.
+		for id in self.warning:
+			self.event.competition.addRelegationsWarnings( self.event, id, 0, -1 )
 		self.warning = set()
 		self.places = {}
 		self.finishPositions = []
@@ -252,6 +400,7 @@ class Start( object ):
 		self.continuingPositions = [ id for (finishCode, place, id) in statusPlaceId if id not in self.noncontinue ]
 		
 		self.placesTimestamp = datetime.datetime.now()
+		self.event.competition.setPropagateEvent( self.event )
 	
 	def resetPlaces( self ):
 		# Fix up data from previous versions.
@@ -280,21 +429,32 @@ class Start( object ):
 	def addRelegation( self, id ):
 		if isinstance(self.relegated, list):
 			self.relegated = set( self.relegated )
-		self.relegated.add( id )
+		if id not in self.relegated:
+			self.relegated.add( id )
+			self.event.competition.addRelegationsWarnings( self.event, id, 1, 0 )
 		
 	def addInside( self, id ):
 		self.inside.append( id )
 		
 	def addWarning( self, id ):
-		self.warning.add( id )
+		if id not in self.warning:
+			self.warning.add( id )
+			self.event.competition.addRelegationsWarnings( self.event, id, 0, 1 )
 		
 	def getRemainingComposition( self ):
-		state = self.event.competition.state
-		return [c for c in self.event.composition if state.inContention(c)]
+		return self.event.getRemainingComposition()
 		
 #------------------------------------------------------------------------------------------------
 
-class Event( object ):
+class Event( Slotted ):
+	__slots__ = (
+		'rule', 'composition', 'winner', 'others', 'heatsMax', 'starts',
+		'finishRiders', 'finishRiderPlace', 'finishRiderRank', 'compositionRiders',
+		'competition', 'system', 'tournament', 'i',
+		'remainingCache',
+	)
+	cacheSlots = ('remainingCache',)
+	
 	def __init__( self, rule, heatsMax ):
 		self.rule = rule
 		
@@ -315,6 +475,14 @@ class Event( object ):
 		self.system = None
 		self.tournament = None
 	
+	def copyFormat( self ):
+		''' Returns a new event with the same rule, but no starts or results. '''
+		event = copy.copy( self )	# The composition and output labels are shared.  They are never changed.
+		event.starts = []
+		event.finishRiders, event.finishRiderPlace, event.finishRiderRank = [], {}, {}
+		event.compositionRiders = []
+		return event
+	
 	@property
 	def competitionTime( self ):
 		if self.competition.isSprint:
@@ -348,9 +516,22 @@ class Event( object ):
 		heats = sum( 1 for s in self.starts if not s.restartRequired )
 		return min(heats, self.heatsMax)
 	
-	def getHeatPlaces( self, heat ):
+	def getRemainingComposition( self ):
+		''' The composition still in contention.  Shared until the labels or noncontinue change - do not change it. '''
 		state = self.competition.state
+		version = state.getVersion()
+		try:
+			remainingVersion, remainingComposition = self.remainingCache
+			if remainingVersion == version:
+				return remainingComposition
+		except AttributeError:
+			pass
 		remainingComposition = [c for c in self.composition if state.inContention(c)]
+		self.remainingCache = (version, remainingComposition)
+		return remainingComposition
+	
+	def getHeatPlaces( self, heat ):
+		remainingComposition = self.getRemainingComposition()
 		
 		heatCur = 0
 		for start in self.starts:
@@ -360,22 +541,18 @@ class Event( object ):
 			if heatCur != heat:
 				continue
 			
-			placeStatus = start.noncontinue.copy()
-			for c in remainingComposition:
-				if c not in placeStatus:
-					placeStatus[c] = str(start.places.get(c, ''))
-			heatPlaces = [placeStatus.get(c, '') for c in remainingComposition]
-			heatPlaces = ['Win' if p == '1' else '-' for p in heatPlaces]
-			return heatPlaces
+			# Only the winner is shown.  Riders not continuing are never the winner.
+			noncontinue, places = start.noncontinue, start.places
+			return ['Win' if c not in noncontinue and str(places.get(c, '')) == '1' else '-' for c in remainingComposition]
 			
 		return [''] * len(remainingComposition)
 	
 	def __repr__( self ):
 		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
+		remainingComposition = self.getRemainingComposition()
 		remainingOthers = self.others[:len(remainingComposition)-1]
 		def labName( id ):
-			return '{}={:-12s}'.format(id, state.labels[id].full_name) if id in state.labels else '{}'.format(id)
+			return '{}={:12s}'.format(id, state.labels[id].full_name) if id in state.labels else '{}'.format(id)
 		s = '{}, Heat {}/{}  Start {}:  {} => {} {}'.format(
 			self.system.name,
 			self.getHeat(), self.heatsMax, len(self.starts),
@@ -393,33 +570,29 @@ class Event( object ):
 	@property
 	def multi_line_bibs( self ):
 		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
+		remainingComposition = self.getRemainingComposition()
 		return u'\n'.join((str(state.labels[c].bib)) for c in remainingComposition)
 		
 	@property
 	def multi_line_rider_names( self ):
 		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
+		remainingComposition = self.getRemainingComposition()
 		return u'\n'.join(state.labels[c].full_name for c in remainingComposition)
 		
 	@property
 	def multi_line_rider_teams( self ):
 		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
+		remainingComposition = self.getRemainingComposition()
 		return u'\n'.join(state.labels[c].team for c in remainingComposition)
 		
 	@property
 	def multi_line_inlabels( self ):
-		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
-		return u'\n'.join( remainingComposition )
+		return u'\n'.join( self.getRemainingComposition() )
 	
 	@property
 	def multi_line_outlabels( self ):
-		state = self.competition.state
-		remainingComposition = [c for c in self.composition if state.inContention(c)]
 		outlabels = [self.winner]
-		outlabels.extend( self.others[0:len(remainingComposition)-1] )
+		outlabels.extend( self.others[0:len(self.getRemainingComposition())-1] )
 		return u'\n'.join( outlabels )
 	
 	def getRepr( self ):
@@ -429,11 +602,16 @@ class Event( object ):
 		if not self.canStart():
 			return None
 		self.starts.append( Start(self, self.starts[-1] if self.starts else None) )
+		self.competition.setStartsChanged( self )
 		return self.starts[-1]
 	
 	def isFinished( self ):
 		return self.winner in self.competition.state
 	
+	def getReadyKey( self ):
+		''' The order of the events that can start: by tournament, system, heat, then event. '''
+		return (self.tournament.i, self.system.i, self.getHeat(), self.i)
+	
 	def canStart( self ):
 		state = self.competition.state
 		return  all(c in state.labels for c in self.composition) and \
@@ -460,6 +638,11 @@ class Event( object ):
 		OpenRider = state.OpenRider
 		return [state.labels.get(p,OpenRider) for p in places]
 	
+	def setPropagated( self ):
+		# The output labels are now set.  Schedule the downstream events for evaluation.
+		self.competition.setOutputChanged( self )
+		return True
+	
 	def propagate( self ):
 		if not self.canStart():
 			#print ', '.join(self.composition), 'Cannot start or already finished - nothing to propagate'
@@ -495,7 +678,7 @@ class Event( object ):
 			# Mark the "others" as open riders.
 			for o in self.others:
 				state.labels[o] = state.OpenRider
-			return True
+			return self.setPropagated()
 			
 		# Check if we have a rider with a majority of wins in the heats.
 		winCount = defaultdict( int )
@@ -519,13 +702,130 @@ class Event( object ):
 			
 			# Create the list of finish positions to match the event finish.
 			self.setFinishRiders( s.finishPositions if self.heatsMax == 1 else s.continuingPositions )
-			return True
+			return self.setPropagated()
 				
 		return False
 
 #------------------------------------------------------------------------------------------------
 
+class RelegationsWarnings( object ):
+	''' Relegation and warning counts for each rider by event sequence. '''
+	def __init__( self ):
+		self.bibCounts = defaultdict( dict )	# In the format of bibCounts[bib][eventOrder] = [relegations, warnings]
+		self.bibSums = {}						# Prefix sums of bibCounts, in the format of bibSums[bib] = (eventOrders, relegationSums, warningSums)
+	
+	def add( self, bib, order, relegations, warnings ):
+		counts = self.bibCounts[bib].setdefault( order, [0, 0] )
+		counts[0] += relegations
+		counts[1] += warnings
+		self.bibSums.pop( bib, None )
+	
+	def get( self, bib, orderMax ):
+		''' Returns (relegations, warnings) for the rider in all events up to and including orderMax. '''
+		try:
+			orders, relegationSums, warningSums = self.bibSums[bib]
+		except KeyError:
+			orders, relegationSums, warningSums = [], [], []
+			relegations = warnings = 0
+			for order, counts in sorted( six.iteritems(self.bibCounts.get(bib, {})) ):
+				relegations += counts[0]
+				warnings += counts[1]
+				orders.append( order )
+				relegationSums.append( relegations )
+				warningSums.append( warnings )
+			self.bibSums[bib] = (orders, relegationSums, warningSums)
+		
+		i = bisect.bisect_right( orders, orderMax )
+		return (relegationSums[i-1], warningSums[i-1]) if i else (0, 0)
+
+class ReadyQueue( object ):
+	''' The events that can start, as a heap ordered by Event.getReadyKey.
+	
+		Whether an event can start only depends on the labels of its composition and winner,
+		and on the noncontinue of its composition.  The queue collects the changed keys of
+		the labels and noncontinue, and only evaluates the events that use them.
+		Entries are replaced, not removed - an entry is current if its key is the event's key in keys.
+	'''
+	def __init__( self, competition ):
+		state = competition.state
+		self.labels = state.labels
+		self.noncontinue = state.noncontinue
+		self.labels.trackChanges()
+		self.noncontinue.trackChanges()
+		
+		self.labelEvent = competition.getDependencies()
+		self.winnerEvent = { e.winner: e for t, s, e in competition.allEvents() }
+		self.keys = {}				# keys[event] = ready key of the events that can start.
+		self.heap = []				# [(key, sequence, event), ...]
+		self.sequence = itertools.count()
+		for t, s, e in competition.allEvents():
+			self.update( e )
+	
+	def isCurrent( self, state ):
+		return (
+			state.labels is self.labels and state.noncontinue is self.noncontinue and
+			self.labels.changedKeys is not None and self.noncontinue.changedKeys is not None
+		)
+	
+	def update( self, event ):
+		''' Evaluate the event again. '''
+		if event.canStart():
+			key = event.getReadyKey()
+			if self.keys.get(event) != key:
+				self.keys[event] = key
+				heapq.heappush( self.heap, (key, next(self.sequence), event) )
+				if len(self.heap) > 2 * len(self.keys) + 32:
+					self.heap = [entry for entry in self.heap if self.keys.get(entry[2]) == entry[0]]
+					heapq.heapify( self.heap )
+		else:
+			self.keys.pop( event, None )
+	
+	def applyChanges( self ):
+		''' Evaluate the events affected by the labels and noncontinue changed since the last call. '''
+		labelEvent, winnerEvent = self.labelEvent, self.winnerEvent
+		events = set()
+		for id in self.labels.changedKeys:
+			events.add( labelEvent.get(id) )
+			events.add( winnerEvent.get(id) )
+		for id in self.noncontinue.changedKeys:
+			events.add( labelEvent.get(id) )
+		self.labels.changedKeys.clear()
+		self.noncontinue.changedKeys.clear()
+		events.discard( None )
+		for e in events:
+			self.update( e )
+	
+	def peek( self ):
+		''' Returns the first event that can start, or None. '''
+		heap, keys = self.heap, self.keys
+		while heap:
+			key, sequence, event = heap[0]
+			if keys.get(event) == key:
+				return event
+			heapq.heappop( heap )
+		return None
+	
+	def getEvents( self ):
+		''' Returns the events that can start in queue order. '''
+		return [e for key, e in sorted( (key, e) for e, key in six.iteritems(self.keys) )]
+
+def removeEmptyResults( results, count ):
+	''' Remove the first count empty finisher results in one pass. '''
+	if not count:
+		return results
+	resultsNew = []
+	for r in results:
+		if count and r == ('Finisher', None):
+			count -= 1
+		else:
+			resultsNew.append( r )
+	return resultsNew
+
+#------------------------------------------------------------------------------------------------
+
 class Competition( object ):
+	cacheAttrs = ('labelEvent', 'eventOrder', 'propagatePending', 'relegationsWarnings', 'resultsCache', 'readyQueue')	# Derived data - not saved or copied.
+	
 	def __init__( self, name, tournaments ):
 		self.name = name
 		self.tournaments = tournaments
@@ -560,7 +860,10 @@ class Competition( object ):
 			assert len(outLabels) <= len(inLabels), '{}-{}-{} len(outLabels)={} exceeds len(inLabels)={}\n    {}\n    {}'.format(
 					e.competition.name, e.tournament.name, e.system.name, len(outLabels), len(inLabels), ','.join(inLabels), ','.join(outLabels) )
 				
-		# Assign indexes to each component for sorting purposes.
+		self.setIndexes()
+	
+	def setIndexes( self ):
+		''' Assign indexes to each component for sorting purposes. '''
 		for i, tournament in enumerate(self.tournaments):
 			tournament.i = i
 			for j, system in enumerate(tournament.systems):
@@ -568,25 +871,61 @@ class Competition( object ):
 				for k, event in enumerate(system.events):
 					event.i = k
 	
+	def copyFormat( self ):
+		''' Returns a new competition with the same format, but no riders or results.  Skips the checks in __init__. '''
+		competition = copy.copy( self )
+		for attr in self.cacheAttrs:
+			competition.__dict__.pop( attr, None )
+		competition.state = State()
+		competition.tournaments = []
+		for t in self.tournaments:
+			tournament = copy.copy( t )
+			tournament.systems = []
+			competition.tournaments.append( tournament )
+			for s in t.systems:
+				system = copy.copy( s )
+				system.tournament = tournament
+				system.events = [e.copyFormat() for e in s.events]
+				tournament.systems.append( system )
+				for e in system.events:
+					e.competition = competition
+					e.system = system
+					e.tournament = tournament
+		return competition
+	
+	def getRelegationsWarningsIndex( self ):
+		''' Build the relegation/warning counts from all the starts.  Afterwards, the starts keep it up to date. '''
+		index = getattr(self, 'relegationsWarnings', None)
+		if index is None:
+			index = RelegationsWarnings()
+			labels = self.state.labels
+			eventOrder = self.getEventOrder()
+			for tournament, system, event in self.allEvents():
+				order = eventOrder[event]
+				for start in event.starts:
+					for ids, relegations, warnings in ((start.relegated, 1, 0), (start.warning, 0, 1)):
+						for id in ids:
+							try:
+								index.add( labels[id].bib, order, relegations, warnings )
+							except KeyError:
+								pass
+			self.relegationsWarnings = index
+		return index
+	
+	def resetRelegationsWarnings( self ):
+		self.relegationsWarnings = None
+	
+	def addRelegationsWarnings( self, event, id, relegations, warnings ):
+		index = getattr(self, 'relegationsWarnings', None)
+		if index is not None:
+			index.add( self.state.labels[id].bib, self.getEventOrder()[event], relegations, warnings )
+	
 	def getRelegationsWarnings( self, bib, eventCur, before=False ):
-		relegations = 0
-		warnings = 0
-		for tournament, system, event in self.allEvents():
-			if before and event == eventCur:
-				break
-			for id in event.composition:
-				try:
-					if self.state.labels[id].bib == bib:
-						for start in event.starts:
-							if id in start.relegated:
-								relegations += 1
-							if id in start.warning:
-								warnings += 1
-				except KeyError:
-					pass
-			if event == eventCur:
-				break
-		return relegations, warnings
+		try:
+			order = self.getEventOrder()[eventCur]
+		except KeyError:
+			return self.getRelegationsWarningsIndex().get( bib, sys.maxsize )
+		return self.getRelegationsWarningsIndex().get( bib, order - 1 if before else order )
 		
 	def getRelegationsWarningsStr( self, bib, eventCur, before=False ):
 		relegations, warnings = self.getRelegationsWarnings(bib, eventCur, before)
@@ -625,17 +964,138 @@ class Competition( object ):
 		for t, s, e in self.allEvents():
 			while e.starts and e.starts[-1].isHanging():
 				del e.starts[-1]
+				self.resetRelegationsWarnings()
+				self.setStartsChanged( e )
+				self.setPropagateEvent( e )
+	
+	#-----------------------------------------------------------------------------------
+	# Events that can start.
+	#
+	def getReadyQueue( self ):
+		readyQueue = getattr( self, 'readyQueue', None )
+		if readyQueue is None or not readyQueue.isCurrent(self.state):
+			self.readyQueue = readyQueue = ReadyQueue( self )
+		else:
+			readyQueue.applyChanges()
+		return readyQueue
+	
+	def setStartsChanged( self, event ):
+		''' The starts of the event changed, so its heat may have changed. '''
+		readyQueue = getattr( self, 'readyQueue', None )
+		if readyQueue is not None:
+			readyQueue.update( event )
 	
 	def getCanStart( self ):
-		return [(t, s, e) for t, s, e in self.allEvents() if e.canStart()]
-		
+		''' Returns [(tournament, system, event), ...] of the events that can start, in the order of allEvents. '''
+		eventOrder = self.getEventOrder()
+		return [(e.tournament, e.system, e) for e in sorted(self.getReadyQueue().keys, key = lambda e: eventOrder[e])]
+	
+	def getNextCanStart( self ):
+		''' Returns (tournament, system, event) of the next event to start by tournament, system, heat and event, or None. '''
+		e = self.getReadyQueue().peek()
+		return (e.tournament, e.system, e) if e else None
+	
+	def getUpcoming( self ):
+		''' Returns [(tournament, system, event), ...] of the events that can start by tournament, system, heat and event. '''
+		return [(e.tournament, e.system, e) for e in self.getReadyQueue().getEvents()]
+	
+	#-----------------------------------------------------------------------------------
+	# Incremental propagation.
+	#
+	# Every label is the input of at most one event (checked in __init__).
+	# When an event sets its output labels, only the events consuming those labels
+	# need to be evaluated again, not the whole competition.
+	#
+	# The labels and noncontinue that propagate derives are saved with the state.  The events still
+	# pending are saved as propagateSaved with a checksum of the inputs, so after a load only those
+	# events are evaluated (see restorePropagated).  Files without it, or with other inputs, propagate everything.
+	#
+	def __getstate__( self ):
+		# Don't save the propagation caches.  They are rebuilt on the first propagate after a load.
+		state = self.__dict__.copy()
+		for attr in self.cacheAttrs:
+			state.pop( attr, None )
+		state.pop( 'propagateSaved', None )
+		pending = getattr( self, 'propagatePending', None )
+		if pending is not None:
+			eventOrder = self.getEventOrder()
+			state['propagateSaved'] = (self.getInputChecksum(), sorted(eventOrder[e] for e in pending))
+		return state
+	
+	def __setstate__( self, state ):
+		self.__dict__.update( state )
+		# Fix up data from previous versions.  The dependencies are not cached here - a copied format may still be changed.
+		self.state.removeOpenLabels( set(c for t, s, e in self.allEvents() for c in e.composition) )
+	
+	def getInputChecksum( self ):
+		''' Checksum of what propagate reads: the format, the seeded riders and the results of every start. '''
+		# The dicts are pickled in their own order.  It is kept by a save and load, and a different order only costs a full propagate.
+		inputs = [
+			self.name,
+			[(label, rider.bib, rider.qualifyingTime) for label, rider in six.iteritems(self.state.labels) if label.startswith('N')],
+		]
+		for t, s, e in self.allEvents():
+			inputs.append( [(st.places, st.noncontinue, st.restartRequired) for st in e.starts] )
+		return hashlib.md5( pickle.dumps(inputs, 2) ).hexdigest()
+	
+	def restorePropagated( self ):
+		''' After a load, only evaluate the events that were pending when the competition was saved.
+			Returns False if everything must be evaluated. '''
+		propagateSaved = self.__dict__.pop( 'propagateSaved', None )
+		if propagateSaved is None or propagateSaved[0] != self.getInputChecksum():
+			self.setPropagateAll()
+			return False
+		events = [e for t, s, e in self.allEvents()]
+		self.propagatePending = set( events[i] for i in propagateSaved[1] )
+		return True
+	
+	def getDependencies( self ):
+		''' Returns a dict of input label to the event that consumes it. '''
+		if getattr(self, 'labelEvent', None) is None:
+			self.labelEvent = {}
+			self.eventOrder = {}
+			for order, (t, s, e) in enumerate(self.allEvents()):
+				self.eventOrder[e] = order
+				for c in e.composition:
+					self.labelEvent[c] = e
+		return self.labelEvent
+	
+	def getEventOrder( self ):
+		''' Returns a dict of event to its sequence in allEvents. '''
+		self.getDependencies()
+		return self.eventOrder
+	
+	def setPropagateAll( self ):
+		''' Evaluate all events on the next propagate. '''
+		self.propagatePending = None
+	
+	def setPropagateEvent( self, event ):
+		''' Evaluate this event on the next propagate. '''
+		pending = getattr(self, 'propagatePending', None)
+		if pending is not None:
+			pending.add( event )
+	
+	def setOutputChanged( self, event ):
+		''' The event has set its output labels.  Evaluate the events that consume them. '''
+		labelEvent = self.getDependencies()
+		for o in event.output:
+			try:
+				self.setPropagateEvent( labelEvent[o] )
+			except KeyError:
+				pass	# A result label - nothing downstream.
+	
+	@Spans.timed( 'Competition.propagate' )
 	def propagate( self ):
-		while 1:
-			success = False
-			for t, s, e in self.allEvents():
-				success |= e.propagate()
-			if not success:
-				break
+		eventOrder = self.getEventOrder()
+		if getattr(self, 'propagatePending', None) is None:
+			self.propagatePending = set( eventOrder )
+		
+		pending = self.propagatePending
+		while pending:
+			events = sorted( pending, key = lambda e: eventOrder[e] )
+			pending.clear()
+			for e in events:
+				e.propagate()	# On success, adds the downstream events to pending.
 		labels = self.state.labels
 		return [ labels.get('{}R'.format(r+1), None) for r in six.moves.range(self.starters) ]
 
@@ -648,7 +1108,20 @@ class Competition( object ):
 		DNFs = set( e for e in riderState['DNF'] if e not in DNSs and e not in DQs )
 		return DQs, DNSs, DNFs
 		
+	def resetResults( self ):
+		''' Recompute the results on the next call.  Needed if the riders' qualifying times change. '''
+		self.resultsCache = None
+	
+	@Spans.timed( 'Competition.getResults' )
 	def getResults( self ):
+		''' Returns (results, DNFs, DQs).  Cached until the labels or noncontinue change - do not change the returned lists. '''
+		version = self.state.getVersion()
+		cache = getattr( self, 'resultsCache', None )
+		if cache is None or cache[0] != version:
+			self.resultsCache = cache = (version, self.computeResults())
+		return cache[1]
+	
+	def computeResults( self ):
 		DQs, DNSs, DNFs = self.getRiderStates()
 		semiFinalRound, smallFinalRound, bigFinalRound = 60, 61, 62
 		
@@ -682,11 +1155,7 @@ class Competition( object ):
 			results = [('Finisher', r) for r in results if not r or not r.isOpen()]
 			
 			# Purge unfillable spots from the results.
-			for r in (DNFs | DNSs | DQs):
-				try:
-					results.remove( (statusText[Finisher], None) )
-				except ValueError:
-					break
+			results = removeEmptyResults( results, len(DNFs | DNSs | DQs) )
 			
 			# Add the unclassifiable riders.
 			for classification, s in (('DNF',DNFs), ('DNS',DNSs), ('DQ', DQs)):
@@ -761,11 +1230,7 @@ class Competition( object ):
 			results = [rr[-2:] for rr in compResults]
 			
 			# Adjust the available finisher positions for the abnormal finishes.
-			for i in six.moves.range(len(abnormalFinishers)):
-				try:
-					results.remove( (statusText[Finisher], None) )
-				except ValueError:
-					break
+			results = removeEmptyResults( results, len(abnormalFinishers) )
 				
 			# Purge empty results, except at the top.
 			try:
@@ -821,6 +1286,7 @@ class System( object ):
 
 class Model( object ):
 	communique_start = 100
+	version = 0		# Incremented on every change.  Used to refresh pages only when needed.
 
 	def __init__( self ):
 		self.competition_name = 'My Competition'
@@ -871,6 +1337,11 @@ class Model( object ):
 		
 	def setChanged( self, changed = True ):
 		self.changed = changed
+		if changed:
+			self.incrementVersion()
+	
+	def incrementVersion( self ):
+		self.version += 1
 
 model = Model()
 
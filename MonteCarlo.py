@@ -0,0 +1,157 @@
+import sys
+import time
+import random
+import multiprocessing
+from optparse import OptionParser
+
+import Model
+from Competitions import getCompetition, getCompetitionFormats, SetDefaultData, DoRandomSimulation
+
+#------------------------------------------------------------------------------------------------
+# Monte Carlo simulation of a competition format.
+#
+# Each simulation plays the competition through with DoRandomSimulation.
+# The simulations are split into batches and run in a process pool.
+# Every batch returns its counts, and the counts are merged in the parent.
+#
+
+class SimulationResults( object ):
+	def __init__( self, name ):
+		self.name = name
+		self.simulations = 0
+		self.placeCounts = {}		# placeCounts[bib][place] = count
+		self.rides = {}				# rides[bib] = total number of starts ridden
+		self.elapsed = 0.0
+	
+	def add( self, competition ):
+		''' Add the results of a finished competition. '''
+		self.simulations += 1
+		state = competition.state
+		results, dnfs, dqs = competition.getResults()
+		for place, rider in results:
+			if rider and isinstance(place, int):
+				counts = self.placeCounts.setdefault( rider.bib, {} )
+				counts[place] = counts.get(place, 0) + 1
+		
+		rides = self.rides
+		for t, s, e in competition.allEvents():
+			for start in e.starts:
+				for id in start.startPositions:
+					bib = state.labels[id].bib
+					rides[bib] = rides.get(bib, 0) + 1
+	
+	def merge( self, other ):
+		self.simulations += other.simulations
+		for bib, counts in other.placeCounts.items():
+			countsCur = self.placeCounts.setdefault( bib, {} )
+			for place, count in counts.items():
+				countsCur[place] = countsCur.get(place, 0) + count
+		for bib, rides in other.rides.items():
+			self.rides[bib] = self.rides.get(bib, 0) + rides
+		return self
+	
+	@property
+	def simulationsPerSecond( self ):
+		return self.simulations / self.elapsed if self.elapsed else 0.0
+	
+	def getBibs( self ):
+		return sorted( self.placeCounts.keys(), key = self.getExpectedPlace )
+	
+	def getPlaceDistribution( self, bib ):
+		''' Returns {place: probability} for this rider. '''
+		n = float(self.simulations)
+		return { place: count / n for place, count in self.placeCounts.get(bib, {}).items() }
+	
+	def getMedalProbabilities( self, bib ):
+		''' Returns (gold, silver, bronze) probabilities. '''
+		distribution = self.getPlaceDistribution( bib )
+		return tuple( distribution.get(place, 0.0) for place in (1, 2, 3) )
+	
+	def getExpectedPlace( self, bib ):
+		counts = self.placeCounts.get( bib, {} )
+		total = sum( counts.values() )
+		return sum( place * count for place, count in counts.items() ) / float(total) if total else float('inf')
+	
+	def getExpectedRides( self, bib ):
+		return self.rides.get(bib, 0) / float(self.simulations) if self.simulations else 0.0
+	
+	def getSummary( self ):
+		''' Returns rows of (bib, expected place, gold, silver, bronze, expected rides) in expected place order. '''
+		return [(bib, self.getExpectedPlace(bib)) + self.getMedalProbabilities(bib) + (self.getExpectedRides(bib),) for bib in self.getBibs()]
+
+def getRiderFields( riders ):
+	return [(r.bib, r.first_name, r.last_name, r.team, r.qualifyingTime, r.status) for r in riders]
+
+def simulateBatch( args ):
+	''' Run a batch of simulations.  Must be at module level so it can be called in a worker process. '''
+	name, riderFields, count, seed = args
+	random.seed( seed )
+	riders = [Model.Rider( bib, first_name, last_name, team, qualifyingTime = qt, status = status )
+		for bib, first_name, last_name, team, qt, status in riderFields]
+	
+	results = SimulationResults( name )
+	for i in range(count):
+		model = Model.Model()
+		model.competition = getCompetition( name )
+		model.riders = riders
+		model.setQualifyingTimes()
+		DoRandomSimulation( model )
+		results.add( model.competition )
+	return results
+
+def simulate( model = None, simulations = 10000, processes = None, batchSize = 200, seed = None ):
+	''' Simulate the model's competition with its riders.  processes=1 runs in this process. '''
+	model = model or Model.model
+	name = model.competition.name
+	riderFields = getRiderFields( model.riders )
+	if seed is None:
+		seed = random.randint( 0, 1<<30 )
+	
+	# The results only depend on the seed and the batch size, not on the number of processes.
+	batches = []
+	for i, start in enumerate(range(0, simulations, batchSize)):
+		batches.append( (name, riderFields, min(batchSize, simulations - start), seed + i) )
+	
+	tStart = time.time()
+	results = SimulationResults( name )
+	if processes == 1:
+		for batch in batches:
+			results.merge( simulateBatch(batch) )
+	else:
+		pool = multiprocessing.Pool( processes )
+		try:
+			for r in pool.imap_unordered( simulateBatch, batches ):
+				results.merge( r )
+		finally:
+			pool.close()
+			pool.join()
+	results.elapsed = time.time() - tStart
+	return results
+
+def writeSummary( results, riders, f = None ):
+	f = f or sys.stdout
+	riderName = { r.bib: r.full_name for r in riders }
+	f.write( u'{}: {} simulations in {:.2f} seconds ({:.1f} simulations/sec)\n'.format(
+		results.name, results.simulations, results.elapsed, results.simulationsPerSecond) )
+	f.write( u'{:>5} {:<30} {:>7} {:>7} {:>7} {:>7} {:>6}\n'.format('Bib', 'Name', 'ExpPl', 'Gold', 'Silver', 'Bronze', 'Rides') )
+	for bib, place, gold, silver, bronze, rides in results.getSummary():
+		f.write( u'{:>5} {:<30} {:>7.2f} {:>7.3f} {:>7.3f} {:>7.3f} {:>6.2f}\n'.format(
+			bib, riderName.get(bib, u'')[:30], place, gold, silver, bronze, rides) )
+
+if __name__ == '__main__':
+	parser = OptionParser( usage = "usage: %prog [options]" )
+	parser.add_option("-c", "--competition", dest="competition", default='World Championships', help="competition format name")
+	parser.add_option("-n", "--simulations", dest="simulations", type="int", default=10000, help="number of simulations")
+	parser.add_option("-p", "--processes", dest="processes", type="int", default=None, help="number of processes (default: all cpus)")
+	parser.add_option("-s", "--seed", dest="seed", type="int", default=None, help="random seed")
+	parser.add_option("-l", "--list", action="store_true", dest="list", default=False, help="list the competition formats")
+	(options, args) = parser.parse_args()
+	
+	if options.list:
+		for i, (name, starters) in enumerate(getCompetitionFormats()):
+			print ( '{}. {} ({} Starters)'.format(i+1, name, starters) )
+		sys.exit( 0 )
+	
+	model = SetDefaultData( options.competition, random = True )
+	results = simulate( model, options.simulations, options.processes, seed = options.seed )
+	writeSummary( results, model.riders )
@@ -0,0 +1,93 @@
+import wx
+import wx.grid as gridlib
+
+import time
+import six
+import Utils
+import Spans
+from ReorderableGrid import ReorderableGrid
+from Events import GetFont
+
+class Performance(wx.Panel):
+	''' Hidden page (Ctrl+Alt+P) with the span timings since startup. '''
+	
+	#----------------------------------------------------------------------
+	def __init__(self, parent):
+		wx.Panel.__init__(self, parent)
+		
+		font = GetFont()
+		
+		self.title = wx.StaticText(self, wx.ID_ANY, "Performance:")
+		self.title.SetFont( font )
+		self.refreshButton = wx.Button( self, wx.ID_ANY, 'Refresh' )
+		self.refreshButton.SetFont( font )
+		self.refreshButton.Bind( wx.EVT_BUTTON, lambda e: self.refresh() )
+		self.resetButton = wx.Button( self, wx.ID_ANY, 'Reset' )
+		self.resetButton.SetFont( font )
+		self.resetButton.Bind( wx.EVT_BUTTON, self.onReset )
+		self.writeLogButton = wx.Button( self, wx.ID_ANY, 'Write to Log' )
+		self.writeLogButton.SetFont( font )
+		self.writeLogButton.Bind( wx.EVT_BUTTON, self.onWriteLog )
+		
+		self.headerNames = ['Span', 'Count', 'Mean', 'p50', 'p90', 'p99', 'Max', 'Total']
+		
+		self.grid = ReorderableGrid( self, style = wx.BORDER_SUNKEN )
+		self.grid.DisableDragRowSize()
+		self.grid.SetRowLabelSize( 0 )
+		self.grid.EnableReorderRows( False )
+		self.grid.CreateGrid( 0, len(self.headerNames) )
+		for col, headerName in enumerate(self.headerNames):
+			self.grid.SetColLabelValue( col, headerName )
+		self.grid.SetLabelFont( font )
+		
+		self.slowTitle = wx.StaticText(self, wx.ID_ANY, "Slow (at least {}):".format(Spans.formatSeconds(Spans.SlowSeconds)))
+		self.slow = wx.TextCtrl( self, style=wx.TE_MULTILINE|wx.TE_READONLY|wx.HSCROLL )
+		
+		sizer = wx.BoxSizer(wx.VERTICAL)
+		hs = wx.BoxSizer( wx.HORIZONTAL )
+		hs.Add( self.title, 0, flag=wx.ALL|wx.ALIGN_CENTRE_VERTICAL, border = 4 )
+		hs.Add( self.refreshButton, 0, flag=wx.ALL, border = 4 )
+		hs.Add( self.resetButton, 0, flag=wx.ALL, border = 4 )
+		hs.Add( self.writeLogButton, 0, flag=wx.ALL, border = 4 )
+		
+		sizer.Add( hs, flag=wx.ALL, border = 4 )
+		sizer.Add( self.grid, 3, flag=wx.EXPAND|wx.ALL, border = 6 )
+		sizer.Add( self.slowTitle, 0, flag=wx.LEFT|wx.RIGHT, border = 6 )
+		sizer.Add( self.slow, 1, flag=wx.EXPAND|wx.ALL, border = 6 )
+		self.SetSizer(sizer)
+	
+	def onReset( self, e ):
+		Spans.reset()
+		self.refresh()
+	
+	def onWriteLog( self, e ):
+		Spans.dump( Utils.writeLog )
+	
+	def refresh( self ):
+		font = GetFont()
+		summary = Spans.getSummary()
+		Utils.AdjustGridSize( self.grid, rowsRequired = len(summary), colsRequired = len(self.headerNames) )
+		self.grid.ClearGrid()
+		
+		for col in six.moves.range(self.grid.GetNumberCols()):
+			attr = gridlib.GridCellAttr()
+			attr.SetFont( font )
+			attr.SetReadOnly( True )
+			if col > 0:
+				attr.SetAlignment( wx.ALIGN_RIGHT, wx.ALIGN_TOP )
+			self.grid.SetColAttr( col, attr )
+		
+		for row, (name, count, mean, p50, p90, p99, maxSecs, total) in enumerate(summary):
+			for col, value in enumerate([name, u'{}'.format(count)] + [Spans.formatSeconds(s) for s in (mean, p50, p90, p99, maxSecs, total)]):
+				self.grid.SetCellValue( row, col, value )
+		
+		self.grid.AutoSizeColumns( False )
+		self.grid.AutoSizeRows( False )
+		
+		self.slow.SetValue( u'\n'.join(
+			u'{}  {}  {}'.format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)), Spans.formatSeconds(seconds), name)
+			for t, name, seconds in Spans.getSlow()
+		) )
+	
+	def commit( self ):
+		pass
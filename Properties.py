@@ -5,7 +5,7 @@ import sys
 import Utils
 import Model
 from FieldDef import FieldDef
-from Competitions import SetDefaultData, getCompetitions, DoRandomSimulation
+from Competitions import SetDefaultData, getCompetitionFormats, getCompetition, DoRandomSimulation
 from ReorderableGrid import ReorderableGrid
 from GraphDraw import Graph
 from Events import GetFont, GetBoldFont
@@ -19,7 +19,7 @@ class Properties(wx.Panel):
 		model = Model.model
 		
 		self.competitionFormat = 0
-		competitionChoices = [u'{}. {} ({} Starters)'.format(i+1, c.name, c.starters) for i, c in enumerate(getCompetitions())]
+		competitionChoices = [u'{}. {} ({} Starters)'.format(i+1, name, starters) for i, (name, starters) in enumerate(getCompetitionFormats())]
 		
 		font = GetFont()
 		
@@ -90,8 +90,8 @@ class Properties(wx.Panel):
 		return grid
 		
 	def updateGraph( self, event = None ):
-		competition = getCompetitions()[self.competitionFormatCtrl.GetSelection()]
-		self.graph.model = model = SetDefaultData( competition.name, random=True )
+		name = getCompetitionFormats()[self.competitionFormatCtrl.GetSelection()][0]
+		self.graph.model = model = SetDefaultData( name, random=True )
 		for f in self.modelFields:
 			f.commit( model )
 		
@@ -109,11 +109,11 @@ class Properties(wx.Panel):
 		for f in self.modelFields:
 			f.refresh( model )
 		self.competitionFormatCtrl.SetSelection( 0 )
-		for i, c in enumerate(getCompetitions()):
-			if c.name == model.competition.name:
+		for i, (name, starters) in enumerate(getCompetitionFormats()):
+			if name == model.competition.name:
 				self.competitionFormatCtrl.SetSelection( i )
 				break
-		self.updateGraph()
+		wx.CallAfter( self.updateGraph )		# Show the page first, then simulate the sample competition.
 
 	def commit( self ):
 		model = Model.model
@@ -121,11 +121,11 @@ class Properties(wx.Panel):
 		for f in self.modelFields:
 			model.changed |= f.commit( model )
 			
-		competition = getCompetitions()[self.competitionFormatCtrl.GetSelection()]
-		if competition.name != model.competition.name:
+		name = getCompetitionFormats()[self.competitionFormatCtrl.GetSelection()][0]
+		if name != model.competition.name:
 			# Check that changing the competition will screw anything up.
 			if model.canReassignStarters():
-				model.competition = competition
+				model.competition = getCompetition( name )
 				model.setQualifyingTimes()
 				Utils.getMainWin().resetEvents()
 				model.setChanged( True )
@@ -151,8 +151,8 @@ if __name__ == "__main__":
 	Model.model = SetDefaultData()
 	
 	with open('competitions.csv', 'w') as f:
-		for i, competition in enumerate(getCompetitions()):
-			f.write( '{},{},{}\n'.format(i+1, competition.name, competition.starters) )
+		for i, (name, starters) in enumerate(getCompetitionFormats()):
+			f.write( '{},{},{}\n'.format(i+1, name, starters) )
 	
 	frame = PropertiesFrame()
 	app.MainLoop()
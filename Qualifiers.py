@@ -9,6 +9,8 @@ import Utils
 import Model
 from Competitions import SetDefaultData
 from ReorderableGrid import ReorderableGrid
+from GridData import GridData
+from GridDataTable import GridDataTable
 from Events import GetFont
 from HighPrecisionTimeEditor import HighPrecisionTimeEditor
 
@@ -38,13 +40,14 @@ class Qualifiers(wx.Panel):
 		self.grid = ReorderableGrid( self, style = wx.BORDER_SUNKEN )
 		self.grid.DisableDragRowSize()
 		self.grid.SetRowLabelSize( 64 )
-		self.grid.CreateGrid( 0, len(self.headerNames) )
-		self.setColNames()
+		self.table = GridDataTable()
+		self.grid.SetTable( self.table, True )
 		self.grid.EnableReorderRows( False )
 
 		# Set specialized editors for appropriate columns.
 		self.grid.SetLabelFont( font )
-		for col in six.moves.range(self.grid.GetNumberCols()):
+		self.colAttrs = []
+		for col in six.moves.range(len(self.headerNames)):
 			attr = gridlib.GridCellAttr()
 			attr.SetFont( font )
 			if col == self.iTime:
@@ -58,7 +61,7 @@ class Qualifiers(wx.Panel):
 				if col == 0:
 					attr.SetRenderer( gridlib.GridCellNumberRenderer() )
 				attr.SetReadOnly( True )
-			self.grid.SetColAttr( col, attr )
+			self.colAttrs.append( attr )
 		
 		sizer = wx.BoxSizer(wx.VERTICAL)
 		sizer.Add( hs, 0, flag=wx.ALL|wx.EXPAND, border = 6 )
@@ -68,27 +71,16 @@ class Qualifiers(wx.Panel):
 	def getGrid( self ):
 		return self.grid
 		
-	def setColNames( self ):
-		for col, headerName in enumerate(self.headerNames):
-			self.grid.SetColLabelValue( col, headerName )
-						
 	def setTestData( self ):
-		self.grid.ClearGrid()
-
-		testData = TestData.getTestData()
-		Utils.AdjustGridSize( self.grid, rowsRequired = len(testData) )
-			
-		for row, data in enumerate(testData):
+		rows = []
+		for data in TestData.getTestData():
 			bib = data[0]
 			name = data[1] + ' ' + data[2]
 			team = data[3]
 			time = data[-1]
-			for col, d in enumerate([bib, name, team, time]):
-				self.grid.SetCellValue( row, col,u' {}'.format(d) )
+			rows.append( [u' {}'.format(d) for d in [bib, name, team, time]] + [u''] )
 		
-		# Fix up the column and row sizes.
-		self.grid.AutoSizeColumns( False )
-		self.grid.AutoSizeRows( False )
+		self.table.setData( self.grid, GridData(self.headerNames, rows), self.colAttrs )
 		
 	def refresh( self ):
 		model = Model.model
@@ -96,14 +88,9 @@ class Qualifiers(wx.Panel):
 		
 		self.renumberButton.Show( model.competition.isMTB )
 		
-		Utils.AdjustGridSize( self.grid, rowsRequired = len(riders) )
-		for row, r in enumerate(riders):
-			for col, value in enumerate([u'{}'.format(r.bib), r.full_name, r.team, r.qualifyingTimeText]):
-				self.grid.SetCellValue( row, col, value )
-				
-		# Fix up the column and row sizes.
-		self.grid.AutoSizeColumns( False )
-		self.grid.AutoSizeRows( False )
+		# The Time and Status cells are edited in the table's rows.
+		rows = [[u'{}'.format(r.bib), r.full_name, r.team, r.qualifyingTimeText, r.status or u''] for r in riders]
+		self.table.setData( self.grid, GridData(self.headerNames, rows), self.colAttrs )
 		self.grid.SetColSize( self.grid.GetNumberCols()-1, 96 )
 		
 		self.Layout()
@@ -131,6 +118,7 @@ class Qualifiers(wx.Panel):
 			if rider.qualifyingTime != qt or rider.status != status:
 				rider.qualifyingTime = qt
 				rider.status = status
+				model.competition.resetResults()
 				model.setChanged( True )
 		
 	def commit( self ):
@@ -153,6 +141,7 @@ class Qualifiers(wx.Panel):
 		riders = sorted( model.riders, key = lambda x: x.keyQualifying() )
 		for r, rider in enumerate(riders, 1):
 			rider.bib = r
+		model.setChanged( True )
 		
 		wx.CallAfter( self.refresh )
 		
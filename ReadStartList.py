@@ -337,6 +337,11 @@ class GetExcelStartListLink( object ):
 		isForward = evt.GetDirection()
 		
 #----------------------------------------------------------------------------------
+# The last spreadsheet read.
+# stateCache is (fileName, modification time, size, sheetName, fieldCol) and infoCache is what was read.
+stateCache = None
+infoCache = None
+
 class ExcelLink( object ):
 	def __init__( self ):
 		self.fileName = None
@@ -361,18 +366,28 @@ class ExcelLink( object ):
 	def getFields( self ):
 		return [f for f in Fields if self.hasField(f)]
 	
+	def getState( self ):
+		try:
+			s = os.stat( self.fileName )
+		except (OSError, TypeError):
+			return None
+		return (self.fileName, s.st_mtime, s.st_size, self.sheetName, self.fieldCol)
+	
 	def get( self ):
-		# Check the cache, but don't bother with the modification date of the file for performance.
-		if stateCache and infoCache:
-			try:
-				state = (self.fileName, self.sheetName, self.fieldCol)
-				if state == stateCache[-3:]:
-					return infoCache
-			except:
-				pass
+		''' Returns the info from the cache if the file has not changed since it was read, otherwise None. '''
+		state = self.getState()
+		if state is not None and state == stateCache:
+			return infoCache
 		return None
 	
 	def read( self ):
+		''' Returns {bib: {field: value}}.  Do not change the returned info - it is cached. '''
+		global stateCache, infoCache
+		info = self.get()
+		if info is not None:
+			return info
+		
+		state = self.getState()
 		try:
 			reader = GetExcelReader( self.fileName )
 			if self.sheetName not in reader.sheet_names():
@@ -381,7 +396,8 @@ class ExcelLink( object ):
 				return None
 		
 		info = {}
-		for r, row in enumerate(reader.iter_list(self.sheetName)):
+		cols = set( col for col in six.itervalues(self.fieldCol) if col >= 0 )	# Only convert the mapped columns.
+		for r, row in enumerate(reader.iter_list(self.sheetName, cols=cols)):
 			data = {}
 			for field, col in six.iteritems(self.fieldCol):
 				if col < 0:					# Skip unmapped columns.
@@ -395,6 +411,9 @@ class ExcelLink( object ):
 			except (ValueError, TypeError, KeyError):
 				pass
 		
+		if state is not None:
+			stateCache = state[:-1] + (copy.copy(self.fieldCol),)
+			infoCache = info
 		return info
 
 def ImportStartList( parent ):
@@ -413,6 +432,8 @@ def ImportStartList( parent ):
 	riderBib = dict( (r.bib, r) for r in riders )
 	importCount = 0
 	for bib, data in six.iteritems(info):
+		data = dict( data )		# Do not change the cached info.
+		
 		# Merge with existing information.
 		if sum(int(bool(n)) for n in (data.get('FirstName',None), data.get('LastName',None))) == 1:
 			combinedName = data.get('FirstName',None) or data.get('LastName',None)
@@ -432,6 +453,7 @@ def ImportStartList( parent ):
 			riders.append( r )
 			riderBib[bib] = r
 		importCount += 1
+	Model.model.setChanged( True )
 		
 	if errors:
 		errorStr = '\n'.join( errors[:20] )
@@ -9,10 +9,10 @@ import Model
 import Utils
 from ReorderableGrid import ReorderableGrid
 from Competitions import SetDefaultData
-from Utils import WriteCell
+import GridData
+from GridDataTable import GridDataTable
 from Events import FontSize
 
-Arrow = u'\u2192'
 
 class Results(wx.Panel):
 	#----------------------------------------------------------------------
@@ -47,11 +47,11 @@ class Results(wx.Panel):
 		
 		self.grid = ReorderableGrid( self, style = wx.BORDER_SUNKEN )
 		self.grid.DisableDragRowSize()
-		self.grid.SetRowLabelSize( 64 )
-		self.grid.CreateGrid( 0, len(self.headerNames) )
+		self.table = GridDataTable()
+		self.grid.SetTable( self.table, True )
 		self.grid.SetRowLabelSize( 0 )
 		self.grid.EnableReorderRows( False )
-		self.setColNames()
+		self.grid.SetLabelFont( self.font )
 
 		sizer = wx.BoxSizer(wx.VERTICAL)
 		
@@ -74,11 +74,9 @@ class Results(wx.Panel):
 		model.resultsShowTeams = self.showTeams.GetValue()
 		self.refresh()
 	
-	def setColNames( self ):
-		self.grid.SetLabelFont( self.font )
+	def getColAttrs( self ):
+		colAttrs = []
 		for col, headerName in enumerate(self.headerNames):
-			self.grid.SetColLabelValue( col, headerName )
-			
 			attr = gridlib.GridCellAttr()
 			attr.SetFont( self.font )
 			if self.headerNames[col] in {u'Bib', u'Event'}:
@@ -87,23 +85,16 @@ class Results(wx.Panel):
 				attr.SetAlignment( wx.ALIGN_RIGHT, wx.ALIGN_TOP )
 			elif self.headerNames[col] == u'Pos':
 				attr.SetAlignment( wx.ALIGN_RIGHT, wx.ALIGN_TOP )
-			elif Arrow in self.headerNames[col]:
-				attr.SetAlignment( wx.ALIGN_CENTRE, wx.ALIGN_VERTICAL_CENTRE )
+			elif self.headerNames[col] == GridData.ArrowCol:
+				attr.SetAlignment( wx.ALIGN_LEFT, wx.ALIGN_CENTRE )
 			elif self.headerNames[col].startswith( u'H' ):
 				attr.SetAlignment( wx.ALIGN_CENTRE, wx.ALIGN_TOP )
 			attr.SetReadOnly( True )
-			self.grid.SetColAttr( col, attr )
+			colAttrs.append( attr )
+		return colAttrs
 	
 	def getResultChoices( self ):
-		model = Model.model
-		competition = model.competition
-		choices = [u'Qualifiers']
-		for tournament in competition.tournaments:
-			for system in tournament.systems:
-				name = ('%s: ' % tournament.name if tournament.name else '') + system.name
-				choices.append( name )
-		choices.append( u'Final Classification' )
-		return choices
+		return GridData.getResultChoices( Model.model.competition )
 	
 	def fixShowResults( self ):
 		model = Model.model
@@ -116,16 +107,6 @@ class Results(wx.Panel):
 			model.showResults = 0
 		self.showResults.SetSelection( model.showResults )
 		
-	def getHideCols( self, headerNames ):
-		model = Model.model
-		toHide = set()
-		for col, h in enumerate(headerNames):
-			if h == u'Name' and not getattr(model, 'resultsShowNames', True):
-				toHide.add( col )
-			elif h == u'Team' and not getattr(model, 'resultsShowTeams', True):
-				toHide.add( col )
-		return toHide
-	
 	def getGrid( self ):
 		return self.grid
 	
@@ -136,12 +117,7 @@ class Results(wx.Panel):
 		return choices[num]
 	
 	def getTitle( self ):
-		phase = self.getPhase()
-		title = u'Communiqu\u00E9: {}\n{} {} '.format(
-					self.communiqueNumber.GetValue(),
-					phase,
-					'' if phase.startswith(u'Final') or phase.startswith('Time') else u'Draw Sheet/Intermediate Results' )
-		return title
+		return GridData.getResultsTitle( self.getPhase(), self.communiqueNumber.GetValue() )
 	
 	def onClickResults( self, event ):
 		self.commit()
@@ -153,7 +129,6 @@ class Results(wx.Panel):
 	
 	def refresh( self ):
 		self.fixShowResults()
-		self.grid.ClearGrid()
 		
 		model = Model.model
 		competition = model.competition
@@ -164,132 +139,17 @@ class Results(wx.Panel):
 		self.communiqueNumber.SetValue( model.communique_number.get(self.getPhase(), '') )
 		
 		resultName = self.showResults.GetStringSelection()
+		data = GridData.getResultsData( model, resultName )
+		self.headerNames = data.headerNames
 		
-		if 'Qualifiers' in resultName:
-			starters = competition.starters
-			
-			self.headerNames = [u'Pos', u'Bib', u'Name', u'Team', u'Time']
-			hideCols = self.getHideCols( self.headerNames )
-			self.headerNames = [h for c, h in enumerate(self.headerNames) if c not in hideCols]
-			
-			riders = sorted( model.riders, key = lambda r: r.keyQualifying() )
-			for row, r in enumerate(riders):
-				if row >= starters or r.status == 'DNQ':
-					riders[row:] = sorted( riders[row:], key=lambda r: r.keyQualifying()[1:] )
-					break
-			Utils.AdjustGridSize( self.grid, rowsRequired = len(riders), colsRequired = len(self.headerNames) )
-			Utils.SetGridCellBackgroundColour( self.grid, wx.WHITE )
-			self.setColNames()
-			for row, r in enumerate(riders):
-				if row < starters and r.status != 'DNQ':
-					pos = u'{}'.format(row + 1)
-					for col in six.moves.range(self.grid.GetNumberCols()):
-						self.grid.SetCellBackgroundColour( row, col, wx.WHITE )
-				else:
-					pos = 'DNQ'
-					for col in six.moves.range(self.grid.GetNumberCols()):
-						self.grid.SetCellBackgroundColour( row, col, wx.Colour(200,200,200) )
-						
-				writeCell = WriteCell( self.grid, row )
-				for col, value in enumerate([pos,u' {}'.format(r.bib), r.full_name, r.team, r.qualifyingTimeText]):
-					if col not in hideCols:
-						writeCell( value )
-						
-			competitionTime = model.qualifyingCompetitionTime
-			self.competitionTime.SetLabel( u'{}: {}'.format(_('Est. Competition Time'), Utils.formatTime(competitionTime)) 
-				if competitionTime else u'' )
-					
-		elif 'Final Classification' in resultName:
-			self.headerNames = [u'Pos', u'Bib', u'Name', u'Team', u'License']
-			hideCols = self.getHideCols( self.headerNames )
-			self.headerNames = [h for c, h in enumerate(self.headerNames) if c not in hideCols]
-			
-			results, dnfs, dqs = competition.getResults()
-			Utils.AdjustGridSize( self.grid, rowsRequired = len(model.riders), colsRequired = len(self.headerNames) )
-			Utils.SetGridCellBackgroundColour( self.grid, wx.WHITE )
-
-			self.setColNames()
-			for row, (classification, r) in enumerate(results):
-				writeCell = WriteCell( self.grid, row )
-				if not r:
-					for col in six.moves.range(self.grid.GetNumberCols()):
-						writeCell( '' )
-				else:
-					for col, value in enumerate([classification, r.bib if r.bib else '', r.full_name, r.team, r.license]):
-						if col not in hideCols:
-							writeCell(u' {}'.format(value) )
-			self.competitionTime.SetLabel( u'' ) 
-		else:
-			# Find the Tournament and System selected.
-			keepGoing = True
-			for tournament in competition.tournaments:
-				for system in tournament.systems:
-					name = (u'%s: ' % tournament.name if tournament.name else '') + system.name
-					if name == resultName:
-						keepGoing = False
-						break
-				if not keepGoing:
-					break
-			
-			heatsMax = max( event.heatsMax for event in system.events )
-			if heatsMax == 1:
-				self.headerNames = [u'Event',u'Bib',u'Name',u'Note',u'Team',u'    ',u'Pos',u'Bib',u'Name',u'Note',u'Team',u'Time']
-			else:
-				self.headerNames = [u'Event',u'Bib',u'Name',u'Note',u'Team',u'H1',u'H2',u'H3',u'    ',u'Pos',u'Bib',u'Name',u'Note',u'Team',u'Time']
-			hideCols = self.getHideCols( self.headerNames )
-			self.headerNames = [h for c, h in enumerate(self.headerNames) if c not in hideCols]
-			
-			Utils.AdjustGridSize( self.grid, rowsRequired = len(system.events), colsRequired = len(self.headerNames) )
-			Utils.SetGridCellBackgroundColour( self.grid, wx.WHITE )
-
-			self.setColNames()
-			state = competition.state
-			
-			for row, event in enumerate(system.events):
-				writeCell = WriteCell( self.grid, row )
-				
-				writeCell( u'{}'.format(row+1) )
-				
-				riders = [state.labels.get(c, None) for c in event.composition]
-				writeCell( u'\n'.join([u'{}'.format(rider.bib) if rider and rider.bib else '' for rider in riders]) )
-				if getattr(model, 'resultsShowNames', True):
-					writeCell( u'\n'.join([rider.full_name  if rider else u'' for rider in riders]) )
-				writeCell( u'\n'.join([competition.getRelegationsWarningsStr(rider.bib, event, True) if rider else u'' for rider in riders]) )
-				if getattr(model, 'resultsShowTeams', True):
-					writeCell( u'\n'.join([rider.team if rider else '' for rider in riders]) )
-
-				if heatsMax != 1:
-					for heat in six.moves.range(heatsMax):
-						if event.heatsMax != 1:
-							writeCell( u'\n'.join(event.getHeatPlaces(heat+1)) )
-						else:
-							writeCell( u'' )
-				
-				#writeCell( u' ===> ', vert=wx.ALIGN_CENTRE )
-				writeCell( ' '.join(['',Arrow,'']), vert=wx.ALIGN_CENTRE )
-				
-				out = [event.winner] + event.others
-				riders = [state.labels.get(c, None) for c in out]
-				writeCell( u'\n'.join( u'{}'.format(i+1) for i in six.moves.range(len(riders))) )
-				writeCell( u'\n'.join([u'{}'.format(rider.bib if rider.bib else '') if rider else '' for rider in riders]) )
-				if getattr(model, 'resultsShowNames', True):
-					writeCell( u'\n'.join([rider.full_name if rider else '' for rider in riders]) )
-				writeCell( u'\n'.join([competition.getRelegationsWarningsStr(rider.bib, event, False) if rider else u'' for rider in riders]) )
-				if getattr(model, 'resultsShowTeams', True):
-					writeCell( u'\n'.join([rider.team if rider else '' for rider in riders]) )
-				if event.winner in state.labels:
-					try:
-						value = u'%.3f' % event.starts[-1].times[1]
-					except (KeyError, IndexError, ValueError):
-						value = ''
-					writeCell( value )
-			
-			competitionTime = system.competitionTime
-			self.competitionTime.SetLabel( u'{}: {}'.format(_('Est. Competition Time'), Utils.formatTime(competitionTime)) 
-				if competitionTime else u'' )
+		rowsRequired = len(data.rows)
+		if 'Final Classification' in resultName:
+			rowsRequired = max( rowsRequired, len(model.riders) )
+		self.table.setData( self.grid, data, self.getColAttrs(), rowsRequired )
 		
-		self.grid.AutoSizeColumns( False )
-		self.grid.AutoSizeRows( False )
+		competitionTime = data.competitionTime
+		self.competitionTime.SetLabel( u'{}: {}'.format(_('Est. Competition Time'), Utils.formatTime(competitionTime)) 
+			if competitionTime else u'' )
 		
 	def commit( self ):
 		model = Model.model
@@ -112,6 +112,7 @@ class Seeding(wx.Panel):
 		toRandomize = model.riders[rMin:rMax]
 		random.shuffle( toRandomize )
 		model.riders[rMin:rMax] = toRandomize
+		model.setChanged( True )
 		self.refresh()
 	
 	def doImportFromExcel( self, event ):
@@ -0,0 +1,305 @@
+import sys
+import time
+import numpy as np
+from optparse import OptionParser
+
+import Model
+from Competitions import getCompetition, getCompetitionFormats, SetDefaultData, DoRandomSimulation
+
+#------------------------------------------------------------------------------------------------
+# Compact simulation kernel.
+#
+# A competition format is compiled once:
+#   labels become integer slots,
+#   events become tuples of slots (composition and output),
+#   events are ordered so every event comes after the events producing its inputs.
+#
+# The state of many simulations is one array of labels[simulation, slot] = rider index.
+# Each event is then run for all simulations at once.
+#
+# Finish orders are drawn like DoRandomSimulation (Gaussian around the qualifying time),
+# without DNF, DNS, DQ, relegations or restarts.
+#
+
+UNSET, OPEN, PAD = -2, -1, -3		# UNSET is also "None" in the results.
+
+class CompiledFormat( object ):
+	def __init__( self, competition ):
+		self.name = competition.name
+		self.starters = competition.starters
+		self.isMTB = competition.isMTB
+		
+		self.labels = []
+		self.slot = {}
+		def getSlot( label ):
+			if label not in self.slot:
+				self.slot[label] = len(self.labels)
+				self.labels.append( label )
+			return self.slot[label]
+		
+		for i in range(128):
+			getSlot( 'N{}'.format(i+1) )
+		
+		events = [e for t, s, e in competition.allEvents()]
+		self.composition = [tuple(getSlot(c) for c in e.composition) for e in events]
+		self.output = [tuple(getSlot(o) for o in e.output) for e in events]
+		self.heatsMax = [e.heatsMax for e in events]
+		
+		# Order the events so the producer of every input label comes first.
+		producer = { o: i for i, output in enumerate(self.output) for o in output }
+		self.order = []
+		done = set()
+		remaining = list( range(len(events)) )
+		while remaining:
+			ready = [i for i in remaining if all(c not in producer or producer[c] in done for c in self.composition[i])]
+			assert ready, '{}: circular event dependencies'.format(self.name)
+			self.order.extend( ready )
+			done.update( ready )
+			remaining = [i for i in remaining if i not in done]
+		
+		if not self.isMTB:
+			self.resultSlots = [getSlot('{}R'.format(i+1)) for i in range(self.starters)]
+			self.ttSlots = [s for s, label in enumerate(self.labels) if label.endswith('TT')]
+		else:
+			# Same round and rank rules as Competition.getResults.
+			semiFinalRound, smallFinalRound, bigFinalRound = 60, 61, 62
+			self.finishSpecs = []		# (event index, output position, round, rank)
+			for iEvent, event in enumerate(events):
+				round = 1
+				if event.isSemiFinal:
+					round = semiFinalRound
+				elif event.isSmallFinal:
+					round = smallFinalRound
+				elif event.isBigFinal:
+					round = bigFinalRound
+				else:
+					for id in event.output:
+						if 'RR' in id:
+							round = int(id[-3])
+							break
+				
+				for i, id in enumerate(event.output):
+					if id.endswith('R'):
+						rank = int(id[:-1])
+						isFinish = True
+					else:
+						try:
+							rank = int(id[-1:])
+						except ValueError:
+							rank = i + 1
+						isFinish = ('RR' in id)
+					if isFinish:
+						self.finishSpecs.append( (iEvent, i, round, rank) )
+	
+	def getStartLabels( self, riders ):
+		''' Returns the initial label slots in the same way as Model.setQualifyingTimes. '''
+		labels = np.full( len(self.labels), UNSET, dtype=np.int32 )
+		qt = sorted( (r.qualifyingTime, iSeeding+1, i) for iSeeding, (i, r) in enumerate(enumerate(riders)) if r.status != 'DNQ' )[:self.starters]
+		for s, (t, iSeeding, i) in enumerate(qt):
+			labels[s] = i
+		labels[len(riders):128] = OPEN
+		return labels
+	
+	def simulate( self, riders, simulations, rng = None, record = False ):
+		''' Simulate the competition with these riders.  Returns a KernelResults. '''
+		rng = rng or np.random.default_rng()
+		S = simulations
+		rows = np.arange( S )
+		
+		# qt[OPEN] is the last entry - the OpenRider's qualifying time.
+		qt = np.array( [r.qualifyingTime for r in riders] + [Model.QualifyingTimeDefault + 1.0] )
+		
+		labels = np.tile( self.getStartLabels(riders), (S, 1) )
+		heats = np.zeros( (S, len(self.composition)), dtype=np.int8 )
+		orders = {}
+		finishes = {}
+		
+		for iEvent in self.order:
+			composition, output, heatsMax = self.composition[iEvent], self.output[iEvent], self.heatsMax[iEvent]
+			k = len(composition)
+			
+			inRiders = labels[:, composition]
+			contending = inRiders >= 0
+			active = (inRiders != UNSET).all( axis=1 ) & contending.any( axis=1 )
+			
+			finish = np.full( (S, k), OPEN, dtype=np.int32 )
+			decided = ~active
+			if k == 1:
+				# Single sprint case - default winner without a start.
+				finish[active] = inRiders[active]
+			else:
+				qtIn = np.where( contending, qt[np.where(contending, inRiders, OPEN)], 0.0 )
+				nContending = contending.sum( axis=1 )
+				v = qtIn.sum( axis=1 ) / np.maximum(nContending, 1) / 20.0
+				wins = np.zeros( (S, k), dtype=np.int32 )
+				eventOrders = []
+				for heat in range(heatsMax):
+					running = ~decided
+					if not running.any():
+						break
+					keys = qtIn + v[:,None] * rng.standard_normal( (S, k) )
+					keys[~contending] = np.inf
+					pos = np.argsort( keys, axis=1, kind='stable' )
+					order = np.take_along_axis( inRiders, pos, axis=1 )
+					order[~np.take_along_axis(contending, pos, axis=1)] = OPEN
+					heats[running, iEvent] += 1
+					if record:
+						eventOrders.append( order )
+					
+					winner = pos[:, 0]
+					wins[rows, winner] += running
+					newlyDecided = running & (wins[rows, winner] >= heatsMax - 1)
+					finish[newlyDecided] = order[newlyDecided]
+					decided |= newlyDecided
+				if record:
+					orders[iEvent] = eventOrders
+			
+			propagated = active & decided
+			for i, o in enumerate(output):
+				labels[propagated, o] = finish[propagated, i] if i < k else OPEN
+			if self.isMTB:
+				finishes[iEvent] = np.where( propagated[:,None] & (finish >= 0), finish, UNSET )
+		
+		if not self.isMTB:
+			results, counts = self.getResultsSprint( labels, qt )
+		else:
+			results, counts = self.getResultsMTB( finishes, qt )
+		return KernelResults( self, riders, results, counts, heats, orders )
+	
+	def getResultsSprint( self, labels, qt ):
+		S = labels.shape[0]
+		results = labels[:, self.resultSlots].copy()
+		
+		# Assign the TT riders from the bottom, slowest first.
+		if self.ttSlots:
+			tt = labels[:, self.ttSlots]
+			present = tt != UNSET
+			keys = np.where( present, -qt[np.where(present, tt, OPEN)], np.inf )
+			ttSorted = np.take_along_axis( tt, np.argsort(keys, axis=1, kind='stable'), axis=1 )
+			ttCount = present.sum( axis=1 )
+			for j in range(min(len(self.ttSlots), self.starters)):
+				assign = ttCount > j
+				results[assign, self.starters - 1 - j] = ttSorted[assign, j]
+		
+		return compact( results, results == OPEN )
+	
+	def getResultsMTB( self, finishes, qt ):
+		S = next( iter(finishes.values()) ).shape[0]
+		M = len(self.finishSpecs)
+		if not M:
+			return np.full( (S, 0), PAD, dtype=np.int32 ), np.zeros( S, dtype=np.int32 )
+		results = np.empty( (S, M), dtype=np.int32 )
+		for j, (iEvent, i, round, rank) in enumerate(self.finishSpecs):
+			finish = finishes[iEvent]
+			results[:, j] = finish[:, i] if i < finish.shape[1] else UNSET
+		
+		round = np.array( [-spec[2] for spec in self.finishSpecs] )
+		rank = np.array( [spec[3] for spec in self.finishSpecs] )
+		position = np.arange( M )
+		qtResults = np.where( results >= 0, qt[np.where(results >= 0, results, OPEN)], sys.float_info.max )
+		keys = [np.broadcast_to(a, results.shape) for a in (position, qtResults, rank, round)]
+		results = np.take_along_axis( results, np.lexsort(keys, axis=-1), axis=1 )
+		
+		# Remove repeated riders, keeping the first.
+		byRider = np.lexsort( (np.broadcast_to(position, results.shape), results), axis=-1 )
+		ridersSorted = np.take_along_axis( results, byRider, axis=1 )
+		repeated = np.zeros( results.shape, dtype=bool )
+		repeated[:, 1:] = (ridersSorted[:, 1:] == ridersSorted[:, :-1]) & (ridersSorted[:, 1:] >= 0)
+		drop = np.zeros( results.shape, dtype=bool )
+		np.put_along_axis( drop, byRider, repeated, axis=1 )
+		
+		return compact( results, drop )
+
+def compact( results, drop ):
+	''' Remove the dropped entries, and the empty results after the first rider unless the first result is a rider.
+		Returns the (results, counts) with the unused entries set to PAD. '''
+	S, n = results.shape
+	columns = np.arange( n )
+	isRider = (results >= 0) & ~drop
+	hasRider = isRider.any( axis=1 )
+	firstRider = np.argmax( isRider, axis=1 )
+	isEmpty = (results == UNSET) & ~drop
+	emptyFirst = hasRider & (isEmpty & (columns < firstRider[:,None])).any( axis=1 )
+	drop = drop | (emptyFirst[:,None] & isEmpty & (columns > firstRider[:,None]))
+	
+	results = np.take_along_axis( results, np.argsort(drop, axis=1, kind='stable'), axis=1 )
+	counts = (~drop).sum( axis=1 )
+	results[columns >= counts[:,None]] = PAD
+	return results, counts
+
+class KernelResults( object ):
+	def __init__( self, compiledFormat, riders, results, counts, heats, orders ):
+		self.compiledFormat = compiledFormat
+		self.riders = riders
+		self.results = results		# results[simulation, place-1] = rider index, UNSET for no rider.
+		self.counts = counts		# Number of results of each simulation.
+		self.heats = heats			# heats[simulation, event] = number of heats ridden.
+		self.orders = orders		# orders[event][heat][simulation] = finish order (only if recorded).
+	
+	def getResults( self, simulation ):
+		''' Returns [(place, rider), ...] in the same form as Competition.getResults()[0]. '''
+		riders = self.riders
+		return [(p+1, riders[r] if r >= 0 else None) for p, r in enumerate(self.results[simulation, :self.counts[simulation]])]
+	
+	def playModel( self, model, simulation ):
+		''' Play the recorded finish orders of a simulation into the model, in the same way as DoRandomSimulation. '''
+		competition = model.competition
+		eventIndex = { e: i for i, (t, s, e) in enumerate(competition.allEvents()) }
+		riders = self.riders
+		while 1:
+			tse = competition.getCanStart()
+			if not tse:
+				break
+			e = tse[0][2]
+			start = e.getStart()
+			order = self.orders[eventIndex[e]][len(e.starts)-1][simulation]
+			start.setPlaces( [(riders[r].bib, '', '0', '0') for r in order if r >= 0] )
+			e.propagate()
+			competition.propagate()
+
+def newModel( name, riders ):
+	model = Model.Model()
+	model.competition = getCompetition( name )
+	model.riders = riders
+	model.setQualifyingTimes()
+	return model
+
+def benchmark( name, simulations = 1000, check = 20, seed = None ):
+	''' Compare the kernel to DoRandomSimulation.  Returns (model sims/sec, kernel sims/sec, mismatches). '''
+	riders = SetDefaultData( name, random = True ).riders
+	compiledFormat = CompiledFormat( getCompetition(name) )
+	
+	tStart = time.time()
+	for i in range(simulations):
+		model = newModel( name, riders )
+		DoRandomSimulation( model )
+		model.competition.getResults()
+	modelRate = simulations / (time.time() - tStart)
+	
+	tStart = time.time()
+	compiledFormat.simulate( riders, simulations, np.random.default_rng(seed) )
+	kernelRate = simulations / (time.time() - tStart)
+	
+	# Replay the kernel's finish orders into the model and compare the results.
+	kernelResults = compiledFormat.simulate( riders, check, np.random.default_rng(seed), record = True )
+	mismatches = 0
+	for i in range(check):
+		model = newModel( name, riders )
+		kernelResults.playModel( model, i )
+		if model.competition.getResults()[0] != kernelResults.getResults( i ):
+			mismatches += 1
+	return modelRate, kernelRate, mismatches
+
+if __name__ == '__main__':
+	parser = OptionParser( usage = "usage: %prog [options]" )
+	parser.add_option("-c", "--competition", dest="competition", default=None, help="competition format name (default: all)")
+	parser.add_option("-n", "--simulations", dest="simulations", type="int", default=1000, help="number of simulations")
+	parser.add_option("-k", "--check", dest="check", type="int", default=20, help="number of simulations to check against the model")
+	parser.add_option("-s", "--seed", dest="seed", type="int", default=None, help="random seed")
+	(options, args) = parser.parse_args()
+	
+	names = [options.competition] if options.competition else [name for name, starters in getCompetitionFormats()]
+	print ( '{:<50} {:>12} {:>12} {:>8} {:>10}'.format('Competition', 'Model/sec', 'Kernel/sec', 'Speedup', 'Mismatches') )
+	for name in names:
+		modelRate, kernelRate, mismatches = benchmark( name, options.simulations, options.check, options.seed )
+		print ( '{:<50} {:>12.1f} {:>12.1f} {:>8.1f} {:>10}'.format(name, modelRate, kernelRate, kernelRate / modelRate, mismatches) )
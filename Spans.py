@@ -0,0 +1,153 @@
+import time
+import functools
+from collections import deque
+
+#------------------------------------------------------------------------------------------------
+# Timed spans for the slow paths (user actions, propagate, results, page refresh, exports, saves).
+#
+# Each span name has a histogram of its durations.  The histograms are kept in memory,
+# written to the log on exit and shown on the Performance page (Ctrl+Alt+P).
+#
+# When disabled, span() returns a shared object that does nothing and timed functions
+# only check a flag, so the spans can stay in the code.
+#
+
+timer = getattr( time, 'perf_counter', time.time )
+
+enabled = False
+
+RecentMax = 1000		# Durations kept for each name for the percentiles.
+SlowSeconds = 0.5		# Spans at least this long are also kept in the slow list.
+SlowMax = 100
+
+histograms = {}
+slow = deque( maxlen = SlowMax )		# (time, name, seconds) of the slow spans.
+
+def setEnabled( enable = True ):
+	global enabled
+	enabled = enable
+
+def isEnabled():
+	return enabled
+
+class Histogram( object ):
+	BucketsMax = 28		# Bucket 0 is less than 1us.  Bucket i is [2**(i-1), 2**i) us.  The last bucket is everything over 1 minute.
+	
+	def __init__( self, name ):
+		self.name = name
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.buckets = [0] * self.BucketsMax
+		self.recent = deque( maxlen = RecentMax )
+	
+	def add( self, seconds ):
+		self.count += 1
+		self.total += seconds
+		if seconds > self.max:
+			self.max = seconds
+		self.buckets[min(int(seconds * 1000000.0).bit_length(), self.BucketsMax - 1)] += 1
+		self.recent.append( seconds )
+	
+	@property
+	def mean( self ):
+		return self.total / self.count if self.count else 0.0
+	
+	def getPercentiles( self, percentiles = (50, 90, 99) ):
+		''' Percentiles of the recent durations. '''
+		values = sorted( self.recent )
+		if not values:
+			return [0.0] * len(percentiles)
+		return [values[min(len(values) - 1, max(0, int(len(values) * p / 100.0 + 0.5) - 1))] for p in percentiles]
+	
+	def getBuckets( self ):
+		''' Returns [(upper limit in seconds, count)] of the non-empty buckets.  The limit of the last bucket is None. '''
+		return [((1 << i) / 1000000.0 if i < self.BucketsMax - 1 else None, c) for i, c in enumerate(self.buckets) if c]
+
+def record( name, seconds ):
+	try:
+		h = histograms[name]
+	except KeyError:
+		h = histograms[name] = Histogram( name )
+	h.add( seconds )
+	if seconds >= SlowSeconds:
+		slow.append( (time.time(), name, seconds) )
+
+class Span( object ):
+	__slots__ = ('name', 'tStart')
+	
+	def __init__( self, name ):
+		self.name = name
+	
+	def __enter__( self ):
+		self.tStart = timer()
+		return self
+	
+	def __exit__( self, eType, eValue, eTraceback ):
+		record( self.name, timer() - self.tStart )
+
+class NullSpan( object ):
+	__slots__ = ()
+	
+	def __enter__( self ):
+		return self
+	
+	def __exit__( self, eType, eValue, eTraceback ):
+		pass
+
+nullSpan = NullSpan()
+
+def span( name ):
+	''' Time a block:  with Spans.span('name'): ... '''
+	return Span( name ) if enabled else nullSpan
+
+def timed( name = None ):
+	''' Decorator that times each call.  The name defaults to the function name. '''
+	def decorator( f ):
+		spanName = name or f.__name__
+		@functools.wraps( f )
+		def new_f( *args, **kwargs ):
+			if not enabled:
+				return f( *args, **kwargs )
+			tStart = timer()
+			try:
+				return f( *args, **kwargs )
+			finally:
+				record( spanName, timer() - tStart )
+		return new_f
+	return decorator
+
+def reset():
+	histograms.clear()
+	slow.clear()
+
+#------------------------------------------------------------------------------------------------
+
+def formatSeconds( secs ):
+	if secs >= 1.0:
+		return u'{:.2f}s'.format( secs )
+	if secs >= 0.001:
+		return u'{:.2f}ms'.format( secs * 1000.0 )
+	return u'{:.0f}us'.format( secs * 1000000.0 )
+
+def getSummary():
+	''' Returns [(name, count, mean, p50, p90, p99, max, total)] with the largest total first. '''
+	summary = [tuple([h.name, h.count, h.mean] + h.getPercentiles() + [h.max, h.total]) for h in histograms.values()]
+	summary.sort( key = lambda s: -s[-1] )
+	return summary
+
+def getSlow():
+	''' Returns [(time, name, seconds)] of the slow spans, most recent first. '''
+	return list( reversed(slow) )
+
+def dump( write ):
+	''' Write the histograms and the slow spans with write (for example, Utils.writeLog). '''
+	if not histograms:
+		return
+	write( u'performance: name count mean p50 p90 p99 max total' )
+	for name, count, mean, p50, p90, p99, maxSecs, total in getSummary():
+		write( u'performance: {} {} {}'.format(name, count, u' '.join(formatSeconds(s) for s in (mean, p50, p90, p99, maxSecs, total))) )
+		write( u'performance:     {}'.format(u' '.join(
+			u'{}:{}'.format(u'<' + formatSeconds(limit) if limit is not None else u'more', c) for limit, c in histograms[name].getBuckets())) )
+	for t, name, seconds in getSlow():
+		write( u'performance: slow {} {} {}'.format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)), name, formatSeconds(seconds)) )
@@ -0,0 +1,145 @@
+import io
+import os
+import sys
+import csv
+import json
+import time
+from optparse import OptionParser
+
+import six
+
+import Model
+import Journal
+import GridData
+
+#------------------------------------------------------------------------------------------------
+# sprintmgr: read a race file and write the final classification without a display.
+#
+# Only imports the model modules, which do not need wx.
+#
+# With --serve, runs the live results server for the race file instead.  The file is read again
+# when it changes, so the server follows a race that SprintMgr is saving.
+#
+
+ServeCheckSeconds = 1.0
+
+headerNames = GridData.SeriesMgrHeaderNames
+
+def openRace( fileName ):
+	''' Read a race file and bring it up to date as the user interface does. '''
+	model, commandCount = Journal.readRace( fileName )
+	model.competition.fixHangingStarts()	# Fix up any interrupted starts.
+	model.competition.propagate()
+	model.setChanged( False )
+	return model
+
+def getResultRows( model ):
+	''' Returns the final classification rows, then the DNF, DQ and DNQ riders. '''
+	return GridData.getSeriesMgrData( model ).rows
+
+def writeText( model, rows, f ):
+	f.write( u'{}: {} - {} - Format: {}\n\n'.format(
+		model.competition_name, model.category, model.date.strftime('%Y-%m-%d'), model.competition.name) )
+	rows = [headerNames] + [[u'{}'.format(v) for v in row] for row in rows]
+	widths = [max(len(row[col]) for row in rows) for col in six.moves.range(len(headerNames))]
+	for row in rows:
+		f.write( u'  '.join(
+			(v.rjust(w) if col < 2 else v.ljust(w)) for col, (v, w) in enumerate(zip(row, widths))
+		).rstrip() + u'\n' )
+
+def writeCsv( model, rows, f ):
+	writer = csv.writer( f )
+	writer.writerow( headerNames )
+	for row in rows:
+		writer.writerow( [u'{}'.format(v) for v in row] )
+
+def writeJson( model, rows, f ):
+	info = {
+		'competition_name': model.competition_name,
+		'category': model.category,
+		'date': model.date.strftime('%Y-%m-%d'),
+		'format': model.competition.name,
+		'results': [dict(zip(headerNames, row)) for row in rows],
+	}
+	f.write( six.text_type(json.dumps(info, indent = 1)) )
+	f.write( u'\n' )
+
+writers = {
+	'text':	writeText,
+	'csv':	writeCsv,
+	'json':	writeJson,
+}
+
+def getFileState( fileName ):
+	s = os.stat( fileName )
+	return (s.st_mtime, s.st_size)
+
+def serve( fileName, model, host, port ):
+	''' Serve the live results until interrupted. '''
+	import LiveResults
+	server = LiveResults.LiveServer( host, port )
+	try:
+		server.start()
+	except (IOError, OSError) as e:
+		sys.stderr.write( u'Cannot start the server on port {}: {}\n'.format(port, e) )
+		return 1
+	sys.stderr.write( u'Live results at: {}\n'.format(u' '.join(server.getUrls())) )
+	
+	fileState = getFileState( fileName )
+	server.publish( model )
+	try:
+		while True:
+			time.sleep( ServeCheckSeconds )
+			try:
+				fileStateNew = getFileState( fileName )
+				if fileStateNew != fileState:
+					model = openRace( fileName )
+					fileState = fileStateNew
+					server.publish( model )
+			except Exception as e:
+				sys.stderr.write( u'Cannot read "{}": {}\n'.format(fileName, e) )		# Try again on the next change.
+				fileState = fileStateNew
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.stop()
+	return 0
+
+def main( argv = None ):
+	parser = OptionParser( usage = "usage: %prog [options] RaceFile.smr", prog = 'sprintmgr' )
+	parser.add_option("-f", "--format", dest="format", type="choice", choices=sorted(writers.keys()), default='text',
+		help="output format: {} (default: text)".format(', '.join(sorted(writers.keys()))))
+	parser.add_option("-o", "--output", dest="output", default=None, help="output file (default: stdout)")
+	parser.add_option("-t", "--timing", action="store_true", dest="timing", default=False, help="write the elapsed time to stderr")
+	parser.add_option("-s", "--serve", dest="serve", type="int", default=None, metavar="PORT", help="serve the live results on this port until interrupted")
+	parser.add_option("--host", dest="host", default='', help="address to serve the live results on (default: all)")
+	(options, args) = parser.parse_args( argv )
+	if len(args) != 1:
+		parser.error( 'expected one race file' )
+	
+	tStart = time.time()
+	try:
+		model = openRace( args[0] )
+	except (IOError, OSError) as e:
+		sys.stderr.write( u'Cannot Open File "{}": {}\n'.format(args[0], e) )
+		return 1
+	if options.serve is not None:
+		return serve( args[0], model, options.host, options.serve )
+	rows = getResultRows( model )
+	
+	if options.output:
+		f = io.open( options.output, 'w', encoding = 'utf-8', newline = '' if options.format == 'csv' else None )
+	else:
+		f = sys.stdout
+	try:
+		writers[options.format]( model, rows, f )
+	finally:
+		if options.output:
+			f.close()
+	
+	if options.timing:
+		sys.stderr.write( u'{:.3f} seconds\n'.format(time.time() - tStart) )
+	return 0
+
+if __name__ == '__main__':
+	sys.exit( main() )
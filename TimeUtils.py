@@ -0,0 +1,52 @@
+#-----------------------------------------------------------------------
+# Time formatting without wx, so the model can be used without a display.
+# Utils imports these for the user interface.
+#
+import math
+import datetime
+
+def formatTime( secs ):
+	if secs is None:
+		secs = 0
+	secs = int(secs + 0.5)
+	hours = int(secs / (60*60));
+	minutes = int( (secs / 60) % 60 )
+	secs = secs % 60
+	if hours > 0:
+		return "%d:%02d:%02d" % (hours, minutes, secs)
+	else:
+		return "%02d:%02d" % (minutes, secs)
+
+def formatDate( date ):
+	y, m, d = date.split('-')
+	d = datetime.date( int(y,10), int(m,10), int(d,10) )
+	return d.strftime( '%B %d, %Y' )
+
+def StrToSeconds( s = '' ):
+	secs = 0.0
+	for f in s.strip().split(':'):
+		if f:
+			secs = secs * 60.0 + float(f)
+		else:
+			secs *= 60.0
+	return secs
+	
+def SecondsToStr( secs, full = False ):
+	f, ss = math.modf(secs)
+	secs = int(ss)
+	hours = int(secs // (60*60))
+	if hours > 99:
+		hours = 99
+	minutes = int( (secs // 60) % 60 )
+	secs = secs % 60 + f
+	if full:
+		return "{:02d}:{:02d}:{:06.3f}".format(hours, minutes, secs)
+	if hours != 0:
+		return "{}:{:02d}:{:06.3f}".format(hours, minutes, secs)
+	if minutes != 0:
+		return "{}:{:06.3f}".format(minutes, secs)
+	return "{:.3f}".format(secs)
+
+def SecondsToMMSS( secs = 0 ):
+	secs = int(secs+0.5)
+	return '%02d:%02d' % ((secs / 60)%60, secs % 60)
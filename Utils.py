@@ -35,6 +35,7 @@ import wx.grid		as gridlib
 import unicodedata
 import traceback
 import platform
+import Spans
 import datetime
 import string
 
@@ -195,51 +196,7 @@ def ChangeFontInChildren(win, font):
 	except:
 		pass
 		
-def formatTime( secs ):
-	if secs is None:
-		secs = 0
-	secs = int(secs + 0.5)
-	hours = int(secs / (60*60));
-	minutes = int( (secs / 60) % 60 )
-	secs = secs % 60
-	if hours > 0:
-		return "%d:%02d:%02d" % (hours, minutes, secs)
-	else:
-		return "%02d:%02d" % (minutes, secs)
-
-def formatDate( date ):
-	y, m, d = date.split('-')
-	d = datetime.date( int(y,10), int(m,10), int(d,10) )
-	return d.strftime( '%B %d, %Y' )
-
-def StrToSeconds( s = '' ):
-	secs = 0.0
-	for f in s.strip().split(':'):
-		if f:
-			secs = secs * 60.0 + float(f)
-		else:
-			secs *= 60.0
-	return secs
-	
-def SecondsToStr( secs, full = False ):
-	f, ss = math.modf(secs)
-	secs = int(ss)
-	hours = int(secs // (60*60))
-	if hours > 99:
-		hours = 99
-	minutes = int( (secs // 60) % 60 )
-	secs = secs % 60 + f
-	if full:
-		return "{:02d}:{:02d}:{:06.3f}".format(hours, minutes, secs)
-	if hours != 0:
-		return "{}:{:02d}:{:06.3f}".format(hours, minutes, secs)
-	if minutes != 0:
-		return "{}:{:06.3f}".format(minutes, secs)
-	return "{:.3f}".format(secs)
-
-def SecondsToMMSS( secs = 0 ):
-	secs = int(secs+0.5)
-	return '%02d:%02d' % ((secs / 60)%60, secs % 60)
+from TimeUtils import formatTime, formatDate, StrToSeconds, SecondsToStr, SecondsToMMSS
 	
 def getHomeDir():
 	try:
@@ -301,10 +258,11 @@ def logCall( f ):
 	def _getstr( x ):
 		return u'{}'.format(x) if not isinstance(x, wx.Object) else u'<<{}>>'.format(x.__class__.__name__)
 	
+	timedF = Spans.timed( f.__name__ )( f )
 	def new_f( *args, **kwargs ):
 		parameters = [_getstr(a) for a in args] + [ u'{}={}'.format( key, _getstr(value) ) for key, value in six.iteritems(kwargs) ]
 		writeLog( 'call: {}({})'.format(f.__name__, removeDiacritic(u', '.join(parameters))) )
-		return f( *args, **kwargs)
+		return timedF( *args, **kwargs)
 	return new_f
 	
 def logException( e, exc_info ):
@@ -0,0 +1,181 @@
+import os
+import re
+import six
+import json
+import hashlib
+import datetime
+
+import Model
+import Journal
+import GridData
+from HtmlWriter import tag, escape, htmlDocument, writeHtmlBrand
+from ExportGrid import writeHtmlHeader, writeHtmlTable, getHeaderFName, getImagePng
+
+#------------------------------------------------------------------------------------------------
+# Results web site: every page of the competition in one folder with an index.
+#
+# Each page has a hash of what it shows (title, header, table rows).  The hashes of the last
+# publish are kept in a manifest in the folder, and only the pages with a different hash are
+# written again, so publishing after a heat only writes the pages that heat changed.
+# The bracket image is drawn and encoded in memory, and only if the Full Table changed.
+#
+
+SiteVersion = 1		# Increase when the page format changes so every page is written again.
+ManifestFName = 'sprintmgr-site.json'
+IndexFName = 'index.html'
+BracketPhase = u'Competition Summary'
+
+def getHash( *values ):
+	return hashlib.sha1( json.dumps([SiteVersion] + list(values), sort_keys=True).encode('utf-8') ).hexdigest()
+
+def getSlug( name ):
+	return re.sub( r'[^A-Za-z0-9]+', u'-', name ).strip( u'-' ).lower() or u'page'
+
+def readManifest( folder ):
+	try:
+		with open(os.path.join(folder, ManifestFName), 'r') as fp:
+			manifest = json.load( fp )
+		if manifest.get('version') == SiteVersion:
+			return manifest.get('files', {})
+	except (IOError, OSError, ValueError):
+		pass
+	return {}
+
+def writeFile( folder, fName, content ):
+	''' Write to a temporary file, then replace the file so a browser never reads half a page. '''
+	fNameTmp = os.path.join( folder, fName + '.tmp' )
+	with open(fNameTmp, 'wb') as fp:
+		fp.write( content )
+	Journal.replaceFile( fNameTmp, os.path.join(folder, fName) )
+
+def getHtml( title, writeBody ):
+	html = six.StringIO()
+	with htmlDocument(html, title):
+		writeBody( html )
+	return html.getvalue().encode( 'utf-8' )
+
+class Page( object ):
+	def __init__( self, fName, name, title, key, write, otherFNames = () ):
+		self.fName = fName
+		self.name = name
+		self.title = title
+		self.key = key						# Hash of what the page shows.
+		self.write = write					# write(fName) returns [(fName, content), ...]
+		self.otherFNames = otherFNames		# The other files written by write, for example, images.
+
+def getPages( model, headerSrc ):
+	''' Returns the pages in the order of the index.  The page contents are only built by write(). '''
+	organizer = getattr( model, 'organizer', u'' )
+	fNames = set()
+	
+	def getFName( name ):
+		slug = getSlug( name )
+		fName, i = slug + u'.html', 1
+		while fName in fNames or fName == IndexFName:
+			i += 1
+			fName = u'{}-{}.html'.format( slug, i )
+		fNames.add( fName )
+		return fName
+	
+	def tablePage( name, pageTitle, data ):
+		title = GridData.getTitle( model, pageTitle )
+		return Page(
+			getFName(name), name, title,
+			getHash( title, organizer, headerSrc, data.headerNames, data.rows ),
+			lambda fName: [(fName, getHtml(title, lambda html: writeHtmlTable(html, title, data.headerNames, data.rows, headerSrc)))],
+		)
+	
+	def bracketPage( chartData ):
+		title = GridData.getTitle( model, u'Communiqu\u00E9: {}\n{}'.format(model.communique_number.get(BracketPhase, u''), BracketPhase) )
+		
+		fName = getFName( u'bracket' )
+		pngFName = os.path.splitext(fName)[0] + u'.png'
+		
+		def write( fName ):
+			import GraphDraw
+			png = getImagePng( GraphDraw.getGraphImage(model) )
+			def writeBody( html ):
+				writeHtmlHeader( html, title, headerSrc )
+				html.write( u'<img id="idResultsSummary" src="{}" />'.format(pngFName) )
+				writeHtmlBrand( html )
+			return [(pngFName, png), (fName, getHtml(title, writeBody))]
+		
+		# The bracket shows the same labels and heat places as the Full Table.
+		return Page( fName, BracketPhase, title, getHash(title, organizer, headerSrc, chartData.rows), write, (pngFName,) )
+	
+	pages = []
+	title, data = GridData.getSeedingPageData( model )
+	pages.append( tablePage(u'Seeding', title, data) )
+	
+	resultChoices = GridData.getResultChoices( model.competition )
+	for resultName in resultChoices[:-1]:
+		title, data = GridData.getResultsPageData( model, resultName )
+		pages.append( tablePage(resultName, title, data) )
+	
+	title, chartData = GridData.getChartPageData( model )
+	pages.append( tablePage(u'Full Table', title, chartData) )
+	pages.append( bracketPage(chartData) )
+	
+	title, data = GridData.getResultsPageData( model, resultChoices[-1] )
+	pages.append( tablePage(resultChoices[-1], title, data) )
+	return pages
+
+def writeIndex( model, pages, headerSrc ):
+	title = u'{} ({})\n{}'.format( model.competition_name, model.date.strftime('%Y-%m-%d'), model.category )
+	def writeBody( html ):
+		writeHtmlHeader( html, title, headerSrc )
+		with tag(html, 'ul'):
+			for page in pages:
+				with tag(html, 'li'):
+					with tag(html, 'a', dict(href=page.fName)):
+						html.write( escape(page.name) )
+		with tag(html, 'p', {'class': 'smallfont'}):
+			html.write( u'Updated: {}'.format(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')) )
+		writeHtmlBrand( html )
+	return getHtml( title, writeBody )
+
+def publish( folder, model = None ):
+	''' Write the pages that changed since the last publish to the folder.
+		Returns ([file names written], number of pages unchanged). '''
+	model = model or Model.model
+	if not os.path.isdir( folder ):
+		os.makedirs( folder )
+	
+	manifest = readManifest( folder )
+	manifestNew = {}
+	written = []
+	
+	def isCurrent( fName, key, otherFNames = () ):
+		return manifest.get(fName) == key and all( os.path.exists(os.path.join(folder, f)) for f in (fName,) + tuple(otherFNames) )
+	
+	# The header graphic is written once and shared by the pages.
+	headerFName = getHeaderFName()
+	with open(headerFName, 'rb') as fp:
+		header = fp.read()
+	headerSrc = u'header' + os.path.splitext(headerFName)[1].lower()
+	key = getHash( hashlib.sha1(header).hexdigest() )
+	if not isCurrent( headerSrc, key ):
+		writeFile( folder, headerSrc, header )
+		written.append( headerSrc )
+	manifestNew[headerSrc] = key
+	
+	pages = getPages( model, headerSrc )
+	unchanged = 0
+	for page in pages:
+		if isCurrent( page.fName, page.key, page.otherFNames ):
+			unchanged += 1
+		else:
+			for fName, content in page.write( page.fName ):
+				writeFile( folder, fName, content )
+				written.append( fName )
+		manifestNew[page.fName] = page.key
+	
+	key = getHash( model.competition_name, model.date.strftime('%Y-%m-%d'), model.category, headerSrc, [(p.fName, p.name) for p in pages] )
+	if written or not isCurrent( IndexFName, key ):
+		writeFile( folder, IndexFName, writeIndex(model, pages, headerSrc) )
+		written.append( IndexFName )
+	manifestNew[IndexFName] = key
+	
+	if written:
+		writeFile( folder, ManifestFName, json.dumps({'version': SiteVersion, 'files': manifestNew}, indent = 1, sort_keys = True).encode('utf-8') )
+	return written, unchanged
@@ -161,4 +161,53 @@ def fitWidthHeight( data, bold = False ):
 	width = max( fitlinewidth(line) for line in lines )
 	height = int( len(lines) * 220 * 1.2 )
 	return width, height
-	
\ No newline at end of file
+	
+#------------------------------------------------------------------------------
+# Memoized widths for the Excel exports.
+#
+# The exports measure the same rider names, teams and numbers over and over.
+# Each (text, bold) is measured once and kept in a least-recently-used cache.
+# Accented letters are measured as their base letter, as when the exports called removeDiacritic.
+#
+
+import six
+import unicodedata
+from collections import OrderedDict
+
+DefaultCharWidth = charwidths['0']	# Unknown characters are as wide as '0'.
+
+WidthCacheMax = 8192
+widthCache = OrderedDict()			# widthCache[(text, bold)] = (width, height), least recently used first.
+
+def removeAccents( text ):
+	if not isinstance(text, six.text_type):
+		return text
+	return u''.join( c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c) )
+
+def textLineWidth( line, bold = False ):
+	''' The same as fitlinewidth for one line of text. '''
+	units = 220 + sum( charwidths.get(c, DefaultCharWidth) for c in line )
+	if bold:
+		units *= 1.1
+	return max( units, 700 )
+
+def getTextWidthHeight( text, bold = False ):
+	''' Returns the (width, height) of multi-line text in BIFF units. '''
+	key = (text, bold)
+	try:
+		fit = widthCache.pop( key )		# Put it back below as the most recently used.
+	except KeyError:
+		lines = removeAccents( text ).split( u'\n' )
+		fit = (max( textLineWidth(line, bold) for line in lines ), int( len(lines) * 220 * 1.2 ))
+		if len(widthCache) >= WidthCacheMax:
+			widthCache.popitem( last = False )
+	widthCache[key] = fit
+	return fit
+
+def getTextWidth( text, bold = False ):
+	return getTextWidthHeight( text, bold )[0]
+
+def getColumnWidth( texts, bold = False ):
+	''' Returns the widest of the texts.  Each distinct text is measured once. '''
+	texts = set( texts )
+	return max( getTextWidth(text, bold) for text in texts ) if texts else 0
@@ -0,0 +1,225 @@
+import copy
+from collections import deque
+
+import Model
+
+#------------------------------------------------------------------------------------------------
+# Undo/Redo.
+#
+# Each change is a delta holding the "other" version of only what the change touched.
+# Applying a delta swaps the model and the delta, so the same delta is used for undo and redo.
+#
+# EventDelta records a competition command (see Journal.execute).
+# ModelDelta records a page commit (seeding, qualifiers, properties).
+#
+# The commands of a start are grouped until the start has places, is restarted or is cancelled.
+# Undo never leaves a start without places.
+#
+
+UndoMax = 100
+
+Missing = object()
+
+def diffDict( before, after ):
+	''' Returns {key: value before} for the keys that changed. '''
+	diff = { k: v for k, v in before.items() if after.get(k, Missing) is not v }
+	diff.update( (k, Missing) for k in after if k not in before )
+	return diff
+
+def swapDict( d, diff ):
+	''' Set the values in diff into d, and set diff to the previous values. '''
+	for k, v in list(diff.items()):
+		diff[k] = d.get( k, Missing )
+		if v is Missing:
+			d.pop( k, None )
+		else:
+			d[k] = v
+
+def getStartState( start ):
+	return { k: copy.copy(v) for k, v in start.__getstate__().items() if k not in ('event', 'lastStart') }
+
+def setStartState( start, state ):
+	for k in [k for k in start.__getstate__() if k not in state and k not in ('event', 'lastStart')]:
+		delattr( start, k )
+	for k, v in state.items():
+		setattr( start, k, v )
+
+def setRiderState( rider, state ):
+	for k in rider.__getstate__():
+		if k not in state:
+			delattr( rider, k )
+	for k, v in state.items():
+		setattr( rider, k, v )
+
+def getEventResults( event ):
+	# Event.propagate replaces these, so the references are enough.
+	return (event.finishRiders, event.finishRiderPlace, event.finishRiderRank, event.compositionRiders)
+
+def setEventResults( event, results ):
+	event.finishRiders, event.finishRiderPlace, event.finishRiderRank, event.compositionRiders = results
+
+def getPending( competition ):
+	pending = getattr( competition, 'propagatePending', None )
+	return None if pending is None else set( pending )
+
+class EventDelta( object ):
+	def __init__( self, model, event ):
+		competition = model.competition
+		state = competition.state
+		self.model = model
+		self.event = event
+		self.starts = list( event.starts )
+		self.lastStart = event.starts[-1] if event.starts else None
+		self.startState = getStartState( self.lastStart ) if self.lastStart else None
+		self.labels = dict( state.labels )
+		self.noncontinue = dict( state.noncontinue )
+		self.eventResults = [(e, getEventResults(e)) for t, s, e in competition.allEvents()]
+		self.pending = getPending( competition )
+	
+	def finish( self ):
+		''' Keep only what was changed.  Returns False if nothing changed. '''
+		competition = self.model.competition
+		state = competition.state
+		self.labels = diffDict( self.labels, state.labels )
+		self.noncontinue = diffDict( self.noncontinue, state.noncontinue )
+		self.eventResults = [(e, r) for e, r in self.eventResults if any(a is not b for a, b in zip(r, getEventResults(e)))]
+		if self.lastStart and getStartState(self.lastStart) == self.startState:
+			self.lastStart = self.startState = None
+		if len(self.starts) == len(self.event.starts) and all(a is b for a, b in zip(self.starts, self.event.starts)):
+			self.starts = None
+		self.open = bool(self.event.starts) and self.event.starts[-1].isHanging()
+		return bool( self.labels or self.noncontinue or self.eventResults or self.lastStart or self.starts is not None )
+	
+	def swap( self ):
+		competition = self.model.competition
+		state = competition.state
+		if self.starts is not None:
+			starts = list( self.event.starts )
+			self.event.starts[:] = self.starts
+			self.starts = starts
+		if self.lastStart:
+			startState = getStartState( self.lastStart )
+			setStartState( self.lastStart, self.startState )
+			self.startState = startState
+		swapDict( state.labels, self.labels )
+		swapDict( state.noncontinue, self.noncontinue )
+		competition.setStartsChanged( self.event )
+		eventResults = []
+		for e, r in self.eventResults:
+			eventResults.append( (e, getEventResults(e)) )
+			setEventResults( e, r )
+		self.eventResults = eventResults
+		pending = getPending( competition )
+		competition.propagatePending = self.pending
+		self.pending = pending
+		competition.resetRelegationsWarnings()
+
+class DeltaGroup( object ):
+	def __init__( self, delta ):
+		self.model = delta.model
+		self.event = delta.event
+		self.open = delta.open
+		self.deltas = [delta]
+	
+	def add( self, delta ):
+		self.deltas.append( delta )
+		self.open = delta.open
+	
+	def swap( self ):
+		# Swap in reverse order.  Reverse the list so the next swap goes the other way.
+		for delta in reversed(self.deltas):
+			delta.swap()
+		self.deltas.reverse()
+
+class ModelDelta( object ):
+	modelAttrs = ('changed',)		# Not part of the undo.
+	open = False
+	
+	def __init__( self, model ):
+		self.model = model
+		self.modelState = self.getModelState()
+		self.riderState = [(r, r.__getstate__()) for r in model.riders]
+		self.competition = model.competition
+		self.labels = dict( model.competition.state.labels )
+	
+	def getModelState( self ):
+		return { k: copy.copy(v) if isinstance(v, (list, dict, set)) else v for k, v in self.model.__dict__.items() if k not in self.modelAttrs }
+	
+	def finish( self ):
+		model = self.model
+		if self.competition is model.competition:
+			self.labels = diffDict( self.labels, model.competition.state.labels )
+		else:
+			self.labels = {}
+		self.riderState = [(r, s) for r, s in self.riderState if s != r.__getstate__()]
+		modelState = self.getModelState()
+		self.modelState = { k: v for k, v in self.modelState.items() if modelState.get(k, Missing) != v }
+		return bool( self.labels or self.riderState or self.modelState )
+	
+	def swap( self ):
+		model = self.model
+		modelState = self.getModelState()
+		for k, v in self.modelState.items():
+			setattr( model, k, v )
+		self.modelState = { k: modelState[k] for k in self.modelState }
+		riderState = []
+		for r, s in self.riderState:
+			riderState.append( (r, r.__getstate__()) )
+			setRiderState( r, s )
+		self.riderState = riderState
+		swapDict( model.competition.state.labels, self.labels )
+		model.competition.resetRelegationsWarnings()
+		model.competition.resetResults()
+
+undoStack = deque( maxlen = UndoMax )
+redoStack = deque( maxlen = UndoMax )
+
+def push( delta ):
+	''' Add a delta if it changed something.  Clears the redo.  Returns True if it changed something. '''
+	if not delta.finish():
+		return False
+	top = undoStack[-1] if undoStack else None
+	if top is not None and top.open and top.model is delta.model and top.event is delta.event:
+		if not isinstance(top, DeltaGroup):
+			undoStack[-1] = top = DeltaGroup( top )
+		top.add( delta )
+	else:
+		undoStack.append( delta )
+	redoStack.clear()
+	return True
+
+def clear():
+	undoStack.clear()
+	redoStack.clear()
+
+def clearOtherModel():
+	''' Drop the deltas of another model (a race was opened or created since). '''
+	for stack in (undoStack, redoStack):
+		if stack and stack[-1].model is not Model.model:
+			stack.clear()
+
+def isUndoAvailable():
+	return bool(undoStack) and undoStack[-1].model is Model.model
+
+def isRedoAvailable():
+	return bool(redoStack) and redoStack[-1].model is Model.model
+
+def doUndo():
+	clearOtherModel()
+	if not undoStack:
+		return False
+	delta = undoStack.pop()
+	delta.swap()
+	redoStack.append( delta )
+	Model.model.setChanged( True )
+	return True
+
+def doRedo():
+	clearOtherModel()
+	if not redoStack:
+		return False
+	delta = redoStack.pop()
+	delta.swap()
+	undoStack.append( delta )
+	Model.model.setChanged( True )
+	return True